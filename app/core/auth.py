@@ -1,18 +1,33 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
 from fastapi import Depends, Header, HTTPException, status
 import firebase_admin
 from firebase_admin import auth as firebase_auth, credentials
-from functools import lru_cache
-from typing import Optional
+from typing import Optional, Tuple
 
 from .config import settings
 from ..models.user import AuthenticatedUser
 
+log = logging.getLogger(__name__)
+
+# Verification runs in worker threads; without the lock several of them can race into
+# initialize_app on a cold instance and the losers fail with "app already exists".
+_firebase_lock = threading.Lock()
+
 
-@lru_cache(maxsize=1)
 def _init_firebase_app():
-    if firebase_admin._apps:
-        return firebase_admin.get_app()
+    with _firebase_lock:
+        if firebase_admin._apps:
+            return firebase_admin.get_app()
+        return firebase_admin.initialize_app(*_firebase_options())
+
 
+def _firebase_options() -> tuple:
+    """(credential, options) for initialize_app from the FB_* settings, else application default credentials."""
     project_id = settings.fb_project_id
     client_email = settings.fb_client_email
     private_key = settings.fb_private_key
@@ -39,13 +54,56 @@ def _init_firebase_app():
     else:
         cred = credentials.ApplicationDefault()
 
-    return firebase_admin.initialize_app(cred, {"projectId": project_id} if project_id else None)
+    return cred, {"projectId": project_id} if project_id else None
 
 
-def _decode_token(token: str) -> AuthenticatedUser:
+def init_firebase():
+    """Initialize the Firebase app at startup so the first requests do not pay for it."""
+    try:
+        _init_firebase_app()
+    except Exception:
+        log.exception("Firebase initialization failed; it is retried on the first authenticated request")
+
+
+# Verified tokens keyed by SHA-256 of the raw token: (exp epoch seconds, user).
+_token_cache: "OrderedDict[str, Tuple[float, AuthenticatedUser]]" = OrderedDict()
+
+
+def _cached_user(token_hash: str) -> Optional[AuthenticatedUser]:
+    cached = _token_cache.get(token_hash)
+    if not cached:
+        return None
+    expires_at, user = cached
+    if expires_at <= time.time():
+        _token_cache.pop(token_hash, None)
+        return None
+    _token_cache.move_to_end(token_hash)
+    return user
+
+
+def _cache_user(token_hash: str, expires_at: float, user: AuthenticatedUser):
+    if settings.auth_token_cache_size <= 0:
+        return
+    _token_cache[token_hash] = (expires_at, user)
+    _token_cache.move_to_end(token_hash)
+    while len(_token_cache) > settings.auth_token_cache_size:
+        _token_cache.popitem(last=False)
+
+
+def _verify_token(token: str) -> dict:
+    """Blocking Firebase verification (RSA check, occasional cert fetch); run off the event loop."""
     _init_firebase_app()
+    return firebase_auth.verify_id_token(token)
+
+
+async def _decode_token(token: str) -> AuthenticatedUser:
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    cached = _cached_user(token_hash)
+    if cached:
+        return cached
+
     try:
-        decoded = firebase_auth.verify_id_token(token)
+        decoded = await asyncio.to_thread(_verify_token, token)
     except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,7 +112,10 @@ def _decode_token(token: str) -> AuthenticatedUser:
 
     raw_role: Optional[str] = decoded.get("role")
     role = raw_role if raw_role in {"admin", "pm"} else "user"
-    return AuthenticatedUser(uid=decoded.get("uid"), email=decoded.get("email"), role=role)
+    user = AuthenticatedUser(uid=decoded.get("uid"), email=decoded.get("email"), role=role)
+    expires_at = min(float(decoded.get("exp") or 0), time.time() + settings.auth_token_cache_ttl_seconds)
+    _cache_user(token_hash, expires_at, user)
+    return user
 
 
 async def get_current_user(authorization: Optional[str] = Header(None)) -> AuthenticatedUser:
@@ -62,7 +123,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> Authe
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
 
     token = authorization.replace("Bearer ", "")
-    return _decode_token(token)
+    return await _decode_token(token)
 
 
 async def require_admin(user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
@@ -12,9 +12,14 @@ class Settings(BaseSettings):
 
     port: int = int(os.getenv("PORT", 5000))
     api_prefix: str = "/api"
+    json_use_orjson: bool = True  # Falls back to stdlib json when orjson is not installed
+    metrics_enabled: bool = False  # Query/route histograms served at /metrics (the route is public unless metrics_token is set)
+    metrics_token: Optional[str] = None  # When set, /metrics requires `Authorization: Bearer <token>`
 
     # Database
     database_url: Optional[str] = None
+    database_replica_url: Optional[str] = None  # Optional read replica for SELECTs
+    db_replica_sticky_seconds: float = 5.0  # After a client writes, its reads stay on the primary this long
     postgres_host: Optional[str] = None
     postgres_port: Optional[int] = None
     postgres_user: Optional[str] = None
@@ -22,18 +27,42 @@ class Settings(BaseSettings):
     postgres_db: Optional[str] = None
     postgres_ssl: Optional[bool] = True
     cloud_sql_connection_name: Optional[str] = None
+    db_pool_min_size: int = 1  # Connections opened (and waited for) at startup; kept warm (Cloud Run: keep low)
+    db_pool_max_size: int = 10  # The pool grows on demand up to this many connections
+    db_pool_timeout: float = 5.0  # Max wait for a free connection before failing with 503
+    db_pool_max_waiting: int = 50  # Queued requests beyond this are rejected immediately with 503 (0 = unbounded)
+    db_pool_max_idle: float = 300  # Close idle connections above min_size after this many seconds
+    db_pool_max_lifetime: float = 3600  # Recycle connections after this many seconds
+    db_pool_retry_after_seconds: int = 1  # Retry-After sent with pool-saturation 503s
+    db_prepared_statements: bool = True  # False turns off server-side prepared statements (transaction-pooling PgBouncer)
+    db_migrate_on_startup: bool = False  # Apply pending migrations in the app lifespan (local/dev); deploys run the migrate job
+    sync_tombstone_retention_days: int = 30  # Deletions older than this are pruned; older watermarks get a full listing
+    sync_tombstone_prune_seconds: float = 3600  # How often each instance prunes expired tombstones
 
     # Firebase
     fb_project_id: Optional[str] = None
     fb_client_email: Optional[str] = None
     fb_private_key: Optional[str] = None
+    auth_token_cache_size: int = 2048  # Verified ID tokens kept in memory (0 disables)
+    auth_token_cache_ttl_seconds: int = 3600  # Upper bound; entries also expire at the token's exp
 
     # CORS
     cors_origins: List[str] = ["*"]
 
+    # Rate cards
+    rate_card_reload_seconds: float = 5.0  # How often the rate card CSVs are checked for changes (0 = load once)
+
     # Float integration
     float_api_key: Optional[str] = None
     float_base_url: str = "https://api.float.com/v3"
+    float_max_connections: int = 10
+    float_requests_per_second: float = 2.0  # Outbox send rate (0 disables throttling)
+    float_outbox_batch_size: int = 20
+    float_outbox_poll_seconds: float = 5.0
+    float_request_timeout_seconds: float = 30.0  # Upper bound on one Float POST; keep it below the lease
+    float_outbox_lease_seconds: int = 120  # Renewed before each send; rows become due again if a worker dies
+    float_outbox_max_attempts: int = 8
+    float_outbox_max_backoff_seconds: int = 3600
 
     def build_db_url(self) -> Optional[str]:
         if self.database_url:
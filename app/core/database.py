@@ -1,13 +1,102 @@
+import asyncio
+import re
 import sys
+import time
 import traceback
-from typing import Any, Iterable, List, Optional
-from psycopg_pool import AsyncConnectionPool
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, AsyncIterator, Iterable, List, Optional
+from uuid import uuid4
+from psycopg_pool import AsyncConnectionPool, PoolTimeout, TooManyRequests
 from psycopg.rows import dict_row
-from psycopg import OperationalError, DatabaseError
+from psycopg import AsyncConnection, OperationalError, DatabaseError
 
+from . import metrics
 from .config import settings
 
 pool: Optional[AsyncConnectionPool] = None
+replica_pool: Optional[AsyncConnectionPool] = None
+_replica_retry_at = 0.0  # monotonic time before which a failed replica is not retried
+
+REPLICA_RETRY_SECONDS = 60
+# Read-your-writes token: the wall-clock time of the client's last write, sent back on every response
+# after a write and honoured by whichever instance serves the client's next request
+LAST_WRITE_HEADER = "X-Last-Write"
+LAST_WRITE_COOKIE = "last_write"
+
+STREAM_BATCH_SIZE = 500  # Rows fetched per round trip by stream()
+
+# Raised when no connection frees up within DB_POOL_TIMEOUT or DB_POOL_MAX_WAITING requests are already queued
+POOL_SATURATION_ERRORS = (PoolTimeout, TooManyRequests)
+
+# Connection pinned by transaction(); the query helpers reuse it instead of checking out their own.
+_current_conn: ContextVar[Optional[AsyncConnection]] = ContextVar("db_current_conn", default=None)
+
+# Read-your-writes state of the current request (see track_writes)
+_request_writes: ContextVar[Optional["_WriteTracking"]] = ContextVar("db_request_writes", default=None)
+
+_READ_STATEMENT = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITE_KEYWORD = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|SHARE|nextval|setval|pg_advisory_\w*)\b", re.IGNORECASE)
+
+
+class _ConnectionScope:
+    """One lazily checked-out connection shared by every query helper call inside connection_scope()."""
+
+    def __init__(self, transactional: bool):
+        self.transactional = transactional
+        self.conn: Optional[AsyncConnection] = None
+        self.replica_conn: Optional[AsyncConnection] = None
+        self._stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, replica: bool = False) -> AsyncConnection:
+        """The scope's primary connection, or its replica connection for reads (never inside a transactional scope)"""
+        async with self._lock:
+            if replica and not self.transactional:
+                if self.replica_conn is None:
+                    self.replica_conn = await self._stack.enter_async_context(_checkout(replica=True))
+                    await self.replica_conn.set_autocommit(True)
+                    self._stack.push_async_callback(self.replica_conn.set_autocommit, False)
+                return self.replica_conn
+            if self.conn is None:
+                conn = await self._stack.enter_async_context(_checkout())
+                if self.transactional:
+                    await self._stack.enter_async_context(conn.transaction())
+                else:
+                    # Statements commit as they run, exactly as with one checkout per call
+                    await conn.set_autocommit(True)
+                    self._stack.push_async_callback(conn.set_autocommit, False)
+                self.conn = conn
+            return self.conn
+
+
+_current_scope: ContextVar[Optional[_ConnectionScope]] = ContextVar("db_current_scope", default=None)
+
+
+async def _configure_connection(conn: AsyncConnection):
+    """Per-connection setup run by the pool. psycopg's own prepare_threshold/prepared_max apply unless preparation is off."""
+    if not settings.db_prepared_statements:
+        conn.prepare_threshold = None
+
+
+def _prepare(prepare: Optional[bool]) -> Optional[bool]:
+    """A call site's prepare=True is ignored when server-side preparation is turned off."""
+    return prepare if settings.db_prepared_statements else False
+
+
+def _pool_kwargs() -> dict:
+    """Sizing shared by the primary and replica pools"""
+    return {
+        "kwargs": _connection_kwargs(),
+        "configure": _configure_connection,
+        "min_size": settings.db_pool_min_size,
+        "max_size": max(settings.db_pool_max_size, settings.db_pool_min_size),
+        "timeout": settings.db_pool_timeout,
+        "max_waiting": settings.db_pool_max_waiting,
+        "max_idle": settings.db_pool_max_idle,
+        "max_lifetime": settings.db_pool_max_lifetime,
+    }
 
 
 def _connection_kwargs():
@@ -56,21 +145,17 @@ async def get_pool() -> AsyncConnectionPool:
     print(f"Initializing database pool...")
     print(f"Connection: {safe_conninfo}")
     print(f"SSL Mode: {'disabled' if settings.postgres_ssl is False else 'required'}")
+    print(f"Pool: min {settings.db_pool_min_size}, max {settings.db_pool_max_size}, timeout {settings.db_pool_timeout}s")
     
     try:
         # Create pool with Cloud Run optimized settings
         pool = AsyncConnectionPool(
             conninfo=conninfo,
             open=False,  # Don't open immediately
-            kwargs=_connection_kwargs(),
-            min_size=1,  # Minimum connections (Cloud Run: keep low)
-            max_size=10,  # Maximum connections
-            timeout=30,  # Wait timeout for getting a connection
-            max_idle=300,  # Close idle connections after 5 minutes
-            max_lifetime=3600,  # Recycle connections after 1 hour
+            **_pool_kwargs(),
         )
         
-        # Open the pool with timeout
+        # Open the pool with timeout; waits until min_size connections are established (warm-up)
         print("Opening connection pool...")
         await pool.open(wait=True, timeout=30)
         
@@ -151,10 +236,38 @@ async def get_pool() -> AsyncConnectionPool:
         raise
 
 
+async def get_replica_pool() -> Optional[AsyncConnectionPool]:
+    """
+    Pool on DATABASE_REPLICA_URL, or None when no replica is configured or it cannot be reached
+    (reads then fall back to the primary; a failed replica is retried after REPLICA_RETRY_SECONDS).
+    """
+    global replica_pool, _replica_retry_at
+
+    if replica_pool is not None or not settings.database_replica_url:
+        return replica_pool
+    if time.monotonic() < _replica_retry_at:
+        return None
+
+    candidate = AsyncConnectionPool(conninfo=settings.database_replica_url, open=False, **_pool_kwargs())
+    try:
+        print("Opening read replica pool...")
+        await candidate.open(wait=True, timeout=30)
+        replica_pool = candidate
+        print("✓ Read replica pool initialized successfully")
+    except Exception as e:
+        _replica_retry_at = time.monotonic() + REPLICA_RETRY_SECONDS
+        print(f"Read replica unavailable, reading from primary: {type(e).__name__}: {e}")
+        await candidate.close()
+    return replica_pool
+
+
 async def close_pool():
-    """Close the database connection pool"""
-    global pool
+    """Close the database connection pools"""
+    global pool, replica_pool
     
+    if replica_pool:
+        await replica_pool.close()
+        replica_pool = None
     if pool:
         print("Closing database pool...")
         await pool.close()
@@ -162,41 +275,263 @@ async def close_pool():
         print("✓ Database pool closed")
 
 
-async def fetch(query: str, params: Iterable[Any] | None = None) -> List[dict]:
-    """Execute a SELECT query and return all rows as dictionaries"""
-    pool_instance = await get_pool()
+class _WriteTracking:
+    """When the client last wrote (from its token, then this request's own writes) and whether this request wrote."""
+
+    def __init__(self, last_write_at: Optional[float]):
+        self.last_write_at = last_write_at
+        self.wrote = False
+
+    @property
+    def token(self) -> Optional[str]:
+        """Value to hand back to the client, once this request has written"""
+        return f"{self.last_write_at:.3f}" if self.wrote and self.last_write_at is not None else None
+
+
+def _parse_write_token(token: Optional[str]) -> Optional[float]:
+    try:
+        written = float(token) if token else None
+    except ValueError:
+        return None
+    # A forged far-future value would only pin this client to the primary; cap it to the sticky window anyway
+    if written is None or written > time.time() + settings.db_replica_sticky_seconds:
+        return None
+    return written
+
+
+def track_writes(token: Optional[str]) -> _WriteTracking:
+    """
+    Start read-your-writes tracking for the current request from the client's last-write token
+    (LAST_WRITE_HEADER / LAST_WRITE_COOKIE). Reads stay on the primary for DB_REPLICA_STICKY_SECONDS
+    after the client's last write on any instance; the caller returns the updated token when `wrote`.
+    """
+    tracking = _WriteTracking(_parse_write_token(token))
+    _request_writes.set(tracking)
+    return tracking
+
+
+def _note_write():
+    tracking = _request_writes.get()
+    if tracking is None or not settings.database_replica_url:
+        return
+    tracking.last_write_at = time.time()
+    tracking.wrote = True
+
+
+def _reads_from_replica() -> bool:
+    """Replica configured, and the client has not written within DB_REPLICA_STICKY_SECONDS"""
+    if not settings.database_replica_url:
+        return False
+    tracking = _request_writes.get()
+    written = tracking.last_write_at if tracking else None
+    return written is None or time.time() - written > settings.db_replica_sticky_seconds
+
+
+@lru_cache(maxsize=1024)
+def _is_read_only(query: str) -> bool:
+    """SELECT/WITH statements that cannot modify data (no DML, locking clauses or sequence calls)"""
+    return bool(_READ_STATEMENT.match(query)) and not _WRITE_KEYWORD.search(query)
+
+
+def pool_stats() -> dict:
+    """Point-in-time pool gauges for /metrics (db_pool_* and db_replica_pool_*, once each pool is open)"""
+    gauges = {}
+    keys = ("pool_min", "pool_max", "pool_size", "pool_available", "requests_waiting")
+    for prefix, pool_instance in (("db", pool), ("db_replica", replica_pool)):
+        if pool_instance is None:
+            continue
+        stats = pool_instance.get_stats()
+        for key in keys:
+            name = f"{prefix}_{key}" if key.startswith("pool_") else f"{prefix}_pool_{key}"
+            gauges[name] = stats.get(key, 0)
+    return gauges
+
+
+def _record_query(site: str, op: str, started: float, rows: int):
+    metrics.observe("db_query_duration_seconds", time.perf_counter() - started, site=site, op=op)
+    metrics.inc("db_query_rows_total", max(rows, 0), site=site)
+
+
+@asynccontextmanager
+async def _checkout(replica: bool = False) -> AsyncIterator[AsyncConnection]:
+    """Check a connection out of the primary (or replica) pool, recording how long the caller waited for it"""
+    pool_instance = (await get_replica_pool() if replica else None) or await get_pool()
+    started = time.perf_counter()
     async with pool_instance.connection() as conn:
+        role = "replica" if pool_instance is replica_pool else "primary"
+        metrics.observe("db_pool_wait_seconds", time.perf_counter() - started, pool=role)
+        yield conn
+
+
+@asynccontextmanager
+async def _connection(read_only: bool = False) -> AsyncIterator[AsyncConnection]:
+    """
+    Yield the connection pinned by an enclosing transaction(), the request scope's connection,
+    or a fresh checkout. Read-only statements go to the replica when one is configured and the
+    current user has not written recently.
+    """
+    conn = _current_conn.get()
+    if conn is not None:
+        yield conn
+        return
+    replica = read_only and _reads_from_replica()
+    if not read_only:
+        _note_write()
+    scope = _current_scope.get()
+    if scope is not None:
+        yield await scope.acquire(replica)
+        return
+    async with _checkout(replica) as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def connection_scope(transactional: bool = False) -> AsyncIterator[None]:
+    """
+    Share one pooled connection across every query helper call inside the block (checked out
+    on first use, so blocks that never query cost nothing). With transactional=True everything
+    runs in one transaction that commits on success and rolls back on error; otherwise each
+    statement autocommits and transaction() blocks still commit on their own. No-op when nested.
+    """
+    if _current_scope.get() is not None or _current_conn.get() is not None:
+        yield
+        return
+    scope = _ConnectionScope(transactional)
+    token = _current_scope.set(scope)
+    try:
+        async with scope._stack:
+            yield
+    finally:
+        _current_scope.reset(token)
+
+
+async def use_connection():
+    """FastAPI dependency: one pooled connection for the whole request"""
+    async with connection_scope():
+        yield
+
+
+async def use_transaction():
+    """FastAPI dependency: one pooled connection and one transaction for the whole request"""
+    async with connection_scope(transactional=True):
+        yield
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[AsyncConnection]:
+    """
+    Run every query helper call inside the block on one connection and one transaction.
+    Commits on success, rolls back on error; nesting creates a savepoint.
+    """
+    conn = _current_conn.get()
+    if conn is not None:
+        async with conn.transaction():
+            yield conn
+        return
+
+    _note_write()
+    scope = _current_scope.get()
+    if scope is not None:
+        conn = await scope.acquire()
+        async with conn.transaction():
+            token = _current_conn.set(conn)
+            try:
+                yield conn
+            finally:
+                _current_conn.reset(token)
+        return
+
+    async with _checkout() as conn:
+        async with conn.transaction():
+            token = _current_conn.set(conn)
+            try:
+                yield conn
+            finally:
+                _current_conn.reset(token)
+
+
+@asynccontextmanager
+async def pipeline() -> AsyncIterator[AsyncConnection]:
+    """
+    Run the helper calls inside the block in psycopg pipeline mode on one connection: execute()
+    statements are sent without waiting for their results, and the next fetch/fetchrow (or the
+    end of the block) collects everything in a single round trip. Errors surface at that point.
+    """
+    async with _connection() as conn:
+        async with conn.pipeline():
+            token = _current_conn.set(conn)
+            try:
+                yield conn
+            finally:
+                _current_conn.reset(token)
+
+
+async def fetch(query: str, params: Iterable[Any] | None = None, prepare: Optional[bool] = None) -> List[dict]:
+    """Execute a SELECT query and return all rows as dictionaries (prepare=True prepares it on first use)"""
+    site = metrics.call_site()
+    async with _connection(read_only=_is_read_only(query)) as conn:
+        started = time.perf_counter()
         async with conn.cursor(row_factory=dict_row) as cur:
-            await cur.execute(query, params or [])
+            await cur.execute(query, params or [], prepare=_prepare(prepare))
             rows = await cur.fetchall()
-            return [dict(r) for r in rows]
+        _record_query(site, "fetch", started, len(rows))
+        return rows
 
 
-async def fetchrow(query: str, params: Iterable[Any] | None = None) -> Optional[dict]:
+async def fetchrow(query: str, params: Iterable[Any] | None = None, prepare: Optional[bool] = None) -> Optional[dict]:
     """Execute a SELECT query and return a single row as a dictionary"""
-    pool_instance = await get_pool()
-    async with pool_instance.connection() as conn:
+    site = metrics.call_site()
+    async with _connection(read_only=_is_read_only(query)) as conn:
+        started = time.perf_counter()
         async with conn.cursor(row_factory=dict_row) as cur:
-            await cur.execute(query, params or [])
+            await cur.execute(query, params or [], prepare=_prepare(prepare))
             row = await cur.fetchone()
-            return dict(row) if row else None
+        _record_query(site, "fetchrow", started, 1 if row else 0)
+        return row
 
 
-async def execute(query: str, params: Iterable[Any] | None = None) -> int:
-    """Execute an INSERT/UPDATE/DELETE query and return affected row count"""
-    pool_instance = await get_pool()
-    async with pool_instance.connection() as conn:
+async def execute(query: str, params: Iterable[Any] | None = None, prepare: Optional[bool] = None) -> int:
+    """Execute an INSERT/UPDATE/DELETE query and return affected row count (committed on release unless inside transaction())"""
+    site = metrics.call_site()
+    async with _connection() as conn:
+        started = time.perf_counter()
         async with conn.cursor() as cur:
-            await cur.execute(query, params or [])
-            await conn.commit()
-            return cur.rowcount
+            await cur.execute(query, params or [], prepare=_prepare(prepare))
+            rowcount = cur.rowcount
+        _record_query(site, "execute", started, rowcount)
+        return rowcount
 
 
 async def execute_many(query: str, params_list: List[Iterable[Any]]) -> int:
     """Execute a query multiple times with different parameters (bulk insert/update)"""
-    pool_instance = await get_pool()
-    async with pool_instance.connection() as conn:
+    site = metrics.call_site()
+    async with _connection() as conn:
+        started = time.perf_counter()
         async with conn.cursor() as cur:
             await cur.executemany(query, params_list)
-            await conn.commit()
-            return cur.rowcount
\ No newline at end of file
+            rowcount = cur.rowcount
+        _record_query(site, "execute_many", started, rowcount)
+        return rowcount
+
+
+async def stream(
+    query: str, params: Iterable[Any] | None = None, batch_size: int = STREAM_BATCH_SIZE
+) -> AsyncIterator[dict]:
+    """
+    Yield rows as dictionaries from a server-side cursor, `batch_size` rows per round trip,
+    so large result sets are never materialized. Holds its connection until exhausted or closed.
+    """
+    site = metrics.call_site()
+    async with _connection(read_only=_is_read_only(query)) as conn:
+        started = time.perf_counter()
+        rows = 0
+        # Named cursors only live inside a transaction (a savepoint when one is already open)
+        async with conn.transaction():
+            async with conn.cursor(name=f"stream_{uuid4().hex}", row_factory=dict_row) as cur:
+                cur.itersize = batch_size
+                await cur.execute(query, params or [])
+                async for row in cur:
+                    rows += 1
+                    yield row
+        # Includes the time the consumer spent between rows
+        _record_query(site, "stream", started, rows)
@@ -0,0 +1,106 @@
+import hashlib
+import re
+from typing import Any, Awaitable, Callable, List, Optional
+
+from fastapi import Request, Response
+
+# Clients may keep responses but must revalidate them with If-None-Match on every use.
+CACHE_CONTROL = "private, no-cache"
+
+# Oldest transaction still running (the sync watermark, migrations/0012). Every transaction below
+# it had finished; anything that commits later carries an id at or above it.
+SNAPSHOT_XMIN_SQL = "pg_snapshot_xmin(pg_current_snapshot())"
+
+# ETags built on a commit-ordered version carry the watermark they were computed at: "<xid>-<digest>"
+_VERSIONED_ETAG = re.compile(r'^(?:W/)?"(\d{1,20})-[0-9a-f]{32}"$')
+
+# version(watermark) -> (watermark, *state); see conditional_response()
+VersionLoader = Callable[[Optional[int]], Awaitable[tuple]]
+
+
+def watermark_sql(param: str = "%s") -> str:
+    """
+    FROM item `w` exposing `w.watermark`: the watermark passed in `param` (an xid8 as text, from
+    the ETag being revalidated) or, when that is NULL, the current snapshot xmin.
+    """
+    return f"(SELECT COALESCE({param}::xid8, {SNAPSHOT_XMIN_SQL}) AS watermark) w"
+
+
+def recent_xids_sql(table: str, xid_column: str, condition: str = "TRUE") -> str:
+    """
+    Version-marker subquery: the distinct transaction ids in `xid_column` at or above `w.watermark`
+    (see watermark_sql) over the rows of `table` matching `condition`. Every transaction below the
+    watermark had finished when it was taken, so any later commit touching those rows adds its id
+    to this list; the list changes in commit order, not in start order.
+    """
+    return (
+        f"(SELECT array_agg(DISTINCT {xid_column}::text ORDER BY {xid_column}::text) FROM {table} "
+        f"WHERE ({condition}) AND {xid_column} >= w.watermark)"
+    )
+
+
+def _digest(parts: tuple) -> str:
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from cheap version markers (row transaction ids, query string, ...)."""
+    return f'"{_digest(parts)}"'
+
+
+def versioned_etag(watermark: Optional[Any], *parts: Any) -> str:
+    """make_etag() prefixed with the watermark the version was computed at, when there is one."""
+    if watermark is None:
+        return make_etag(*parts)
+    return f'"{watermark}-{_digest(parts)}"'
+
+
+def _candidates(request: Request) -> List[str]:
+    header = request.headers.get("if-none-match")
+    return [tag.strip() for tag in header.split(",")] if header else []
+
+
+def _matches(request: Request, etag: str) -> bool:
+    candidates = _candidates(request)
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _issued_watermark(request: Request) -> Optional[int]:
+    for tag in _candidates(request):
+        match = _VERSIONED_ETAG.match(tag)
+        if match and int(match.group(1)) < 2**64:
+            return int(match.group(1))
+    return None
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Return a bodiless 304 when the client already holds `etag`; otherwise stamp the
+    validator on the outgoing response and return None so the route builds the body.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+async def conditional_response(
+    request: Request, response: Response, version: VersionLoader, *parts: Any
+) -> Optional[Response]:
+    """
+    not_modified() for commit-ordered versions. `version(watermark)` returns (watermark, *state),
+    where state holds the response's own row and tombstone transaction ids at or above the
+    watermark (None = the current snapshot xmin). A client's ETag is recomputed at the watermark
+    it was issued with, so it only goes stale when the rows behind the response change, not
+    whenever any write anywhere moves the global xmin. New ETags use the current xmin.
+    """
+    issued = _issued_watermark(request)
+    if issued is not None:
+        watermark, *state = await version(issued)
+        etag = versioned_etag(watermark, *parts, *state)
+        if _matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    watermark, *state = await version(None)
+    return not_modified(request, response, versioned_etag(watermark, *parts, *state))
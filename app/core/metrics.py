@@ -0,0 +1,112 @@
+import bisect
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import settings
+
+# Latency buckets in seconds (Prometheus `le` bounds); +Inf is implicit.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_DATABASE_MODULE = os.path.join("core", "database.py")
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+_histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+_counters: Dict[str, Dict[Labels, float]] = {}
+_help: Dict[str, str] = {
+    "db_query_duration_seconds": "Statement execution time by call site",
+    "db_pool_wait_seconds": "Time spent waiting for a pooled connection",
+    "db_query_rows_total": "Rows returned or affected by call site",
+    "db_pool_rejections_total": "Requests answered 503 because the pool was saturated",
+    "http_request_duration_seconds": "Request latency by route template",
+}
+
+
+def observe(name: str, value: float, **labels: str):
+    """Record one sample in the histogram `name`; a no-op when metrics are disabled."""
+    if not settings.metrics_enabled:
+        return
+    series = _histograms.setdefault(name, {})
+    key = tuple(sorted(labels.items()))
+    histogram = series.get(key)
+    if histogram is None:
+        histogram = series[key] = _Histogram()
+    histogram.observe(value)
+
+
+def inc(name: str, amount: float = 1, **labels: str):
+    if not settings.metrics_enabled:
+        return
+    series = _counters.setdefault(name, {})
+    key = tuple(sorted(labels.items()))
+    series[key] = series.get(key, 0) + amount
+
+
+def call_site(depth: int = 1) -> str:
+    """
+    `module.function` of the nearest caller outside app/core/database.py, used to tag queries
+    without fingerprinting SQL text. Walking a few frames is far cheaper than normalising statements.
+    """
+    frame = sys._getframe(depth)
+    while frame is not None and frame.f_code.co_filename.endswith(_DATABASE_MODULE):
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    module = frame.f_globals.get("__name__", "?").rsplit(".", 1)[-1]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in labels]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(gauges: Optional[Dict[str, float]] = None) -> str:
+    """Everything recorded so far (plus point-in-time `gauges`) in the Prometheus text format."""
+    lines: List[str] = []
+    for name, series in sorted(_histograms.items()):
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), histogram.counts):
+                cumulative += count
+                le = bound if isinstance(bound, str) else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels((*labels, ('le', le)))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(histogram.total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    for name, series in sorted(_counters.items()):
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(series.items()):
+            lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+    for name, value in sorted((gauges or {}).items()):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_format_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,219 @@
+"""
+Versioned schema migrations: numbered SQL files in migrations/ applied once, in order, and
+recorded in schema_migrations. Run at deploy time with
+
+    python -m app.core.migrations migrate     # apply pending migrations
+    python -m app.core.migrations status      # list applied / pending
+
+The app only checks (one SELECT) at startup; request handlers never run DDL.
+"""
+import asyncio
+import hashlib
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from psycopg import AsyncConnection
+from psycopg.errors import UndefinedTable
+
+from .config import settings
+from .database import _connection_kwargs, close_pool, fetch
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent.parent / "migrations"
+BASELINE_VERSION = "0001"
+# First line of a migration that must run outside a transaction (e.g. CREATE INDEX CONCURRENTLY)
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+# Serialises concurrent runners (two deploys, or several instances with DB_MIGRATE_ON_STARTUP)
+MIGRATION_LOCK_ID = 7_260_512_019
+
+_FILENAME = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+_CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE
+)
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  checksum TEXT NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+Migration = Tuple[str, str, Path]  # (version, name, path)
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations: List[Migration] = []
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILENAME.match(path.name)
+        if not match:
+            raise ValueError(f"Unexpected migration file name: {path.name}")
+        migrations.append((match.group(1), match.group(2), path))
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration version in migrations/")
+    return migrations
+
+
+def _statements(sql: str) -> List[str]:
+    """
+    Split a no-transaction migration into single statements (each ending with `;` at end of line);
+    Postgres runs a multi-statement string as one implicit transaction.
+    """
+    statements = []
+    for part in re.split(r";[ \t]*$", sql, flags=re.M):
+        if any(line.strip() and not line.strip().startswith("--") for line in part.splitlines()):
+            statements.append(part.strip())
+    return statements
+
+
+def _checksum(sql: str) -> str:
+    return hashlib.sha256(sql.encode()).hexdigest()
+
+
+async def _applied(conn: AsyncConnection) -> Dict[str, str]:
+    cur = await conn.execute("SELECT version, checksum FROM schema_migrations")
+    return {version: checksum for version, checksum in await cur.fetchall()}
+
+
+async def _has_legacy_schema(conn: AsyncConnection) -> bool:
+    """True for databases created from cloudsql_schema.sql before migrations existed"""
+    cur = await conn.execute("SELECT to_regclass('public.pipeline_opportunities') IS NOT NULL")
+    row = await cur.fetchone()
+    return bool(row and row[0])
+
+
+async def _invalid_indexes(conn: AsyncConnection, names: List[str]) -> List[str]:
+    """Indexes among `names` left INVALID by a failed or interrupted CREATE INDEX CONCURRENTLY"""
+    if not names:
+        return []
+    cur = await conn.execute(
+        """
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = ANY(%s) AND c.relnamespace = 'public'::regnamespace AND NOT i.indisvalid
+        ORDER BY c.relname
+        """,
+        [names],
+    )
+    return [name for (name,) in await cur.fetchall()]
+
+
+async def _apply_without_transaction(conn: AsyncConnection, version: str, name: str, sql: str):
+    """
+    Run a no-transaction migration statement by statement. A concurrent index build that failed
+    earlier leaves an INVALID index that IF NOT EXISTS would skip, so those are dropped first and
+    the migration is only recorded once every index it builds is valid.
+    """
+    indexes = _CONCURRENT_INDEX.findall(sql)
+    for index in await _invalid_indexes(conn, indexes):
+        print(f"Dropping invalid index {index} left by an earlier run")
+        await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index}"')
+    for statement in _statements(sql):
+        await conn.execute(statement)
+    invalid = await _invalid_indexes(conn, indexes)
+    if invalid:
+        raise RuntimeError(
+            f"Migration {version}_{name} left invalid indexes ({', '.join(invalid)}); "
+            "it was not recorded and the indexes are dropped and rebuilt on the next run"
+        )
+    await _record(conn, version, name, _checksum(sql))
+
+
+async def _record(conn: AsyncConnection, version: str, name: str, checksum: str):
+    await conn.execute(
+        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+        [version, name, checksum],
+    )
+
+
+async def migrate(conninfo: Optional[str] = None) -> List[str]:
+    """Apply every pending migration in version order; returns the versions applied."""
+    conninfo = conninfo or settings.build_db_url()
+    if not conninfo:
+        raise RuntimeError("Database configuration is missing. Set DATABASE_URL or POSTGRES_* environment variables.")
+
+    applied_now: List[str] = []
+    async with await AsyncConnection.connect(conninfo, autocommit=True, **_connection_kwargs()) as conn:
+        await conn.execute("SELECT pg_advisory_lock(%s)", [MIGRATION_LOCK_ID])
+        try:
+            await conn.execute(SCHEMA_MIGRATIONS_SQL)
+            applied = await _applied(conn)
+            migrations = discover_migrations()
+
+            if not applied and await _has_legacy_schema(conn):
+                for version, name, path in migrations:
+                    if version == BASELINE_VERSION:
+                        applied[version] = _checksum(path.read_text())
+                        await _record(conn, version, name, applied[version])
+                        print(f"Adopted existing schema as baseline {version}_{name}")
+
+            for version, name, path in migrations:
+                sql = path.read_text()
+                if version in applied:
+                    if applied[version] != _checksum(sql):
+                        print(f"WARNING: migration {version}_{name} changed after it was applied")
+                    continue
+                print(f"Applying {version}_{name}...")
+                if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+                    await _apply_without_transaction(conn, version, name, sql)
+                else:
+                    async with conn.transaction():
+                        await conn.execute(sql)
+                        await _record(conn, version, name, _checksum(sql))
+                applied_now.append(version)
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(%s)", [MIGRATION_LOCK_ID])
+    return applied_now
+
+
+async def pending_migrations() -> List[str]:
+    """Versions in migrations/ not yet recorded in schema_migrations (one query on the app pool)."""
+    try:
+        rows = await fetch("SELECT version FROM schema_migrations")
+    except UndefinedTable:
+        rows = []
+    applied = {row["version"] for row in rows}
+    return [f"{version}_{name}" for version, name, _ in discover_migrations() if version not in applied]
+
+
+async def check_migrations():
+    """Startup check: apply pending migrations when DB_MIGRATE_ON_STARTUP is set, otherwise warn about them."""
+    if settings.db_migrate_on_startup:
+        for version in await migrate():
+            print(f"✓ Applied migration {version}")
+        return
+    pending = await pending_migrations()
+    if pending:
+        print(f"WARNING: {len(pending)} pending database migration(s): {', '.join(pending)}")
+        print("   Run `python -m app.core.migrations migrate` before serving traffic.")
+
+
+async def _status():
+    try:
+        pending = set(await pending_migrations())
+    finally:
+        await close_pool()
+    for version, name, _ in discover_migrations():
+        label = f"{version}_{name}"
+        print(f"{'pending' if label in pending else 'applied'}  {label}")
+
+
+def main(argv: List[str]) -> int:
+    command = argv[0] if argv else "migrate"
+    if command == "migrate":
+        applied = asyncio.run(migrate())
+        print(f"✓ {len(applied)} migration(s) applied" if applied else "✓ Database schema is up to date")
+        return 0
+    if command == "status":
+        asyncio.run(_status())
+        return 0
+    print("usage: python -m app.core.migrations [migrate|status]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
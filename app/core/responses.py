@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, AsyncIterable, AsyncIterator, Mapping, Optional, Sequence
+from uuid import UUID
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from .config import settings
+
+try:  # Optional accelerator; the stdlib encoder is used when it is missing or disabled
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment image
+    orjson = None
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+EXPORT_CHUNK_BYTES = 64 * 1024  # Rows are coalesced into chunks of about this size before being sent
+
+
+def _default(value: Any) -> Any:
+    """Encode types neither encoder handles natively, matching FastAPI's jsonable_encoder output."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None and settings.json_use_orjson:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Application-wide default response: orjson when available, compact stdlib json otherwise."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted_response(content: Any, headers: Optional[Mapping[str, str]] = None) -> FastJSONResponse:
+    """
+    Serialise service output directly, skipping the route's response_model validation.
+    Only for content already built from validated models; pass the injected response headers through.
+    """
+    return FastJSONResponse(content=content, headers=dict(headers or {}))
+
+
+class RawJSONResponse(Response):
+    """JSON response whose body is already encoded (e.g. JSONB read as ::text); nothing is re-serialised."""
+
+    media_type = "application/json"
+
+
+def json_fragment(value: Any) -> str:
+    """Encode a Python value so it can sit next to pre-encoded fragments."""
+    return dumps(value).decode("utf-8")
+
+
+def raw_json_object(fields: Mapping[str, str], headers: Optional[Mapping[str, str]] = None) -> RawJSONResponse:
+    """
+    Assemble a JSON object from already-encoded member values without parsing them.
+    Pass the route's injected response headers (ETag, Cache-Control) through `headers`.
+    """
+    body = "{" + ",".join(f"{json_fragment(name)}:{fragment}" for name, fragment in fields.items()) + "}"
+    return RawJSONResponse(content=body, headers=dict(headers or {}))
+
+
+async def ndjson_lines(items: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+    """One JSON document per line; str items are treated as already-encoded JSON."""
+    async for item in items:
+        yield (item.encode("utf-8") if isinstance(item, str) else dumps(item)) + b"\n"
+
+
+def _csv_value(value: Any) -> Any:
+    return _default(value) if isinstance(value, (datetime, date, time, Decimal, UUID)) else value
+
+
+async def csv_lines(rows: AsyncIterable[Mapping[str, Any]], columns: Sequence[str]) -> AsyncIterator[bytes]:
+    """A header line followed by one CSV line per row; columns missing from a row are left empty."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns), extrasaction="ignore")
+    writer.writeheader()
+    async for row in rows:
+        writer.writerow({name: _csv_value(value) for name, value in row.items()})
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _coalesce(lines: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    chunk = bytearray()
+    async for line in lines:
+        chunk += line
+        if len(chunk) >= EXPORT_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+def export_response(lines: AsyncIterable[bytes], export_format: str, filename: str) -> StreamingResponse:
+    """Chunked download of `lines`; the body is produced while the database cursor is read."""
+    return StreamingResponse(
+        _coalesce(lines),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
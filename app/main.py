@@ -1,19 +1,43 @@
+import hmac
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 
+from .core import metrics
+from .core.auth import init_firebase
 from .core.config import settings
-from .core.database import close_pool, get_pool
-from .routers import metadata, overhead, pipeline, quotes, roles, storage
+from .core.database import (
+    LAST_WRITE_COOKIE,
+    LAST_WRITE_HEADER,
+    POOL_SATURATION_ERRORS,
+    close_pool,
+    get_pool,
+    pool_stats,
+    track_writes,
+)
+from .core.migrations import check_migrations
+from .core.responses import FastJSONResponse
+from .routers import metadata, overhead, pipeline, quotes, rate_cards, roles, storage
+from .services.float_service import start_float_worker, stop_float_worker
+from .services.rate_card_service import load_rate_cards
+from .services.storage_service import start_tombstone_pruner, stop_tombstone_pruner
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await get_pool()  # Warm pool on startup
+    await check_migrations()
+    init_firebase()
+    print(f"✓ Rate cards loaded ({load_rate_cards()} rates)")
+    start_float_worker()
+    start_tombstone_pruner()
     yield
+    await stop_tombstone_pruner()
+    await stop_float_worker()
     await close_pool()
 
 
@@ -21,6 +45,7 @@ app = FastAPI(
     title="QuoteHub Backend",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Explicitly allow local + Cloud Run frontend origins without relying on env vars
@@ -45,15 +70,66 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER],
 )
 
 
+async def pool_saturated(request: Request, exc: Exception):
+    """Shed load instead of queueing: every pooled connection is busy and the wait limit was hit."""
+    metrics.inc("db_pool_rejections_total", reason=type(exc).__name__)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, retry shortly"},
+        headers={"Retry-After": str(settings.db_pool_retry_after_seconds)},
+    )
+
+
+for _saturation_error in POOL_SATURATION_ERRORS:
+    app.add_exception_handler(_saturation_error, pool_saturated)
+
+
+@app.middleware("http")
+async def record_route_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Route templates (not raw paths) keep label cardinality bounded; streamed bodies count to first byte
+    route = request.scope.get("route")
+    metrics.observe(
+        "http_request_duration_seconds",
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code),
+    )
+    return response
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """Carry the client's last write time across instances so its next reads skip a lagging replica."""
+    tracking = track_writes(request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE))
+    response = await call_next(request)
+    token = tracking.token
+    if token is not None:
+        response.headers[LAST_WRITE_HEADER] = token
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            token,
+            max_age=max(1, int(settings.db_replica_sticky_seconds)),
+            httponly=True,
+            secure=True,
+            samesite="none",
+        )
+    return response
+
+
 app.include_router(storage.router, prefix=settings.api_prefix, tags=["storage"])
 app.include_router(pipeline.router, prefix=settings.api_prefix, tags=["pipeline"])
 app.include_router(quotes.router, prefix=settings.api_prefix, tags=["quotes"])
 app.include_router(overhead.router, prefix=settings.api_prefix, tags=["overhead"])
 app.include_router(roles.router, prefix=settings.api_prefix, tags=["roles"])
 app.include_router(metadata.router, prefix=settings.api_prefix, tags=["metadata"])
+app.include_router(rate_cards.router, prefix=settings.api_prefix, tags=["rate-cards"])
 
 
 @app.get("/health")
@@ -61,6 +137,17 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    if settings.metrics_token and not hmac.compare_digest(
+        request.headers.get("authorization", "").encode(), f"Bearer {settings.metrics_token}".encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(pool_stats()), media_type="text/plain; version=0.0.4")
+
+
 STAFF_CSV_PATH = Path(__file__).resolve().parent.parent / "Salt_staff.csv"
 
 
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -36,6 +36,7 @@ class PipelineEntry(BaseModel):
     updatedByEmail: Optional[str] = None
     createdAt: Optional[datetime] = None
     updatedAt: Optional[datetime] = None
+    version: Optional[int] = None  # row_version; send it back with delta upserts to detect conflicts
 
 
 class PipelineChange(BaseModel):
@@ -51,3 +52,51 @@ class PipelineChange(BaseModel):
 class PipelineResponse(BaseModel):
     entries: List[PipelineEntry]
     changelog: List[PipelineChange]
+    nextCursor: Optional[str] = None
+
+
+class PipelineChangelogResponse(BaseModel):
+    changelog: List[PipelineChange]
+    nextCursor: Optional[str] = None
+
+
+class PipelineTotals(BaseModel):
+    projectCount: int = 0
+    revenue: float = 0
+    totalFees: float = 0
+    avgRevenue: float = 0
+
+
+class PipelineGroupTotals(PipelineTotals):
+    key: Optional[str] = None  # Status, client or start month (YYYY-MM); null when unset
+
+
+class DepartmentFees(BaseModel):
+    department: str
+    fees: float = 0
+    projectsWithFees: int = 0
+
+
+class PipelineAnalyticsResponse(BaseModel):
+    totals: PipelineTotals
+    byStatus: List[PipelineGroupTotals]
+    byClient: List[PipelineGroupTotals]
+    byMonth: List[PipelineGroupTotals]
+    byDepartment: List[DepartmentFees]
+
+
+class ForecastMonth(BaseModel):
+    month: str  # YYYY-MM
+    revenue: float = 0
+    weightedRevenue: float = 0
+    totalFees: float = 0
+    weightedTotalFees: float = 0
+    departmentFees: Dict[str, float]
+    weightedDepartmentFees: Dict[str, float]
+
+
+class PipelineForecastResponse(BaseModel):
+    months: List[ForecastMonth]
+    statusWeights: Dict[str, float]
+    entries: int  # Entries with a start or end date, spread across months
+    unscheduled: int  # Entries without dates, left out of the projection
@@ -1,3 +1,4 @@
+from datetime import date, datetime
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, ConfigDict
 
@@ -19,3 +20,26 @@ class QuotesReplaceRequest(BaseModel):
 
 class QuotesResponse(BaseModel):
     quotes: List[Dict[str, Any]]
+
+
+class QuoteSearchResult(BaseModel):
+    id: Optional[str] = None
+    projectNumber: Optional[str] = None
+    clientName: Optional[str] = None
+    brand: Optional[str] = None
+    projectName: Optional[str] = None
+    status: Optional[str] = None
+    currency: Optional[str] = None
+    rateCard: Optional[str] = None
+    briefDate: Optional[date] = None
+    inMarketDate: Optional[date] = None
+    projectCompletionDate: Optional[date] = None
+    totalProgramBudget: Optional[float] = None
+    computedTotalCost: Optional[float] = None
+    updatedAt: Optional[datetime] = None
+    quote: Optional[Dict[str, Any]] = None  # full_quote, only with includeQuote=true
+
+
+class QuoteSearchResponse(BaseModel):
+    results: List[QuoteSearchResult]
+    nextOffset: Optional[int] = None
@@ -0,0 +1,32 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class RateCardLineItem(BaseModel):
+    department: str
+    role: str
+    hours: float = 0
+    rateCard: Optional[str] = None  # Overrides the request's rate card for this item
+
+
+class RateCardPriceRequest(BaseModel):
+    rateCard: Optional[str] = None
+    client: Optional[str] = None  # Resolved through the client → rate card map when rateCard is omitted
+    items: List[RateCardLineItem] = Field(default_factory=list)
+
+
+class PricedLineItem(BaseModel):
+    department: str
+    role: str
+    hours: float
+    rateCard: Optional[str] = None  # Rate card the rate came from (Blended when the requested card has no rate)
+    rate: Optional[float] = None
+    cost: float = 0
+
+
+class RateCardPriceResponse(BaseModel):
+    rateCard: str
+    items: List[PricedLineItem]
+    total: float
+    unmatched: List[int]  # Indexes of items with no rate on the requested or Blended card
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -9,7 +9,25 @@ class StorageItem(BaseModel):
 
 class StorageResponse(BaseModel):
     value: Optional[Any] = None
+    revision: Optional[str] = None
 
 
 class StorageListResponse(BaseModel):
     values: Dict[str, Any]
+    changes: Optional[Dict[str, Any]] = None
+    deletedKeys: Optional[List[str]] = None  # Plain keys deleted since the `since` watermark
+    deleted: Optional[Dict[str, List[str]]] = None  # Deleted project codes / quote ids by key
+    watermark: Optional[str] = None
+
+
+class StorageDeltaRequest(BaseModel):
+    # Expected row version per project code / quote id (0 = must not exist yet); upserted items
+    # without an entry here are checked against their own `version` field when they carry one.
+    baseVersions: Dict[str, int] = {}
+    upserts: List[Dict[str, Any]] = []
+    deletes: List[str] = []
+
+
+class StorageDeltaResponse(BaseModel):
+    revision: Optional[str] = None
+    versions: Dict[str, int] = {}  # New row version of every upserted item
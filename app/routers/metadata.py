@@ -1,11 +1,20 @@
-from fastapi import APIRouter
+import json
 
+from fastapi import APIRouter, Request, Response
+
+from ..core.http_cache import make_etag, not_modified
 from ..models.metadata import PipelineMetadataResponse
 from ..services.metadata_service import get_pipeline_metadata
 
 router = APIRouter()
 
+# Metadata is static for the life of the process, so its validator is computed once.
+PIPELINE_METADATA_ETAG = make_etag("metadata", json.dumps(get_pipeline_metadata(), sort_keys=True))
+
 
 @router.get("/metadata/pipeline", response_model=PipelineMetadataResponse)
-async def pipeline_metadata():
+async def pipeline_metadata(request: Request, response: Response):
+    cached = not_modified(request, response, PIPELINE_METADATA_ETAG)
+    if cached:
+        return cached
     return get_pipeline_metadata()
@@ -1,20 +1,37 @@
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
 
 from ..core.auth import get_current_user
+from ..core.database import use_connection
+from ..core.http_cache import conditional_response
 from ..models.overhead import OverheadEmployee
 from ..models.user import AuthenticatedUser
-from ..services.overhead_service import delete_overhead_employee, list_overhead_employees, upsert_overhead_employees
+from ..services.overhead_service import (
+    delete_overhead_employee,
+    get_overhead_version,
+    list_overhead_employees,
+    upsert_overhead_employees,
+)
 
 router = APIRouter()
 
 
-@router.get("/overhead-employees")
-async def get_overhead_employees(user: AuthenticatedUser = Depends(get_current_user)):
+@router.get("/overhead-employees", dependencies=[Depends(use_connection)])
+async def get_overhead_employees(
+    request: Request,
+    response: Response,
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    cached = await conditional_response(
+        request, response, lambda watermark: get_overhead_version(user.uid, watermark), "overhead", user.uid
+    )
+    if cached:
+        return cached
+
     employees = await list_overhead_employees(user.uid)
     return {"employees": employees}
 
 
-@router.post("/overhead-employees")
+@router.post("/overhead-employees", dependencies=[Depends(use_connection)])
 async def save_overhead_employees(
     payload: dict = Body(...),
     user: AuthenticatedUser = Depends(get_current_user),
@@ -1,28 +1,157 @@
-from fastapi import APIRouter, Body, Depends, HTTPException
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 
 from ..core.auth import get_current_user
-from ..models.pipeline import PipelineEntry, PipelineResponse
+from ..core.database import use_connection, use_transaction
+from ..core.http_cache import conditional_response
+from ..core.responses import csv_lines, export_response, ndjson_lines, trusted_response
+from ..models.pipeline import (
+    PipelineAnalyticsResponse,
+    PipelineChangelogResponse,
+    PipelineEntry,
+    PipelineForecastResponse,
+    PipelineResponse,
+)
 from ..models.user import AuthenticatedUser
+from ..services.forecast_service import get_pipeline_forecast
 from ..services.pipeline_service import (
-    build_pipeline_changelog,
+    PIPELINE_CHANGELOG_DEFAULT_LIMIT,
+    PIPELINE_CHANGELOG_MAX_LIMIT,
+    PIPELINE_PAGE_MAX_LIMIT,
+    PROJECT_CODE_RESERVE_MAX,
     create_pipeline_entry as create_pipeline_entry_service,
     delete_pipeline_entry,
     get_next_project_code,
-    get_pipeline_entries_for_user,
+    get_pipeline_analytics,
+    get_pipeline_changelog,
+    get_pipeline_page,
+    get_pipeline_version,
+    normalize_status_filter,
+    reserve_project_codes,
+    stream_pipeline_entries,
     update_existing_pipeline_entry,
 )
 
 router = APIRouter()
 
 
-@router.get("/pipeline", response_model=PipelineResponse)
-async def list_pipeline(user: AuthenticatedUser = Depends(get_current_user)):
-    entries = await get_pipeline_entries_for_user(user.uid)
-    changelog = build_pipeline_changelog(entries, user.email or user.uid)
-    return {"entries": entries, "changelog": changelog}
+def _status_filter(status: Optional[List[str]]) -> Optional[List[str]]:
+    try:
+        return normalize_status_filter(status)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@router.get("/pipeline", response_model=PipelineResponse, dependencies=[Depends(use_connection)])
+async def list_pipeline(
+    request: Request,
+    response: Response,
+    status: Optional[List[str]] = Query(None),
+    client: Optional[str] = None,
+    owner: Optional[str] = None,
+    region: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="dateFrom"),
+    date_to: Optional[date] = Query(None, alias="dateTo"),
+    cursor: Optional[str] = None,
+    # Optional until the frontend follows nextCursor; without it the whole pipeline is one page
+    limit: Optional[int] = Query(None, ge=1, le=PIPELINE_PAGE_MAX_LIMIT),
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    status = _status_filter(status)
+    cached = await conditional_response(
+        request,
+        response,
+        lambda watermark: get_pipeline_version(user.uid, watermark),
+        "pipeline",
+        user.uid,
+        request.url.query,
+    )
+    if cached:
+        return cached
 
+    try:
+        entries, next_cursor = await get_pipeline_page(
+            statuses=status,
+            client=client,
+            owner=owner,
+            region=region,
+            date_from=date_from,
+            date_to=date_to,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    # The newest changelog page rides along with the first pipeline page; older history is on /pipeline/changelog.
+    changelog = []
+    if not cursor:
+        changelog, _ = await get_pipeline_changelog(user.uid, user.email or user.uid)
+    # Entries and changelog are already PipelineEntry / PipelineChange models; skip re-validation
+    return trusted_response(
+        {"entries": entries, "changelog": changelog, "nextCursor": next_cursor}, response.headers
+    )
+
+
+@router.get("/pipeline/export")
+async def export_pipeline(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    status: Optional[List[str]] = Query(None),
+    client: Optional[str] = None,
+    owner: Optional[str] = None,
+    region: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="dateFrom"),
+    date_to: Optional[date] = Query(None, alias="dateTo"),
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    status = _status_filter(status)  # Checked here: the stream only starts once the response is sent
+    entries = stream_pipeline_entries(
+        statuses=status, client=client, owner=owner, region=region, date_from=date_from, date_to=date_to
+    )
+    if export_format == "csv":
+        lines = csv_lines((entry.model_dump(mode="json") async for entry in entries), list(PipelineEntry.model_fields))
+    else:
+        lines = ndjson_lines(entries)
+    return export_response(lines, export_format, "pipeline")
+
+
+@router.get(
+    "/pipeline/analytics", response_model=PipelineAnalyticsResponse, dependencies=[Depends(use_connection)]
+)
+async def pipeline_analytics(user: AuthenticatedUser = Depends(get_current_user)):
+    return await get_pipeline_analytics()
+
+
+@router.get("/pipeline/forecast", response_model=PipelineForecastResponse, dependencies=[Depends(use_connection)])
+async def pipeline_forecast(
+    date_from: Optional[date] = Query(None, alias="dateFrom"),
+    date_to: Optional[date] = Query(None, alias="dateTo"),
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="dateFrom must not be after dateTo")
+    return await get_pipeline_forecast(date_from, date_to)
 
-@router.post("/pipeline", response_model=PipelineEntry)
+
+@router.get(
+    "/pipeline/changelog", response_model=PipelineChangelogResponse, dependencies=[Depends(use_connection)]
+)
+async def list_pipeline_changelog(
+    cursor: Optional[str] = None,
+    limit: int = Query(PIPELINE_CHANGELOG_DEFAULT_LIMIT, ge=1, le=PIPELINE_CHANGELOG_MAX_LIMIT),
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    try:
+        changelog, next_cursor = await get_pipeline_changelog(
+            user.uid, user.email or user.uid, limit=limit, cursor=cursor
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"changelog": changelog, "nextCursor": next_cursor}
+
+
+@router.post("/pipeline", response_model=PipelineEntry, dependencies=[Depends(use_connection)])
 async def create_pipeline_entry(payload: dict = Body(...), user: AuthenticatedUser = Depends(get_current_user)):
     entry_data = payload.get("entry") if isinstance(payload, dict) else None
     entry_data = entry_data or payload
@@ -35,7 +164,7 @@ async def create_pipeline_entry(payload: dict = Body(...), user: AuthenticatedUs
     return saved
 
 
-@router.put("/pipeline", response_model=PipelineEntry)
+@router.put("/pipeline", response_model=PipelineEntry, dependencies=[Depends(use_transaction)])
 async def update_pipeline_entry(payload: dict = Body(...), user: AuthenticatedUser = Depends(get_current_user)):
     entry_data = payload.get("entry") if isinstance(payload, dict) else None
     entry_data = entry_data or payload
@@ -53,7 +182,7 @@ async def update_pipeline_entry(payload: dict = Body(...), user: AuthenticatedUs
         raise HTTPException(status_code=404, detail=str(exc))
 
 
-@router.delete("/pipeline")
+@router.delete("/pipeline", dependencies=[Depends(use_connection)])
 async def remove_pipeline_entry(payload: dict = Body(...), user: AuthenticatedUser = Depends(get_current_user)):
     project_code = payload.get("projectCode") if isinstance(payload, dict) else None
     if not project_code:
@@ -64,4 +193,21 @@ async def remove_pipeline_entry(payload: dict = Body(...), user: AuthenticatedUs
 
 @router.get("/pipeline/next-code")
 async def next_project_code(year: str):
-    return {"projectCode": await get_next_project_code(year)}
+    try:
+        return {"projectCode": await get_next_project_code(year)}
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/pipeline/reserve-codes")
+async def reserve_codes(payload: dict = Body(...), user: AuthenticatedUser = Depends(get_current_user)):
+    year = payload.get("year") if isinstance(payload, dict) else None
+    count = payload.get("count", 1) if isinstance(payload, dict) else 1
+    if not year:
+        raise HTTPException(status_code=400, detail="year is required")
+    if not isinstance(count, int) or not 1 <= count <= PROJECT_CODE_RESERVE_MAX:
+        raise HTTPException(status_code=400, detail=f"count must be between 1 and {PROJECT_CODE_RESERVE_MAX}")
+    try:
+        return {"projectCodes": await reserve_project_codes(str(year), count)}
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
@@ -1,20 +1,113 @@
-from fastapi import APIRouter, Body, Depends, HTTPException
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 
 from ..core.auth import get_current_user
-from ..models.quote import QuotesReplaceRequest, QuotesResponse
+from ..core.database import use_connection
+from ..core.http_cache import conditional_response
+from ..core.responses import csv_lines, export_response, ndjson_lines, raw_json_object, trusted_response
+from ..models.quote import QuoteSearchResponse, QuotesReplaceRequest, QuotesResponse
 from ..models.user import AuthenticatedUser
-from ..services.quotes_service import get_quotes_for_user, replace_quotes
+from ..services.quotes_service import (
+    QUOTE_EXPORT_COLUMNS,
+    QUOTE_SEARCH_DEFAULT_LIMIT,
+    QUOTES_PAGE_MAX_LIMIT,
+    get_quotes_json,
+    get_quotes_version,
+    replace_quotes,
+    search_quotes,
+    stream_quotes,
+)
 
 router = APIRouter()
 
 
-@router.get("/quotes", response_model=QuotesResponse)
-async def list_quotes(user: AuthenticatedUser = Depends(get_current_user)):
-    quotes = await get_quotes_for_user(user.uid)
-    return {"quotes": quotes}
+@router.get("/quotes", response_model=QuotesResponse, dependencies=[Depends(use_connection)])
+async def list_quotes(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=QUOTES_PAGE_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    """All of the user's quotes, newest first; pass limit/offset to read one page."""
+    cached = await conditional_response(
+        request, response, lambda watermark: get_quotes_version(user.uid, watermark), "quotes", user.uid, limit, offset
+    )
+    if cached:
+        return cached
+
+    # Pre-encoded by Postgres; returned as-is rather than validated against QuotesResponse
+    return raw_json_object({"quotes": await get_quotes_json(user.uid, limit, offset)}, response.headers)
+
+
+@router.get("/quotes/search", response_model=QuoteSearchResponse, dependencies=[Depends(use_connection)])
+async def search_user_quotes(
+    request: Request,
+    response: Response,
+    q: Optional[str] = Query(None, max_length=200),
+    client: Optional[str] = None,
+    status: Optional[List[str]] = Query(None),
+    date_from: Optional[date] = Query(None, alias="dateFrom"),
+    date_to: Optional[date] = Query(None, alias="dateTo"),
+    min_budget: Optional[float] = Query(None, alias="minBudget"),
+    max_budget: Optional[float] = Query(None, alias="maxBudget"),
+    role: Optional[str] = None,
+    limit: int = Query(QUOTE_SEARCH_DEFAULT_LIMIT, ge=1, le=QUOTES_PAGE_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    include_quote: bool = Query(False, alias="includeQuote"),
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    Filter the user's quotes by free text (project number/name, client, brand), client, status,
+    a date range overlapping the quote's brief-to-completion window, budget range and resource role.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="dateFrom must be on or before dateTo")
+    if min_budget is not None and max_budget is not None and min_budget > max_budget:
+        raise HTTPException(status_code=400, detail="minBudget must not exceed maxBudget")
+
+    cached = await conditional_response(
+        request, response, lambda watermark: get_quotes_version(user.uid, watermark),
+        "quote-search", user.uid, q, client, status, date_from, date_to, min_budget, max_budget, role,
+        limit, offset, include_quote,
+    )
+    if cached:
+        return cached
+
+    results, next_offset = await search_quotes(
+        user.uid,
+        text=q,
+        client=client,
+        statuses=status,
+        date_from=date_from,
+        date_to=date_to,
+        min_budget=min_budget,
+        max_budget=max_budget,
+        role=role,
+        limit=limit,
+        offset=offset,
+        include_quote=include_quote,
+    )
+    return trusted_response({"results": results, "nextOffset": next_offset}, response.headers)
+
+
+@router.get("/quotes/export")
+async def export_quotes(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    rows = stream_quotes(user.uid)
+    if export_format == "csv":
+        lines = csv_lines(rows, QUOTE_EXPORT_COLUMNS)
+    else:
+        # full_quote arrives as JSON text and is written out unparsed
+        lines = ndjson_lines(row["full_quote"] async for row in rows)
+    return export_response(lines, export_format, "quotes")
 
 
-@router.post("/quotes", response_model=QuotesResponse)
+@router.post("/quotes", response_model=QuotesResponse, dependencies=[Depends(use_connection)])
 async def replace_quotes_bulk(
     payload: QuotesReplaceRequest = Body(...),
     user: AuthenticatedUser = Depends(get_current_user),
@@ -22,5 +115,4 @@ async def replace_quotes_bulk(
     if not payload.quotes:
         raise HTTPException(status_code=400, detail="quotes array is required")
     await replace_quotes(user.uid, payload.quotes, user.email)
-    quotes = await get_quotes_for_user(user.uid)
-    return {"quotes": quotes}
+    return raw_json_object({"quotes": await get_quotes_json(user.uid)})
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Body, Depends, HTTPException, Response
+
+from ..core.auth import get_current_user
+from ..core.responses import trusted_response
+from ..models.rate_card import RateCardPriceRequest, RateCardPriceResponse
+from ..models.user import AuthenticatedUser
+from ..services.rate_card_service import RATE_CARD_PRICE_MAX_ITEMS, price_line_items
+
+router = APIRouter()
+
+
+@router.post("/rate-cards/price", response_model=RateCardPriceResponse)
+async def price_rate_card_items(
+    response: Response,
+    payload: RateCardPriceRequest = Body(...),
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    if len(payload.items) > RATE_CARD_PRICE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {RATE_CARD_PRICE_MAX_ITEMS} items can be priced per call")
+    # Built from validated line items; skip re-validating thousands of priced rows
+    return trusted_response(price_line_items(payload.items, payload.rateCard, payload.client), response.headers)
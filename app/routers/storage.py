@@ -1,14 +1,24 @@
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 from ..core.auth import get_current_user
-from ..models.storage import StorageListResponse, StorageResponse
+from ..core.database import POOL_SATURATION_ERRORS, use_connection
+from ..core.http_cache import conditional_response
+from ..core.responses import json_fragment, raw_json_object
+from ..models.storage import StorageDeltaRequest, StorageDeltaResponse, StorageListResponse, StorageResponse
 from ..models.user import AuthenticatedUser
 from ..services.storage_service import (
+    StorageConflictError,
+    apply_storage_delta,
     delete_storage_value,
+    get_storage_revision,
     get_storage_value,
+    get_storage_version,
+    list_storage_changes,
     list_storage_values,
+    parse_since_token,
     set_storage_value,
 )
 
@@ -16,47 +26,113 @@ router = APIRouter()
 log = logging.getLogger(__name__)
 
 
-@router.get("/storage", response_model=StorageListResponse)
-async def list_storage(user: AuthenticatedUser = Depends(get_current_user)):
+@router.get("/storage", response_model=StorageListResponse, dependencies=[Depends(use_connection)])
+async def list_storage(
+    request: Request,
+    response: Response,
+    since: Optional[str] = None,
+    user: AuthenticatedUser = Depends(get_current_user),
+):
     try:
-        values = await list_storage_values(user.uid)
-        return {"values": values}
+        since_at = parse_since_token(since)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    try:
+        cached = await conditional_response(
+            request, response, lambda watermark: get_storage_version(user.uid, None, watermark), "storage", user.uid, since
+        )
+        if cached:
+            return cached
+        if since_at is not None:
+            result = await list_storage_changes(user.uid, since_at)
+        else:
+            result = await list_storage_values(user.uid)
+        # Values are already JSON strings; encode once instead of validating the whole map
+        return raw_json_object({name: json_fragment(part) for name, part in result.items()}, response.headers)
+    except POOL_SATURATION_ERRORS:
+        raise  # Answered with 503 + Retry-After by the app-level handler
     except Exception as exc:  # pragma: no cover - defensive for Cloud Run DB outages
         log.exception("Failed to list storage for user %s", user.uid)
         # Degrade gracefully so frontend can still render
         return {"values": {}}
 
 
-@router.get("/storage/{key}", response_model=StorageResponse)
-async def read_storage_value(key: str, user: AuthenticatedUser = Depends(get_current_user)):
+@router.get("/storage/{key}", response_model=StorageResponse, dependencies=[Depends(use_connection)])
+async def read_storage_value(
+    key: str,
+    request: Request,
+    response: Response,
+    user: AuthenticatedUser = Depends(get_current_user),
+):
     try:
+        cached = await conditional_response(
+            request, response, lambda watermark: get_storage_version(user.uid, key, watermark), "storage-key", user.uid
+        )
+        if cached:
+            return cached
+        # Watermark first: a write committing while the value is read is then at or above it
+        revision = await get_storage_revision(user.uid, key)
         value = await get_storage_value(user.uid, key)
         if value is None:
             raise HTTPException(status_code=404, detail="Not found")
-        return {"value": value}
-    except HTTPException:
+        return raw_json_object({"value": json_fragment(value), "revision": json_fragment(revision)}, response.headers)
+    except (HTTPException, *POOL_SATURATION_ERRORS):
         raise
     except Exception as exc:  # pragma: no cover
         log.exception("Failed to read storage key %s for user %s", key, user.uid)
         raise HTTPException(status_code=503, detail="Storage unavailable") from exc
 
 
-@router.put("/storage/{key}", response_model=StorageResponse)
+@router.put("/storage/{key}", response_model=StorageResponse, dependencies=[Depends(use_connection)])
 async def write_storage_value(key: str, payload: dict, user: AuthenticatedUser = Depends(get_current_user)):
     value = payload.get("value")
     try:
         saved = await set_storage_value(user.uid, key, value, user.email)
         return {"value": saved}
+    except POOL_SATURATION_ERRORS:
+        raise  # Answered with 503 + Retry-After by the app-level handler
     except Exception as exc:  # pragma: no cover
         log.exception("Failed to write storage key %s for user %s", key, user.uid)
         raise HTTPException(status_code=503, detail="Storage unavailable") from exc
 
 
-@router.delete("/storage/{key}")
+@router.patch("/storage/{key}", response_model=StorageDeltaResponse, dependencies=[Depends(use_connection)])
+async def patch_storage_value(
+    key: str,
+    payload: StorageDeltaRequest,
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    try:
+        revision, versions = await apply_storage_delta(
+            user.uid, key, payload.baseVersions, payload.upserts, payload.deletes, user.email
+        )
+        return {"revision": revision, "versions": versions}
+    except StorageConflictError as exc:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": str(exc),
+                "conflicts": exc.conflicts,
+                "versions": exc.versions,
+                "revision": exc.revision,
+            },
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except POOL_SATURATION_ERRORS:
+        raise  # Answered with 503 + Retry-After by the app-level handler
+    except Exception as exc:  # pragma: no cover
+        log.exception("Failed to apply storage delta %s for user %s", key, user.uid)
+        raise HTTPException(status_code=503, detail="Storage unavailable") from exc
+
+
+@router.delete("/storage/{key}", dependencies=[Depends(use_connection)])
 async def remove_storage_value(key: str, user: AuthenticatedUser = Depends(get_current_user)):
     try:
         await delete_storage_value(user.uid, key)
         return {"ok": True}
+    except POOL_SATURATION_ERRORS:
+        raise  # Answered with 503 + Retry-After by the app-level handler
     except Exception as exc:  # pragma: no cover
         log.exception("Failed to delete storage key %s for user %s", key, user.uid)
         raise HTTPException(status_code=503, detail="Storage unavailable") from exc
@@ -1,15 +1,24 @@
+import asyncio
+import json
 import logging
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import httpx
 
 from ..core.config import settings
+from ..core.database import execute, fetch
 from ..models.pipeline import PipelineEntry
 
 log = logging.getLogger(__name__)
 
 
+# Process-wide client so Float calls reuse pooled keep-alive connections instead of a new TLS handshake each time.
+_client: Optional[httpx.AsyncClient] = None
+_worker_task: Optional["asyncio.Task[None]"] = None
+_outbox_wakeup: Optional[asyncio.Event] = None
+
+
 def _to_date_only(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
@@ -57,39 +66,206 @@ def _build_payload(entry: PipelineEntry) -> Dict[str, Any]:
     return payload
 
 
-async def create_float_project(entry: PipelineEntry) -> Optional[Dict[str, Any]]:
+def get_float_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=settings.float_base_url.rstrip("/"),
+            timeout=httpx.Timeout(15.0, read=20.0),
+            limits=httpx.Limits(
+                max_connections=settings.float_max_connections,
+                max_keepalive_connections=settings.float_max_connections,
+            ),
+        )
+    return _client
+
+
+async def close_float_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _post_project(outbox_id: int, project_code: Optional[str], payload: Dict[str, Any]) -> Tuple[bool, Any]:
     """
-    Create a project in Float for the given pipeline entry.
-    Any errors are logged and swallowed so we don't block pipeline creation.
+    POST one project to Float. Returns (success, response body or error text). Any 2xx counts as
+    created, even when the body is not a JSON object: retrying it would create a duplicate project.
+    Every attempt for one outbox row carries the same Idempotency-Key, and the whole request is
+    bounded by FLOAT_REQUEST_TIMEOUT_SECONDS so it always finishes inside the row's lease.
     """
-    api_key = settings.float_api_key
-    if not api_key:
-        log.info("Float API key not configured; skipping Float project creation for %s", entry.projectCode)
-        return None
-
-    payload = _build_payload(entry)
-    url = f"{settings.float_base_url.rstrip('/')}/projects"
     headers = {
-        "Authorization": f"Bearer {api_key}",
+        "Authorization": f"Bearer {settings.float_api_key}",
         "Content-Type": "application/json",
+        "Idempotency-Key": f"quotehub-float-outbox-{outbox_id}",
     }
-
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(15.0, read=20.0)) as client:
-            response = await client.post(url, headers=headers, json=payload)
-
+        response = await asyncio.wait_for(
+            get_float_client().post("/projects", headers=headers, json=payload),
+            timeout=settings.float_request_timeout_seconds,
+        )
         if response.is_success:
-            body = response.json()
-            log.info("Created Float project for %s: %s", entry.projectCode, body.get("name") or payload["name"])
-            return body
-
-        log.warning(
-            "Float project creation failed for %s (status %s): %s",
-            entry.projectCode,
-            response.status_code,
-            response.text,
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text
+            name = body.get("name") if isinstance(body, dict) else None
+            log.info("Created Float project for %s: %s", project_code, name or payload["name"])
+            return True, body
+    except Exception as exc:
+        log.exception("Error creating Float project for %s", project_code)
+        return False, str(exc)
+
+    log.warning(
+        "Float project creation failed for %s (status %s): %s",
+        project_code,
+        response.status_code,
+        response.text,
+    )
+    return False, f"HTTP {response.status_code}: {response.text[:500]}"
+
+
+async def enqueue_float_project(entry: PipelineEntry):
+    """
+    Record a Float project creation in the outbox. Call it inside the transaction that
+    inserts the pipeline row so the sync is committed (or rolled back) together with it.
+    """
+    if not settings.float_api_key:
+        log.info("Float API key not configured; skipping Float project creation for %s", entry.projectCode)
+        return
+    await execute(
+        "INSERT INTO float_outbox (project_code, payload) VALUES (%s, %s::jsonb)",
+        [entry.projectCode, json.dumps(_build_payload(entry))],
+    )
+
+
+def notify_float_outbox():
+    """Wake the outbox worker after a commit so new rows are sent without waiting for the next poll."""
+    if _outbox_wakeup is not None:
+        _outbox_wakeup.set()
+
+
+def _retry_delay_seconds(attempts: int) -> int:
+    return min(settings.float_outbox_max_backoff_seconds, 2 ** attempts * 5)
+
+
+async def _renew_lease(row: Dict[str, Any]) -> bool:
+    """
+    Push a claimed row's lease forward just before it is sent. False when the lease already ran
+    out and another worker re-claimed the row (its attempts moved on); that worker sends it instead.
+    """
+    renewed = await fetch(
+        """
+        UPDATE float_outbox
+        SET next_attempt_at = now() + make_interval(secs => %s), updated_at = now()
+        WHERE id = %s AND status = 'pending' AND attempts = %s
+        RETURNING id
+        """,
+        [settings.float_outbox_lease_seconds, row["id"], row["attempts"]],
+    )
+    return bool(renewed)
+
+
+async def drain_float_outbox() -> int:
+    """
+    Send one batch of due outbox rows. Rows are claimed with a lease (next_attempt_at pushed
+    forward under SKIP LOCKED) so several instances can drain concurrently without holding a
+    transaction open across HTTP calls. Each row's lease is renewed right before its POST, so a
+    slow batch never outlives the lease of a row it has yet to send. Returns the number of rows attempted.
+    """
+    claimed = await fetch(
+        """
+        UPDATE float_outbox
+        SET attempts = attempts + 1,
+            next_attempt_at = now() + make_interval(secs => %s),
+            updated_at = now()
+        WHERE id IN (
+            SELECT id FROM float_outbox
+            WHERE status = 'pending' AND next_attempt_at <= now()
+            ORDER BY next_attempt_at, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
         )
-    except Exception:
-        log.exception("Error creating Float project for %s", entry.projectCode)
+        RETURNING id, project_code, payload, attempts
+        """,
+        [settings.float_outbox_lease_seconds, settings.float_outbox_batch_size],
+    )
+    if not claimed:
+        return 0
+
+    interval = 1.0 / settings.float_requests_per_second if settings.float_requests_per_second > 0 else 0
+    failed = 0
+    for index, row in enumerate(claimed):
+        if index and interval:
+            await asyncio.sleep(interval)
+        if not await _renew_lease(row):
+            log.warning("Float outbox row %s was re-claimed by another worker; skipping it", row["id"])
+            continue
+        ok, result = await _post_project(row["id"], row["project_code"], row["payload"])
+        # Recorded before the next POST: if the drain dies mid-batch, rows already sent are not re-sent
+        if ok:
+            await execute(
+                "UPDATE float_outbox SET status = 'sent', last_error = NULL, updated_at = now() WHERE id = %s",
+                [row["id"]],
+            )
+        elif row["attempts"] >= settings.float_outbox_max_attempts:
+            failed += 1
+            await execute(
+                "UPDATE float_outbox SET status = 'failed', last_error = %s, updated_at = now() WHERE id = %s",
+                [str(result), row["id"]],
+            )
+        else:
+            await execute(
+                """
+                UPDATE float_outbox
+                SET last_error = %s, next_attempt_at = now() + make_interval(secs => %s), updated_at = now()
+                WHERE id = %s
+                """,
+                [str(result), _retry_delay_seconds(row["attempts"]), row["id"]],
+            )
+
+    if failed:
+        log.error("Giving up on %s Float project(s) after %s attempts", failed, settings.float_outbox_max_attempts)
+    return len(claimed)
+
+
+async def _outbox_worker():
+    assert _outbox_wakeup is not None
+    while True:
+        try:
+            attempted = await drain_float_outbox()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Float outbox drain failed")
+            attempted = 0
+
+        if attempted:
+            continue  # More rows may be due; keep draining.
+        try:
+            await asyncio.wait_for(_outbox_wakeup.wait(), timeout=settings.float_outbox_poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _outbox_wakeup.clear()
+
+
+def start_float_worker():
+    """Start the background outbox drainer (no-op when Float is not configured)."""
+    global _worker_task, _outbox_wakeup
+    if not settings.float_api_key or _worker_task is not None:
+        return
+    _outbox_wakeup = asyncio.Event()
+    _worker_task = asyncio.create_task(_outbox_worker())
+
 
-    return None
+async def stop_float_worker():
+    global _worker_task, _outbox_wakeup
+    if _worker_task is not None:
+        _worker_task.cancel()
+        try:
+            await _worker_task
+        except asyncio.CancelledError:
+            pass
+        _worker_task = None
+        _outbox_wakeup = None
+    await close_float_client()
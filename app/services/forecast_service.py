@@ -0,0 +1,170 @@
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.database import fetchrow
+from ..models.pipeline import ForecastMonth, PipelineForecastResponse
+from .pipeline_service import get_pipeline_version
+
+# Share of an entry's value counted in the weighted projection, by pipeline status.
+STATUS_WEIGHTS: Dict[str, float] = {
+    "confirmed": 1.0,
+    "high-pitch": 0.75,
+    "medium-pitch": 0.5,
+    "open": 0.5,
+    "low-pitch": 0.25,
+    "whitespace": 0.1,
+    "cancelled": 0.0,
+}
+DEFAULT_STATUS_WEIGHT = 0.5
+
+FORECAST_DEPARTMENTS: Tuple[str, ...] = (
+    "accounts",
+    "creative",
+    "design",
+    "strategic_planning",
+    "media",
+    "creator",
+    "social",
+    "omni",
+    "digital",
+    "finance",
+)
+# Value columns spread across months, in matrix column order
+_VALUE_COLUMNS = ("revenue", "total_fees", *(f"{department}_fees" for department in FORECAST_DEPARTMENTS))
+
+_VALUE_ARRAYS_SQL = ",\n  ".join(
+    f"COALESCE(array_agg(COALESCE({column}, 0)::float8), '{{}}') AS {column}" for column in _VALUE_COLUMNS
+)
+
+# The whole pipeline as one row of parallel arrays (one element per scheduled entry). Months are
+# absolute indexes (year * 12 + month - 1); an entry with only one date occupies that month, and an
+# end before the start is clamped to the start.
+_FORECAST_COLUMNS_SQL = f"""
+WITH scheduled AS (
+  SELECT COALESCE(start_date, end_date) AS first_day,
+         GREATEST(COALESCE(end_date, start_date), COALESCE(start_date, end_date)) AS last_day,
+         status, {", ".join(_VALUE_COLUMNS)}
+  FROM pipeline_opportunities
+  WHERE start_date IS NOT NULL OR end_date IS NOT NULL
+)
+SELECT
+  COALESCE(array_agg((extract(year FROM first_day) * 12 + extract(month FROM first_day) - 1)::int), '{{}}') AS first_month,
+  COALESCE(array_agg((extract(year FROM last_day) * 12 + extract(month FROM last_day) - 1)::int), '{{}}') AS last_month,
+  COALESCE(array_agg(COALESCE(array_position(%s::text[], status), 0)), '{{}}') AS status_index,
+  {_VALUE_ARRAYS_SQL},
+  (SELECT count(*) FROM pipeline_opportunities WHERE start_date IS NULL AND end_date IS NULL) AS unscheduled
+FROM scheduled
+"""
+
+_STATUS_NAMES = list(STATUS_WEIGHTS)
+# Index 0 is statuses missing from STATUS_WEIGHTS (array_position returned NULL)
+_STATUS_WEIGHT_VECTOR = np.array([DEFAULT_STATUS_WEIGHT, *STATUS_WEIGHTS.values()])
+
+
+class _Forecast:
+    """Monthly totals over the pipeline's full date range; requests slice it by window."""
+
+    __slots__ = ("first_month", "totals", "weighted", "entries", "unscheduled")
+
+    def __init__(self, first_month: int, totals: np.ndarray, weighted: np.ndarray, entries: int, unscheduled: int):
+        self.first_month = first_month
+        self.totals = totals  # shape (months, len(_VALUE_COLUMNS))
+        self.weighted = weighted
+        self.entries = entries
+        self.unscheduled = unscheduled
+
+
+# Keyed by get_pipeline_version(); any insert, update or delete of an entry changes the key.
+_cache: Optional[Tuple[tuple, _Forecast]] = None
+
+
+def _spread(first: np.ndarray, last: np.ndarray, values: np.ndarray, origin: int, months: int) -> np.ndarray:
+    """
+    Spread each entry's values evenly over its months with a difference array: add the monthly
+    share at its first month, subtract it after its last, then one cumulative sum for all entries.
+    """
+    share = values / (last - first + 1)[:, None]
+    deltas = np.zeros((months + 1, values.shape[1]))
+    np.add.at(deltas, first - origin, share)
+    np.add.at(deltas, last - origin + 1, -share)
+    return np.cumsum(deltas[:-1], axis=0)
+
+
+def compute_forecast(columns: dict) -> _Forecast:
+    first = np.asarray(columns["first_month"], dtype=np.int64)
+    last = np.asarray(columns["last_month"], dtype=np.int64)
+    unscheduled = columns.get("unscheduled") or 0
+    if not len(first):
+        empty = np.zeros((0, len(_VALUE_COLUMNS)))
+        return _Forecast(0, empty, empty, 0, unscheduled)
+
+    values = np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in _VALUE_COLUMNS])
+    origin = int(first.min())
+    months = int(last.max()) - origin + 1
+    weights = _STATUS_WEIGHT_VECTOR[np.asarray(columns["status_index"], dtype=np.int64)]
+    totals = _spread(first, last, values, origin, months)
+    weighted = _spread(first, last, values * weights[:, None], origin, months)
+    return _Forecast(origin, totals, weighted, len(first), unscheduled)
+
+
+async def _load_forecast() -> _Forecast:
+    global _cache
+    if _cache is not None:
+        # Rechecked at the cached watermark, so writes to other tables do not invalidate it
+        cached_version, forecast = _cache
+        if cached_version[0] is not None and await get_pipeline_version(watermark=int(cached_version[0])) == cached_version:
+            return forecast
+    version = await get_pipeline_version()  # Before the read, so a write committing during it changes the key
+    columns = await fetchrow(_FORECAST_COLUMNS_SQL, [_STATUS_NAMES])
+    forecast = compute_forecast(columns or {})
+    _cache = (version, forecast)
+    return forecast
+
+
+def _month_index(value: date) -> int:
+    return value.year * 12 + value.month - 1
+
+
+def _month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+async def get_pipeline_forecast(
+    date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> PipelineForecastResponse:
+    """
+    Monthly revenue, total-fee and department-fee projections across every scheduled pipeline
+    entry, spread evenly from its start to its end month. `weighted*` values are scaled by
+    STATUS_WEIGHTS. Computed once per pipeline version and sliced to the requested months.
+    """
+    forecast = await _load_forecast()
+    start = forecast.first_month
+    end = start + len(forecast.totals) - 1
+    if date_from is not None:
+        start = max(start, _month_index(date_from))
+    if date_to is not None:
+        end = min(end, _month_index(date_to))
+
+    months: List[ForecastMonth] = []
+    for index in range(start, end + 1):
+        row = forecast.totals[index - forecast.first_month].tolist()
+        weighted = forecast.weighted[index - forecast.first_month].tolist()
+        months.append(
+            ForecastMonth(
+                month=_month_label(index),
+                revenue=row[0],
+                weightedRevenue=weighted[0],
+                totalFees=row[1],
+                weightedTotalFees=weighted[1],
+                departmentFees=dict(zip(FORECAST_DEPARTMENTS, row[2:])),
+                weightedDepartmentFees=dict(zip(FORECAST_DEPARTMENTS, weighted[2:])),
+            )
+        )
+    return PipelineForecastResponse(
+        months=months,
+        statusWeights=STATUS_WEIGHTS,
+        entries=forecast.entries,
+        unscheduled=forecast.unscheduled,
+    )
@@ -1,48 +1,17 @@
-from typing import List, Sequence
+import json
+from typing import Dict, List, Optional, Sequence
+from uuid import uuid4
 
 from ..core.database import execute, fetch, fetchrow
+from ..core.http_cache import recent_xids_sql, watermark_sql
 from ..models.overhead import OverheadEmployee
 
-overhead_tables_ready = False
-
-
-async def _ensure_table():
-    global overhead_tables_ready
-    if overhead_tables_ready:
-        return
-    await execute(
-        """
-        CREATE EXTENSION IF NOT EXISTS "pgcrypto";
-        CREATE TABLE IF NOT EXISTS overhead_employees (
-          id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-          user_id TEXT NOT NULL,
-          department TEXT NOT NULL,
-          employee_name TEXT NOT NULL,
-          role TEXT NOT NULL,
-          location TEXT,
-          annual_salary NUMERIC NOT NULL,
-          allocation_percent NUMERIC NOT NULL,
-          start_date DATE,
-          end_date DATE,
-          monthly_allocations JSONB NOT NULL DEFAULT '{}'::jsonb,
-          created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-          updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-          created_by TEXT,
-          updated_by TEXT
-        );
-        CREATE INDEX IF NOT EXISTS overhead_user_idx ON overhead_employees(user_id);
-        CREATE INDEX IF NOT EXISTS overhead_department_idx ON overhead_employees(department);
-        """
-    )
-    overhead_tables_ready = True
-
 
 def _to_employee(row: dict) -> OverheadEmployee:
     return OverheadEmployee(**row)
 
 
 async def list_overhead_employees(user_id: str) -> List[OverheadEmployee]:
-    await _ensure_table()
     rows = await fetch(
         "SELECT * FROM overhead_employees WHERE user_id = %s ORDER BY department ASC, employee_name ASC",
         [user_id],
@@ -50,22 +19,66 @@ async def list_overhead_employees(user_id: str) -> List[OverheadEmployee]:
     return [_to_employee(r) for r in rows]
 
 
+async def get_overhead_version(user_id: str, watermark: Optional[int] = None) -> tuple:
+    """
+    Commit-ordered version of the user's overhead sheet: (watermark, *state), the state being the
+    ids of the transactions at or above the watermark (default: the current snapshot xmin) that
+    wrote or deleted one of the user's employees (see recent_xids_sql).
+    """
+    row = await fetchrow(
+        f"""
+        SELECT w.watermark::text AS watermark,
+          {recent_xids_sql("overhead_employees", "row_xid", "user_id = %(user_id)s")} AS employee_xids,
+          {recent_xids_sql("sync_tombstones", "deleted_xid", "item_type = 'overhead' AND user_id = %(user_id)s")}
+            AS deleted_xids
+        FROM {watermark_sql("%(watermark)s")}
+        """,
+        {"user_id": user_id, "watermark": None if watermark is None else str(watermark)},
+    )
+    return tuple(row.values()) if row else (None,)
+
+
 async def upsert_overhead_employees(user_id: str, employees: Sequence[OverheadEmployee], actor: str | None) -> List[OverheadEmployee]:
-    await _ensure_table()
-    results: List[OverheadEmployee] = []
+    """
+    Upsert a whole department sheet in one statement (and therefore one transaction):
+    each column travels as an array and is expanded server-side with unnest(). Saved rows
+    come back in input order (a repeated id at the position of its last occurrence).
+    """
+    if not employees:
+        return []
+
+    # ON CONFLICT cannot touch the same row twice in one statement; the last occurrence of an id wins.
+    # New employees get their id here so every saved row can be matched back to its input position.
+    batch: Dict[str, dict] = {}
     for emp in employees:
         data = emp.model_dump()
-        saved = await fetchrow(
-            """
+        data["id"] = data.get("id") or str(uuid4())
+        batch.pop(data["id"], None)
+        batch[data["id"]] = data
+    rows = list(batch.values())
+
+    saved = await fetch(
+        """
+        WITH saved AS (
             INSERT INTO overhead_employees (
               id, user_id, department, employee_name, role, location,
               annual_salary, allocation_percent, start_date, end_date,
               monthly_allocations, created_by, updated_by
             )
-            VALUES (
-              COALESCE(%(id)s, gen_random_uuid()), %(user_id)s, %(department)s, %(employee_name)s, %(role)s, %(location)s,
-              %(annual_salary)s, %(allocation_percent)s, %(start_date)s, %(end_date)s,
-              %(monthly_allocations)s, %(created_by)s, %(updated_by)s
+            SELECT
+              t.id, %(user_id)s, t.department, t.employee_name, t.role, t.location,
+              t.annual_salary, t.allocation_percent, t.start_date, t.end_date,
+              t.monthly_allocations, t.created_by, t.updated_by
+            FROM unnest(
+              %(ids)s::uuid[], %(departments)s::text[], %(employee_names)s::text[], %(roles)s::text[],
+              %(locations)s::text[], %(annual_salaries)s::numeric[], %(allocation_percents)s::numeric[],
+              %(start_dates)s::date[], %(end_dates)s::date[], %(monthly_allocations)s::jsonb[],
+              %(created_by)s::text[], %(updated_by)s::text[]
+            ) AS t(
+              id, department, employee_name, role,
+              location, annual_salary, allocation_percent,
+              start_date, end_date, monthly_allocations,
+              created_by, updated_by
             )
             ON CONFLICT (id) DO UPDATE SET
               department = EXCLUDED.department,
@@ -79,29 +92,31 @@ async def upsert_overhead_employees(user_id: str, employees: Sequence[OverheadEm
               monthly_allocations = EXCLUDED.monthly_allocations,
               updated_at = now(),
               updated_by = EXCLUDED.updated_by
-            RETURNING *;
-            """,
-            {
-                "id": data.get("id"),
-                "user_id": user_id,
-                "department": data.get("department"),
-                "employee_name": data.get("employee_name"),
-                "role": data.get("role"),
-                "location": data.get("location"),
-                "annual_salary": data.get("annual_salary"),
-                "allocation_percent": data.get("allocation_percent"),
-                "start_date": data.get("start_date"),
-                "end_date": data.get("end_date"),
-                "monthly_allocations": data.get("monthly_allocations") or {},
-                "created_by": data.get("created_by") or actor,
-                "updated_by": actor or data.get("updated_by") or data.get("created_by"),
-            },
+            RETURNING *
         )
-        if saved:
-            results.append(_to_employee(saved))
-    return results
+        SELECT saved.* FROM saved
+        JOIN unnest(%(ids)s::uuid[]) WITH ORDINALITY AS input(id, position) ON input.id = saved.id
+        ORDER BY input.position;
+        """,
+        {
+            "user_id": user_id,
+            "ids": [d.get("id") for d in rows],
+            "departments": [d.get("department") for d in rows],
+            "employee_names": [d.get("employee_name") for d in rows],
+            "roles": [d.get("role") for d in rows],
+            "locations": [d.get("location") for d in rows],
+            "annual_salaries": [d.get("annual_salary") for d in rows],
+            "allocation_percents": [d.get("allocation_percent") for d in rows],
+            "start_dates": [d.get("start_date") or None for d in rows],
+            "end_dates": [d.get("end_date") or None for d in rows],
+            "monthly_allocations": [json.dumps(d.get("monthly_allocations") or {}) for d in rows],
+            "created_by": [d.get("created_by") or actor for d in rows],
+            "updated_by": [actor or d.get("updated_by") or d.get("created_by") for d in rows],
+        },
+        prepare=True,
+    )
+    return [_to_employee(r) for r in saved]
 
 
 async def delete_overhead_employee(user_id: str, emp_id: str):
-    await _ensure_table()
     await execute("DELETE FROM overhead_employees WHERE user_id = %s AND id = %s", [user_id, emp_id])
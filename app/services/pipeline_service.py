@@ -1,44 +1,67 @@
+import base64
 import json
+import logging
+import re
 from calendar import monthrange
-from datetime import date, datetime
-from typing import Iterable, List, Optional, Sequence
-
-from ..core.database import execute, fetch, fetchrow
-from ..models.pipeline import PipelineChange, PipelineEntry
-from .float_service import create_float_project
-
-PIPELINE_CHANGELOG_KEY = "pipeline-changelog"
-USER_STORAGE_TABLE_SQL = """
-CREATE TABLE IF NOT EXISTS user_storage (
-  id SERIAL PRIMARY KEY,
-  user_id TEXT NOT NULL,
-  storage_key TEXT NOT NULL,
-  storage_value JSONB NOT NULL DEFAULT '{}'::jsonb,
-  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-  UNIQUE(user_id, storage_key)
-);
-"""
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from psycopg import Rollback
+
+from ..core.database import execute, fetch, fetchrow, pipeline, stream, transaction
+from ..core.http_cache import recent_xids_sql, watermark_sql
+from ..models.pipeline import (
+    DepartmentFees,
+    PipelineAnalyticsResponse,
+    PipelineChange,
+    PipelineEntry,
+    PipelineGroupTotals,
+    PipelineTotals,
+)
+from .float_service import enqueue_float_project, notify_float_outbox
+
+log = logging.getLogger(__name__)
+
+PIPELINE_PAGE_MAX_LIMIT = 500
+PIPELINE_CHANGELOG_DEFAULT_LIMIT = 100
+PIPELINE_CHANGELOG_MAX_LIMIT = 500
+PROJECT_CODE_RESERVE_MAX = 1000
+
+
+_STATUS_ALIASES = {
+    "open": "open",
+    "high pitch": "high-pitch",
+    "high-pitch": "high-pitch",
+    "medium pitch": "medium-pitch",
+    "medium-pitch": "medium-pitch",
+    "low pitch": "low-pitch",
+    "low-pitch": "low-pitch",
+    "confirmed": "confirmed",
+    "whitespace": "whitespace",
+    "cancelled": "cancelled",
+    "canceled": "cancelled",
+    "in plan": "open",
+    "in-plan": "open",
+    "planning": "open",
+}
 
 
 def _normalize_status(status: Optional[str]) -> str:
     raw = (status or "open").lower().strip()
-    mapping = {
-        "open": "open",
-        "high pitch": "high-pitch",
-        "high-pitch": "high-pitch",
-        "medium pitch": "medium-pitch",
-        "medium-pitch": "medium-pitch",
-        "low pitch": "low-pitch",
-        "low-pitch": "low-pitch",
-        "confirmed": "confirmed",
-        "whitespace": "whitespace",
-        "cancelled": "cancelled",
-        "canceled": "cancelled",
-        "in plan": "open",
-        "in-plan": "open",
-        "planning": "open",
-    }
-    return mapping.get(raw, "open")
+    return _STATUS_ALIASES.get(raw, "open")
+
+
+def normalize_status_filter(statuses: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """
+    Stored status values for a listing filter. Unlike saved entries, whose unknown statuses fall
+    back to "open", an unknown filter value raises ValueError so a typo is not read as "open".
+    """
+    if not statuses:
+        return None
+    unknown = [s for s in statuses if s.lower().strip() not in _STATUS_ALIASES]
+    if unknown:
+        raise ValueError(f"Unknown pipeline status: {', '.join(unknown)}")
+    return list(dict.fromkeys(_STATUS_ALIASES[s.lower().strip()] for s in statuses))
 
 
 def _parse_date(value: Optional[str], is_end: bool) -> Optional[str]:
@@ -192,6 +215,7 @@ def _from_db_row(row: dict) -> PipelineEntry:
         updatedByEmail=row.get("updated_by_email"),
         createdAt=row.get("created_at"),
         updatedAt=row.get("updated_at"),
+        version=row.get("row_version"),
     )
 
 
@@ -212,104 +236,443 @@ async def _project_code_exists(code: str) -> bool:
     return bool(row)
 
 
-def build_pipeline_changelog(entries: Iterable[PipelineEntry], user_email: str) -> List[PipelineChange]:
-    changes: List[PipelineChange] = []
-    for entry in entries:
-        created_date = entry.createdAt or entry.updatedAt or datetime.utcnow()
-        creator = entry.createdByEmail or entry.createdBy or user_email or "system"
-
-        # Only show a single “added” event; we intentionally skip “updated” events
-        # because consumers don't need to see Cloud SQL change noise.
-        changes.append(
-            PipelineChange(
-                type="addition",
-                projectCode=entry.projectCode,
-                projectName=entry.programName,
-                client=entry.client,
-                description="Added in Cloud SQL",
-                date=_as_iso_string(created_date),
-                user=str(creator),
-            )
-        )
+_PIPELINE_UPSERT_CONFLICT_SQL = """
+ON CONFLICT (project_code) DO UPDATE SET
+    owner = EXCLUDED.owner,
+    client = EXCLUDED.client,
+    program_name = EXCLUDED.program_name,
+    program_type = EXCLUDED.program_type,
+    region = EXCLUDED.region,
+    start_date = EXCLUDED.start_date,
+    end_date = EXCLUDED.end_date,
+    start_month = EXCLUDED.start_month,
+    end_month = EXCLUDED.end_month,
+    revenue = EXCLUDED.revenue,
+    total_fees = EXCLUDED.total_fees,
+    status = EXCLUDED.status,
+    accounts_fees = EXCLUDED.accounts_fees,
+    creative_fees = EXCLUDED.creative_fees,
+    design_fees = EXCLUDED.design_fees,
+    strategic_planning_fees = EXCLUDED.strategic_planning_fees,
+    media_fees = EXCLUDED.media_fees,
+    creator_fees = EXCLUDED.creator_fees,
+    social_fees = EXCLUDED.social_fees,
+    omni_fees = EXCLUDED.omni_fees,
+    digital_fees = EXCLUDED.digital_fees,
+    finance_fees = EXCLUDED.finance_fees,
+    updated_at = now(),
+    updated_by = EXCLUDED.updated_by
+"""
+
+PIPELINE_UPSERT_SQL = (
+    """
+INSERT INTO pipeline_opportunities (
+    project_code, owner, client, program_name, program_type, region,
+    start_date, end_date, start_month, end_month, revenue, total_fees, status,
+    accounts_fees, creative_fees, design_fees, strategic_planning_fees, media_fees,
+    creator_fees, social_fees, omni_fees, digital_fees, finance_fees,
+    created_by, updated_by
+)
+VALUES (
+    %(project_code)s, %(owner)s, %(client)s, %(program_name)s, %(program_type)s, %(region)s,
+    %(start_date)s, %(end_date)s, %(start_month)s, %(end_month)s, %(revenue)s, %(total_fees)s, %(status)s,
+    %(accounts_fees)s, %(creative_fees)s, %(design_fees)s, %(strategic_planning_fees)s, %(media_fees)s,
+    %(creator_fees)s, %(social_fees)s, %(omni_fees)s, %(digital_fees)s, %(finance_fees)s,
+    %(created_by)s, %(updated_by)s
+)
+"""
+    + _PIPELINE_UPSERT_CONFLICT_SQL
+)
+
+# Column types for the set-based upsert; every column of _to_db_row travels as one array.
+_PIPELINE_ROW_TYPES = {
+    "project_code": "text",
+    "owner": "text",
+    "client": "text",
+    "program_name": "text",
+    "program_type": "text",
+    "region": "text",
+    "start_date": "date",
+    "end_date": "date",
+    "start_month": "text",
+    "end_month": "text",
+    "revenue": "numeric",
+    "total_fees": "numeric",
+    "status": "text",
+    "accounts_fees": "numeric",
+    "creative_fees": "numeric",
+    "design_fees": "numeric",
+    "strategic_planning_fees": "numeric",
+    "media_fees": "numeric",
+    "creator_fees": "numeric",
+    "social_fees": "numeric",
+    "omni_fees": "numeric",
+    "digital_fees": "numeric",
+    "finance_fees": "numeric",
+    "created_by": "text",
+    "updated_by": "text",
+}
+
+PIPELINE_BULK_UPSERT_SQL = (
+    f"""
+INSERT INTO pipeline_opportunities ({', '.join(_PIPELINE_ROW_TYPES)})
+SELECT {', '.join(f't.{column}' for column in _PIPELINE_ROW_TYPES)}
+FROM unnest({', '.join(f'%({column})s::{kind}[]' for column, kind in _PIPELINE_ROW_TYPES.items())})
+  AS t({', '.join(_PIPELINE_ROW_TYPES)})
+ORDER BY t.project_code
+"""
+    + _PIPELINE_UPSERT_CONFLICT_SQL
+)
+
 
-    return sorted(changes, key=lambda c: c.date, reverse=True)
+async def _upsert_pipeline_rows(rows: Sequence[dict]) -> int:
+    """
+    Upsert many pipeline rows in one INSERT ... SELECT FROM unnest(...) statement, in project code
+    order. The rollup triggers then fire once for the whole batch, and concurrent bulk writes lock
+    pipeline and rollup rows in the same order.
+    """
+    if not rows:
+        return 0
+    # ON CONFLICT cannot touch the same row twice in one statement; the last entry for a code wins.
+    rows = list({row["project_code"]: row for row in rows}.values())
+    params = {
+        column: [float(row[column]) if kind == "numeric" else row[column] for row in rows]
+        for column, kind in _PIPELINE_ROW_TYPES.items()
+    }
+    return await execute(PIPELINE_BULK_UPSERT_SQL, params, prepare=True)
 
 
 async def replace_pipeline_entries(user_id: str, entries: Sequence[PipelineEntry], email: Optional[str]):
-    await _ensure_user(user_id, email)
-    for entry in entries:
-        row = _to_db_row(user_id, entry)
-        await execute(
-            """
-            INSERT INTO pipeline_opportunities (
-                project_code, owner, client, program_name, program_type, region,
-                start_date, end_date, start_month, end_month, revenue, total_fees, status,
-                accounts_fees, creative_fees, design_fees, strategic_planning_fees, media_fees,
-                creator_fees, social_fees, omni_fees, digital_fees, finance_fees,
-                created_by, updated_by
-            )
-            VALUES (
-                %(project_code)s, %(owner)s, %(client)s, %(program_name)s, %(program_type)s, %(region)s,
-                %(start_date)s, %(end_date)s, %(start_month)s, %(end_month)s, %(revenue)s, %(total_fees)s, %(status)s,
-                %(accounts_fees)s, %(creative_fees)s, %(design_fees)s, %(strategic_planning_fees)s, %(media_fees)s,
-                %(creator_fees)s, %(social_fees)s, %(omni_fees)s, %(digital_fees)s, %(finance_fees)s,
-                %(created_by)s, %(updated_by)s
+    rows = [_to_db_row(user_id, entry) for entry in entries]
+    # Pipelined: the user insert, the upsert and the delete go out without per-statement round trips
+    async with pipeline():
+        await _ensure_user(user_id, email)
+        if rows:
+            await _upsert_pipeline_rows(rows)
+            await _advance_project_code_counters(row["project_code"] for row in rows)
+            await execute(
+                "DELETE FROM pipeline_opportunities WHERE created_by = %s AND project_code <> ALL(%s)",
+                [user_id, [row["project_code"] for row in rows]],
             )
-            ON CONFLICT (project_code) DO UPDATE SET
-                owner = EXCLUDED.owner,
-                client = EXCLUDED.client,
-                program_name = EXCLUDED.program_name,
-                program_type = EXCLUDED.program_type,
-                region = EXCLUDED.region,
-                start_date = EXCLUDED.start_date,
-                end_date = EXCLUDED.end_date,
-                start_month = EXCLUDED.start_month,
-                end_month = EXCLUDED.end_month,
-                revenue = EXCLUDED.revenue,
-                total_fees = EXCLUDED.total_fees,
-                status = EXCLUDED.status,
-                accounts_fees = EXCLUDED.accounts_fees,
-                creative_fees = EXCLUDED.creative_fees,
-                design_fees = EXCLUDED.design_fees,
-                strategic_planning_fees = EXCLUDED.strategic_planning_fees,
-                media_fees = EXCLUDED.media_fees,
-                creator_fees = EXCLUDED.creator_fees,
-                social_fees = EXCLUDED.social_fees,
-                omni_fees = EXCLUDED.omni_fees,
-                digital_fees = EXCLUDED.digital_fees,
-                finance_fees = EXCLUDED.finance_fees,
-                updated_at = now(),
-                updated_by = EXCLUDED.updated_by
-            """,
-            row,
-        )
+        else:
+            await execute("DELETE FROM pipeline_opportunities WHERE created_by = %s", [user_id])
 
-    codes = [entry.projectCode for entry in entries]
-    if codes:
-        placeholders = ", ".join(["%s"] * len(codes))
-        await execute(
-            f"DELETE FROM pipeline_opportunities WHERE created_by = %s AND project_code NOT IN ({placeholders})",
-            [user_id, *codes],
-        )
-    else:
-        await execute("DELETE FROM pipeline_opportunities WHERE created_by = %s", [user_id])
+
+async def get_pipeline_version(user_id: Optional[str] = None, watermark: Optional[int] = None) -> tuple:
+    """
+    Commit-ordered version of the whole pipeline: (watermark, *state), the state being the ids of
+    the transactions at or above the watermark (default: the current snapshot xmin) that wrote or
+    deleted entries. It changes on every insert, update or delete, even one that committed after a
+    later transaction. With a user_id, also covers that user's changelog events.
+    """
+    changelog = ""
+    if user_id is not None:
+        changelog = f""",
+          (SELECT count(*) FROM pipeline_changelog WHERE user_id = %(user_id)s) AS changelog_total,
+          {recent_xids_sql("pipeline_changelog", "recorded_xid", "user_id = %(user_id)s")} AS changelog_xids"""
+    row = await fetchrow(
+        f"""
+        SELECT w.watermark::text AS watermark,
+          {recent_xids_sql("pipeline_opportunities", "row_xid")} AS pipeline_xids,
+          {recent_xids_sql("sync_tombstones", "deleted_xid", "item_type = 'pipeline'")} AS deleted_xids{changelog}
+        FROM {watermark_sql("%(watermark)s")}
+        """,
+        {"user_id": user_id, "watermark": None if watermark is None else str(watermark)},
+    )
+    return tuple(row.values()) if row else (None,)
 
 
-async def get_pipeline_entries_for_user(user_id: Optional[str]) -> List[PipelineEntry]:
+async def _row_versions(codes: Sequence[str], lock: bool = False) -> Dict[str, int]:
     rows = await fetch(
-        """
+        f"SELECT project_code, row_version FROM pipeline_opportunities WHERE project_code = ANY(%s)"
+        f"{' FOR UPDATE' if lock else ''}",
+        [list(codes)],
+    )
+    return {r["project_code"]: r["row_version"] for r in rows}
+
+
+async def apply_pipeline_delta(
+    user_id: str,
+    upserts: Sequence[PipelineEntry],
+    deletes: Sequence[str],
+    email: Optional[str],
+    base_versions: Mapping[str, int],
+) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Apply only the changed/added/removed entries in one transaction. Every touched code with an
+    expected row_version (`base_versions`, else the upserted entry's `version`; 0 = must not exist)
+    is compared with the locked row, and any mismatch is a conflict: nothing is written.
+    Returns (conflicting project codes, row versions) — the new versions of the upserted rows,
+    or the current versions of the conflicting ones.
+    """
+    # One write per code: a second upsert of the same row would bump its version twice
+    rows = list({row["project_code"]: row for row in (_to_db_row(user_id, entry) for entry in upserts)}.values())
+    expected = {entry.projectCode: entry.version for entry in upserts if entry.version is not None}
+    expected.update(base_versions)
+    codes = [row["project_code"] for row in rows] + [code for code in deletes if code]
+    checked = [code for code in dict.fromkeys(codes) if code in expected]
+
+    conflicts: List[str] = []
+    versions: Dict[str, int] = {}
+    async with transaction():
+        if checked:
+            current = await _row_versions(checked, lock=True)
+            conflicts = [code for code in checked if current.get(code, 0) != expected[code]]
+            if conflicts:
+                return conflicts, {code: current.get(code, 0) for code in conflicts}
+
+        async with pipeline():
+            if rows:
+                await _ensure_user(user_id, email)
+                await _upsert_pipeline_rows(rows)
+                await _advance_project_code_counters(row["project_code"] for row in rows)
+            if deletes:
+                await execute(
+                    "DELETE FROM pipeline_opportunities WHERE created_by = %s AND project_code = ANY(%s)",
+                    [user_id, list(deletes)],
+                )
+        versions = await _row_versions([row["project_code"] for row in rows])
+        # A row expected not to exist may have been inserted by another writer after the check
+        # (there was nothing to lock); the upsert then updated it instead of creating version 1.
+        conflicts = [code for code in checked if code in versions and versions[code] != expected[code] + 1]
+        if conflicts:
+            versions = {code: versions[code] - 1 for code in conflicts}
+            raise Rollback()
+    return conflicts, versions
+
+
+async def get_pipeline_entries_for_user(
+    user_id: Optional[str], changed_since: Optional[int] = None
+) -> List[PipelineEntry]:
+    """Every entry, or with `changed_since` (a sync watermark) those written by transactions at or after it."""
+    where = "WHERE po.row_xid >= %s::xid8" if changed_since is not None else ""
+    rows = await fetch(
+        f"""
         SELECT po.*,
                cu.email AS created_by_email,
                uu.email AS updated_by_email
         FROM pipeline_opportunities po
         LEFT JOIN users cu ON cu.id = po.created_by
         LEFT JOIN users uu ON uu.id = po.updated_by
+        {where}
         ORDER BY po.created_at DESC, po.project_code DESC
-        """
+        """,
+        [str(changed_since)] if changed_since is not None else None,
     )
     return [_from_db_row(r) for r in rows]
 
 
+def _encode_cursor(created_at: datetime, project_code: str) -> str:
+    """created_at is NOT NULL (migrations/0010), so every row can end a page."""
+    raw = json.dumps([created_at.isoformat(), project_code])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, project_code = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(project_code)
+    except Exception as exc:
+        raise ValueError("Invalid pipeline cursor") from exc
+
+
+# Changelog sources, in their newest-first order for equal (changed_at, project_code): recorded
+# events (tie-broken by pipeline_changelog.id) come before the derived addition (one per code).
+CHANGELOG_SOURCE_ADDITION = 0
+CHANGELOG_SOURCE_RECORDED = 1
+
+
+def _encode_changelog_cursor(changed_at: datetime, project_code: str, source: int, event_id: int) -> str:
+    raw = json.dumps([changed_at.isoformat(), project_code, source, event_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_changelog_cursor(cursor: str) -> Tuple[datetime, str, int, int]:
+    """Also accepts the older two-element cursors, which behave like an addition position."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        changed_at, project_code, *tiebreak = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        source, event_id = (int(tiebreak[0]), int(tiebreak[1])) if tiebreak else (CHANGELOG_SOURCE_ADDITION, 0)
+        return datetime.fromisoformat(changed_at), str(project_code), source, event_id
+    except Exception as exc:
+        raise ValueError("Invalid pipeline cursor") from exc
+
+
+def _pipeline_filters(
+    statuses: Optional[Sequence[str]],
+    client: Optional[str],
+    owner: Optional[str],
+    region: Optional[str],
+    date_from: Optional[date],
+    date_to: Optional[date],
+) -> Tuple[List[str], List[object]]:
+    """WHERE clauses and params for the pipeline listing filters (shared by paging and export)."""
+    clauses: List[str] = []
+    params: List[object] = []
+    if statuses:
+        clauses.append("po.status = ANY(%s)")
+        params.append(normalize_status_filter(statuses))
+    if client:
+        clauses.append("po.client = %s")
+        params.append(client)
+    if owner:
+        clauses.append("po.owner = %s")
+        params.append(owner)
+    if region:
+        clauses.append("po.region = %s")
+        params.append(region)
+    if date_from:
+        clauses.append("(po.end_date IS NULL OR po.end_date >= %s)")
+        params.append(date_from)
+    if date_to:
+        clauses.append("(po.start_date IS NULL OR po.start_date <= %s)")
+        params.append(date_to)
+    return clauses, params
+
+
+async def get_pipeline_page(
+    *,
+    statuses: Optional[Sequence[str]] = None,
+    client: Optional[str] = None,
+    owner: Optional[str] = None,
+    region: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Tuple[List[PipelineEntry], Optional[str]]:
+    """
+    Keyset-paginated pipeline listing ordered by (created_at, project_code) descending.
+    Date filters match entries whose start/end window overlaps [date_from, date_to].
+    Returns the page and an opaque cursor for the next page (None on the last page).
+    Without a limit, every entry after the cursor is returned in one page.
+    """
+    if limit is not None:
+        limit = max(1, min(limit, PIPELINE_PAGE_MAX_LIMIT))
+    clauses, params = _pipeline_filters(statuses, client, owner, region, date_from, date_to)
+    if cursor:
+        clauses.append("(po.created_at, po.project_code) < (%s, %s)")
+        params.extend(_decode_cursor(cursor))
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = await fetch(
+        f"""
+        SELECT po.*,
+               cu.email AS created_by_email,
+               uu.email AS updated_by_email
+        FROM pipeline_opportunities po
+        LEFT JOIN users cu ON cu.id = po.created_by
+        LEFT JOIN users uu ON uu.id = po.updated_by
+        {where}
+        ORDER BY po.created_at DESC, po.project_code DESC
+        {"LIMIT %s" if limit is not None else ""}
+        """,
+        [*params, limit + 1] if limit is not None else params,
+    )
+
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last["created_at"], last["project_code"])
+    return [_from_db_row(r) for r in rows], next_cursor
+
+
+# One pass over the trigger-maintained rollup (migrations/0007): GROUPING() tells the sets apart,
+# bit 4 = status, 2 = client, 1 = month, set when that column is aggregated away.
+PIPELINE_ROLLUP_SQL = """
+SELECT GROUPING(status, client, month) AS grouping_id,
+       NULLIF(status, '') AS status, client, NULLIF(month, '') AS month,
+       SUM(project_count)::bigint AS project_count, SUM(revenue) AS revenue, SUM(total_fees) AS total_fees
+FROM pipeline_rollup
+WHERE project_count <> 0
+GROUP BY GROUPING SETS ((), (status), (client), (month))
+"""
+_ROLLUP_KEYS = {3: "status", 5: "client", 6: "month"}
+
+
+def _rollup_totals(row: dict) -> dict:
+    count = row.get("project_count") or 0
+    revenue = float(row.get("revenue") or 0)
+    return {
+        "projectCount": count,
+        "revenue": revenue,
+        "totalFees": float(row.get("total_fees") or 0),
+        "avgRevenue": revenue / count if count else 0,
+    }
+
+
+async def get_pipeline_analytics() -> PipelineAnalyticsResponse:
+    """
+    Dashboard totals by status, client, start month and department. Reads the rollup tables
+    kept current by triggers on pipeline_opportunities, so the cost does not grow with the pipeline.
+    """
+    rows = await fetch(PIPELINE_ROLLUP_SQL)
+    departments = await fetch(
+        """
+        SELECT department, SUM(fees) AS fees, SUM(projects_with_fees)::bigint AS projects_with_fees
+        FROM pipeline_department_rollup
+        GROUP BY department
+        ORDER BY fees DESC, department
+        """
+    )
+
+    totals = PipelineTotals()
+    groups = {name: [] for name in _ROLLUP_KEYS.values()}
+    for row in rows:
+        name = _ROLLUP_KEYS.get(row["grouping_id"])
+        if name is None:
+            totals = PipelineTotals(**_rollup_totals(row))
+        else:
+            groups[name].append(PipelineGroupTotals(key=row.get(name), **_rollup_totals(row)))
+
+    return PipelineAnalyticsResponse(
+        totals=totals,
+        byStatus=sorted(groups["status"], key=lambda group: -group.projectCount),
+        byClient=sorted(groups["client"], key=lambda group: -group.revenue),
+        # Chronological; entries without a start date last
+        byMonth=sorted(groups["month"], key=lambda group: (group.key is None, group.key or "")),
+        byDepartment=[
+            DepartmentFees(
+                department=row["department"],
+                fees=float(row.get("fees") or 0),
+                projectsWithFees=row.get("projects_with_fees") or 0,
+            )
+            for row in departments
+        ],
+    )
+
+
+async def stream_pipeline_entries(
+    *,
+    statuses: Optional[Sequence[str]] = None,
+    client: Optional[str] = None,
+    owner: Optional[str] = None,
+    region: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> AsyncIterator[PipelineEntry]:
+    """Every matching entry in listing order, read through a server-side cursor for exports."""
+    clauses, params = _pipeline_filters(statuses, client, owner, region, date_from, date_to)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    async for row in stream(
+        f"""
+        SELECT po.*,
+               cu.email AS created_by_email,
+               uu.email AS updated_by_email
+        FROM pipeline_opportunities po
+        LEFT JOIN users cu ON cu.id = po.created_by
+        LEFT JOIN users uu ON uu.id = po.updated_by
+        {where}
+        ORDER BY po.created_at DESC, po.project_code DESC
+        """,
+        params,
+    ):
+        yield _from_db_row(row)
+
+
 async def create_pipeline_entry(user_id: str, entry: PipelineEntry, email: Optional[str]) -> PipelineEntry:
     """
     Insert a pipeline entry without overwriting an existing project_code.
@@ -317,95 +680,66 @@ async def create_pipeline_entry(user_id: str, entry: PipelineEntry, email: Optio
     """
     await _ensure_user(user_id, email)
 
-    # Ensure the entry carries a project code and that it is unique
+    # Allocate from the per-year counter unless the caller supplied a code; a taken code falls through to allocation below.
     target_year = _extract_year_from_code(entry.projectCode)
-    if not entry.projectCode or await _project_code_exists(entry.projectCode):
-        entry.projectCode = await get_next_project_code(target_year)
+    supplied_code = entry.projectCode
+    if not entry.projectCode:
+        entry.projectCode = (await reserve_project_codes(target_year))[0]
 
     attempt = 0
-    while attempt < 5:
-        row = _to_db_row(user_id, entry)
-        saved = await fetchrow(
-            """
-            INSERT INTO pipeline_opportunities (
-                project_code, owner, client, program_name, program_type, region,
-                start_date, end_date, start_month, end_month, revenue, total_fees, status,
-                accounts_fees, creative_fees, design_fees, strategic_planning_fees, media_fees,
-                creator_fees, social_fees, omni_fees, digital_fees, finance_fees,
-                created_by, updated_by
-            )
-            VALUES (
-                %(project_code)s, %(owner)s, %(client)s, %(program_name)s, %(program_type)s, %(region)s,
-                %(start_date)s, %(end_date)s, %(start_month)s, %(end_month)s, %(revenue)s, %(total_fees)s, %(status)s,
-                %(accounts_fees)s, %(creative_fees)s, %(design_fees)s, %(strategic_planning_fees)s, %(media_fees)s,
-                %(creator_fees)s, %(social_fees)s, %(omni_fees)s, %(digital_fees)s, %(finance_fees)s,
-                %(created_by)s, %(updated_by)s
+    saved_entry: Optional[PipelineEntry] = None
+    async with transaction():
+        while attempt < 5:
+            row = _to_db_row(user_id, entry)
+            saved = await fetchrow(
+                """
+                INSERT INTO pipeline_opportunities (
+                    project_code, owner, client, program_name, program_type, region,
+                    start_date, end_date, start_month, end_month, revenue, total_fees, status,
+                    accounts_fees, creative_fees, design_fees, strategic_planning_fees, media_fees,
+                    creator_fees, social_fees, omni_fees, digital_fees, finance_fees,
+                    created_by, updated_by
+                )
+                VALUES (
+                    %(project_code)s, %(owner)s, %(client)s, %(program_name)s, %(program_type)s, %(region)s,
+                    %(start_date)s, %(end_date)s, %(start_month)s, %(end_month)s, %(revenue)s, %(total_fees)s, %(status)s,
+                    %(accounts_fees)s, %(creative_fees)s, %(design_fees)s, %(strategic_planning_fees)s, %(media_fees)s,
+                    %(creator_fees)s, %(social_fees)s, %(omni_fees)s, %(digital_fees)s, %(finance_fees)s,
+                    %(created_by)s, %(updated_by)s
+                )
+                ON CONFLICT (project_code) DO NOTHING
+                RETURNING *
+                """,
+                row,
             )
-            ON CONFLICT (project_code) DO NOTHING
-            RETURNING *
-            """,
-            row,
-        )
-        if saved:
-            saved_entry = _from_db_row(saved)
-            await create_float_project(saved_entry)
-            return saved_entry
+            if saved:
+                saved_entry = _from_db_row(saved)
+                # Queued in the same transaction; the outbox worker talks to Float after commit.
+                await enqueue_float_project(saved_entry)
+                break
+
+            # The code is taken (supplied by the caller or written by a bulk/delta save); move the
+            # counter past every existing code before allocating, so the retry doesn't walk into the next one.
+            await _reseed_project_code_counter(target_year)
+            entry.projectCode = (await reserve_project_codes(target_year))[0]
+            attempt += 1
 
-        # If we reach here, the code was taken in the meantime; bump to the next one and retry.
-        entry.projectCode = await get_next_project_code(target_year)
-        attempt += 1
+        if saved_entry and saved_entry.projectCode == supplied_code:
+            await _advance_project_code_counters([supplied_code])
+
+    if saved_entry:
+        notify_float_outbox()
+        return saved_entry
 
     raise RuntimeError("Failed to create a unique project code for the pipeline entry after multiple attempts")
 
 
 async def upsert_pipeline_entry(user_id: str, entry: PipelineEntry, email: Optional[str]) -> PipelineEntry:
-    await _ensure_user(user_id, email)
     row = _to_db_row(user_id, entry)
-    saved = await fetchrow(
-        """
-        INSERT INTO pipeline_opportunities (
-            project_code, owner, client, program_name, program_type, region,
-            start_date, end_date, start_month, end_month, revenue, total_fees, status,
-            accounts_fees, creative_fees, design_fees, strategic_planning_fees, media_fees,
-            creator_fees, social_fees, omni_fees, digital_fees, finance_fees,
-            created_by, updated_by
-        )
-        VALUES (
-            %(project_code)s, %(owner)s, %(client)s, %(program_name)s, %(program_type)s, %(region)s,
-            %(start_date)s, %(end_date)s, %(start_month)s, %(end_month)s, %(revenue)s, %(total_fees)s, %(status)s,
-            %(accounts_fees)s, %(creative_fees)s, %(design_fees)s, %(strategic_planning_fees)s, %(media_fees)s,
-            %(creator_fees)s, %(social_fees)s, %(omni_fees)s, %(digital_fees)s, %(finance_fees)s,
-            %(created_by)s, %(updated_by)s
-        )
-        ON CONFLICT (project_code) DO UPDATE SET
-            owner = EXCLUDED.owner,
-            client = EXCLUDED.client,
-            program_name = EXCLUDED.program_name,
-            program_type = EXCLUDED.program_type,
-            region = EXCLUDED.region,
-            start_date = EXCLUDED.start_date,
-            end_date = EXCLUDED.end_date,
-            start_month = EXCLUDED.start_month,
-            end_month = EXCLUDED.end_month,
-            revenue = EXCLUDED.revenue,
-            total_fees = EXCLUDED.total_fees,
-            status = EXCLUDED.status,
-            accounts_fees = EXCLUDED.accounts_fees,
-            creative_fees = EXCLUDED.creative_fees,
-            design_fees = EXCLUDED.design_fees,
-            strategic_planning_fees = EXCLUDED.strategic_planning_fees,
-            media_fees = EXCLUDED.media_fees,
-            creator_fees = EXCLUDED.creator_fees,
-            social_fees = EXCLUDED.social_fees,
-            omni_fees = EXCLUDED.omni_fees,
-            digital_fees = EXCLUDED.digital_fees,
-            finance_fees = EXCLUDED.finance_fees,
-            updated_at = now(),
-            updated_by = EXCLUDED.updated_by
-        RETURNING *
-        """,
-        row,
-    )
+    async with pipeline():
+        await _ensure_user(user_id, email)
+        saved = await fetchrow(PIPELINE_UPSERT_SQL + "RETURNING *", row, prepare=True)
+        await _advance_project_code_counters([row["project_code"]])
     if not saved:
         raise RuntimeError("Failed to upsert pipeline entry")
     return _from_db_row(saved)
@@ -420,40 +754,142 @@ async def update_existing_pipeline_entry(user_id: str, entry: PipelineEntry, ema
     return await upsert_pipeline_entry(user_id, entry, email)
 
 
-async def _append_changelog_entry(user_id: str, entry: PipelineChange):
+def _change_timestamp(value: Optional[str]) -> Optional[datetime]:
+    parsed = _to_datetime(value)
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def record_pipeline_changes(user_id: str, changes: Sequence[PipelineChange]) -> int:
     """
-    Persist changelog entries into user_storage to keep deletions visible to clients.
-    Uses existing user_storage table; no schema changes required.
+    Append changelog events in one INSERT. The table is append-only; re-sending an
+    event that is already recorded (same type, project and timestamp) is a no-op.
     """
+    if not changes:
+        return 0
+    return await execute(
+        """
+        INSERT INTO pipeline_changelog (
+          user_id, change_type, project_code, project_name, client, description, changed_by, changed_at
+        )
+        SELECT %(user_id)s, t.change_type, t.project_code, t.project_name, t.client,
+               COALESCE(t.description, ''), t.changed_by, COALESCE(t.changed_at, now())
+        FROM unnest(
+          %(types)s::text[], %(codes)s::text[], %(names)s::text[], %(clients)s::text[],
+          %(descriptions)s::text[], %(users)s::text[], %(dates)s::timestamptz[]
+        ) AS t(change_type, project_code, project_name, client, description, changed_by, changed_at)
+        ON CONFLICT (user_id, change_type, project_code, changed_at) DO NOTHING
+        """,
+        {
+            "user_id": user_id,
+            "types": [c.type for c in changes],
+            "codes": [c.projectCode for c in changes],
+            "names": [c.projectName for c in changes],
+            "clients": [c.client for c in changes],
+            "descriptions": [c.description for c in changes],
+            "users": [c.user for c in changes],
+            "dates": [_change_timestamp(c.date) for c in changes],
+        },
+    )
+
+
+async def _append_changelog_entry(user_id: str, entry: PipelineChange):
+    """Persist a changelog event; failures never block the operation being logged."""
     try:
-        # Ensure storage table exists (defensive for new deployments)
-        await execute(USER_STORAGE_TABLE_SQL)
+        await record_pipeline_changes(user_id, [entry])
+    except Exception:
+        log.exception("Failed to record %s changelog event for %s", entry.type, entry.projectCode)
 
-        row = await fetchrow(
-            "SELECT storage_value FROM user_storage WHERE user_id = %s AND storage_key = %s",
-            [user_id, PIPELINE_CHANGELOG_KEY],
-        )
-        current = []
-        if row and row.get("storage_value"):
-            raw = row["storage_value"]
-            if isinstance(raw, str):
-                current = json.loads(raw)
-            else:
-                current = raw
-        current = current if isinstance(current, list) else []
-        current.insert(0, entry.model_dump(mode="json"))
-        await execute(
-            """
-            INSERT INTO user_storage (user_id, storage_key, storage_value)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (user_id, storage_key)
-            DO UPDATE SET storage_value = EXCLUDED.storage_value, updated_at = now()
-            """,
-            [user_id, PIPELINE_CHANGELOG_KEY, json.dumps(current)],
+
+async def clear_pipeline_changelog(user_id: str):
+    await execute("DELETE FROM pipeline_changelog WHERE user_id = %s", [user_id])
+
+
+async def get_pipeline_changelog(
+    user_id: str,
+    fallback_user: Optional[str],
+    *,
+    limit: int = PIPELINE_CHANGELOG_DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    since: Optional[int] = None,
+) -> Tuple[List[PipelineChange], Optional[str]]:
+    """
+    Newest-first changelog page: "addition" events derived from pipeline rows merged with
+    the user's recorded events (deletions, client-sent entries). Each side is a bounded
+    index scan of at most limit + 1 rows, so cost does not grow with history.
+    `since` (a sync watermark) restricts to entries created/recorded by transactions at or after it.
+    """
+    limit = max(1, min(limit, PIPELINE_CHANGELOG_MAX_LIMIT))
+    params: dict = {
+        "user_id": user_id,
+        "fallback": fallback_user or "system",
+        "limit": limit + 1,
+        "addition": CHANGELOG_SOURCE_ADDITION,
+        "recorded": CHANGELOG_SOURCE_RECORDED,
+    }
+    additions: List[str] = []
+    recorded_filter = ""
+    if cursor:
+        params["before_at"], params["before_code"], source, params["before_id"] = _decode_changelog_cursor(cursor)
+        if source == CHANGELOG_SOURCE_RECORDED:
+            # The addition with the same (changed_at, project_code) sorts after every recorded event
+            additions.append("(po.created_at, po.project_code) <= (%(before_at)s, %(before_code)s)")
+            recorded_filter += " AND (changed_at, project_code, id) < (%(before_at)s, %(before_code)s, %(before_id)s)"
+        else:
+            additions.append("(po.created_at, po.project_code) < (%(before_at)s, %(before_code)s)")
+            recorded_filter += " AND (changed_at, project_code) < (%(before_at)s, %(before_code)s)"
+    if since is not None:
+        params["since"] = str(since)
+        additions.append("po.created_xid >= %(since)s::xid8")
+        recorded_filter += " AND recorded_xid >= %(since)s::xid8"
+    additions_where = f"WHERE {' AND '.join(additions)}" if additions else ""
+
+    rows = await fetch(
+        f"""
+        SELECT * FROM (
+            (SELECT 'addition' AS change_type, po.project_code, po.program_name AS project_name, po.client,
+                    'Added in Cloud SQL' AS description, po.created_at AS changed_at,
+                    COALESCE(cu.email, po.created_by, %(fallback)s) AS changed_by,
+                    %(addition)s::int AS source, 0::bigint AS event_id
+             FROM pipeline_opportunities po
+             LEFT JOIN users cu ON cu.id = po.created_by
+             {additions_where}
+             ORDER BY po.created_at DESC, po.project_code DESC
+             LIMIT %(limit)s)
+            UNION ALL
+            (SELECT change_type, project_code, project_name, client, description, changed_at, changed_by,
+                    %(recorded)s::int AS source, id AS event_id
+             FROM pipeline_changelog
+             WHERE user_id = %(user_id)s{recorded_filter}
+             ORDER BY changed_at DESC, project_code DESC, id DESC
+             LIMIT %(limit)s)
+        ) changes
+        ORDER BY changed_at DESC, project_code DESC, source DESC, event_id DESC
+        LIMIT %(limit)s
+        """,
+        params,
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = [
+        PipelineChange(
+            type=r["change_type"],
+            projectCode=r["project_code"],
+            projectName=r.get("project_name"),
+            client=r.get("client"),
+            description=r.get("description") or "",
+            date=_as_iso_string(r.get("changed_at")),
+            user=str(r.get("changed_by") or "system"),
         )
-    except Exception:
-        # Fail silently; deletion should not be blocked by changelog persistence.
-        return
+        for r in rows
+    ]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = _encode_changelog_cursor(last["changed_at"], last["project_code"], last["source"], last["event_id"])
+    return changes, next_cursor
 
 
 async def delete_pipeline_entry(project_code: str, user_id: str, user_email: Optional[str]):
@@ -479,7 +915,120 @@ async def delete_pipeline_entry(project_code: str, user_id: str, user_email: Opt
         await _append_changelog_entry(user_id, deletion_log)
 
 
+def _validate_year(year: str) -> str:
+    if not (isinstance(year, str) and len(year) == 2 and year.isdigit()):
+        raise ValueError("year must be a 2-digit string, e.g. '25'")
+    return year
+
+
+PROJECT_CODE_RE = re.compile(r"^P([0-9]{4,})-([0-9]{2})$")
+
+
+def _format_project_code(number: int, year: str) -> str:
+    return f"P{str(number).zfill(4)}-{year}"
+
+
+async def reserve_project_codes(year: str, count: int = 1) -> List[str]:
+    """
+    Atomically hand out `count` consecutive project codes for `year`.
+    Steady state is a single UPDATE ... RETURNING on the per-year counter row; the first
+    allocation of a year seeds the counter from the highest existing code.
+    """
+    _validate_year(year)
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    row = await fetchrow(
+        """
+        UPDATE project_code_counters
+        SET last_value = last_value + %s, updated_at = now()
+        WHERE year = %s
+        RETURNING last_value
+        """,
+        [count, year],
+    )
+    if not row:
+        row = await fetchrow(
+            """
+            INSERT INTO project_code_counters AS c (year, last_value)
+            SELECT %(year)s,
+                   COALESCE(max(substring(project_code FROM 2 FOR length(project_code) - 4)::int), 0) + %(count)s
+            FROM pipeline_opportunities
+            WHERE project_code ~ ('^P[0-9]{4,}-' || %(year)s || '$')
+            ON CONFLICT (year) DO UPDATE SET last_value = c.last_value + %(count)s, updated_at = now()
+            RETURNING last_value
+            """,
+            {"year": year, "count": count},
+        )
+    last_value = row["last_value"]
+    return [_format_project_code(n, year) for n in range(last_value - count + 1, last_value + 1)]
+
+
+def _code_counter_values(codes: Iterable[Optional[str]]) -> Dict[str, int]:
+    """Highest numeric part per year among well-formed codes (P0042-25 -> {"25": 42})."""
+    highest: Dict[str, int] = {}
+    for code in codes:
+        match = PROJECT_CODE_RE.match(code or "")
+        if match:
+            year, number = match.group(2), int(match.group(1))
+            highest[year] = max(highest.get(year, 0), number)
+    return highest
+
+
+async def _advance_project_code_counters(codes: Iterable[Optional[str]]):
+    """
+    Keep the per-year counters at or ahead of codes written by the caller (create with a code,
+    upsert, bulk replace, delta) so later allocations don't collide with them. Counters already
+    ahead are filtered out before ON CONFLICT, so the common case takes no row lock; a missing
+    counter is seeded from the highest existing code, as in reserve_project_codes.
+    """
+    highest = _code_counter_values(codes)
+    if not highest:
+        return
+    years = sorted(highest)
+    await execute(
+        """
+        INSERT INTO project_code_counters AS c (year, last_value)
+        SELECT v.year,
+               CASE WHEN k.year IS NULL THEN GREATEST(v.last_value, COALESCE((
+                   SELECT max(substring(project_code FROM 2 FOR length(project_code) - 4)::int)
+                   FROM pipeline_opportunities
+                   WHERE project_code ~ ('^P[0-9]{4,}-' || v.year || '$')
+               ), 0)) ELSE v.last_value END
+        FROM unnest(%s::text[], %s::int[]) AS v(year, last_value)
+        LEFT JOIN project_code_counters k ON k.year = v.year
+        WHERE k.year IS NULL OR k.last_value < v.last_value
+        ORDER BY v.year
+        ON CONFLICT (year) DO UPDATE SET last_value = GREATEST(c.last_value, EXCLUDED.last_value), updated_at = now()
+        """,
+        [years, [highest[year] for year in years]],
+    )
+
+
+async def _reseed_project_code_counter(year: str):
+    """Move the counter past the highest existing code for `year` (after an allocated code turned out taken)."""
+    await execute(
+        """
+        UPDATE project_code_counters
+        SET last_value = GREATEST(last_value, COALESCE((
+                SELECT max(substring(project_code FROM 2 FOR length(project_code) - 4)::int)
+                FROM pipeline_opportunities
+                WHERE project_code ~ ('^P[0-9]{4,}-' || %(year)s || '$')
+            ), 0)),
+            updated_at = now()
+        WHERE year = %(year)s
+        """,
+        {"year": year},
+    )
+
+
 async def get_next_project_code(year: str) -> str:
+    """Preview the next code for `year` without reserving it."""
+    _validate_year(year)
+    counter = await fetchrow("SELECT last_value FROM project_code_counters WHERE year = %s", [year])
+    if counter:
+        return _format_project_code(counter["last_value"] + 1, year)
+
     row = await fetchrow(
         """
         SELECT project_code FROM pipeline_opportunities
@@ -497,4 +1046,4 @@ async def get_next_project_code(year: str) -> str:
         num = int(prefix) + 1
     except ValueError:
         num = 1
-    return f"P{str(num).zfill(4)}-{year}"
+    return _format_project_code(num, year)
@@ -1,9 +1,16 @@
+import hashlib
 import json
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Sequence
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
 
-from ..core.database import execute, fetch
+from psycopg import Rollback
+
+from ..core.database import execute, fetch, fetchrow, pipeline, stream, transaction
+from ..core.http_cache import recent_xids_sql, watermark_sql
 from ..models.quote import QuotePayload
+from ..models.rate_card import RateCardLineItem
+from .rate_card_service import price_line_items, rate_card_version, resolve_rate_card
 
 
 def _normalize_date(value: Any) -> Optional[str]:
@@ -16,6 +23,14 @@ def _normalize_date(value: Any) -> Optional[str]:
         return None
 
 
+QUOTES_PAGE_MAX_LIMIT = 500
+QUOTE_SEARCH_DEFAULT_LIMIT = 50
+
+# The stored quote as returned to clients, with the row's write counter as `version` (sent back
+# with delta upserts so the server can detect conflicting writes).
+QUOTE_DOCUMENT_SQL = "COALESCE(full_quote, '{}'::jsonb) || jsonb_build_object('version', row_version)"
+
+
 async def _ensure_user(user_id: str, email: Optional[str]):
     safe_email = email or f"{user_id}@placeholder.local"
     await execute(
@@ -42,101 +57,496 @@ def parse_quotes_value(value: Any) -> List[Dict[str, Any]]:
     return []
 
 
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _number(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Priced phase subtotals keyed by a hash of (rate card index version, rate card, phase content), so a
+# save only re-prices the phases that were edited (or all of them after a rate card reload).
+PHASE_CACHE_SIZE = 4096
+_phase_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def _resource_hours(resource: Dict[str, Any]) -> float:
+    hours = _number(resource.get("hours"))
+    if hours is None:
+        per_week, weeks = _number(resource.get("hoursPerWeek")), _number(resource.get("weeks"))
+        hours = per_week * weeks if per_week is not None and weeks is not None else 0
+    return hours
+
+
+def _phase_resources(phase: Dict[str, Any]) -> Iterator[RateCardLineItem]:
+    """
+    Line items of a phase: its `resources`, each with `department`, `role` and `hours` (or
+    hoursPerWeek × weeks). The same `$[*].resources[*].role` path feeds the `resource_roles`
+    search column (migrations/0009); a resource without a department is priced as unmatched.
+    """
+    for resource in phase.get("resources") or []:
+        if isinstance(resource, dict) and resource.get("role"):
+            yield RateCardLineItem.model_construct(
+                department=str(resource.get("department") or ""),
+                role=str(resource["role"]),
+                hours=_resource_hours(resource),
+                rateCard=None,
+            )
+
+
+def _cost_phase(index: int, phase: Dict[str, Any], rate_card: str) -> Dict[str, Any]:
+    name = phase.get("name") or phase.get("phaseName") or phase.get("id") or f"Phase {index + 1}"
+    key = hashlib.sha256(
+        json.dumps([rate_card_version(), rate_card, phase], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    cached = _phase_cache.get(key)
+    if cached is not None:
+        _phase_cache.move_to_end(key)
+        return {"name": str(name), **cached}
+
+    items = list(_phase_resources(phase))
+    priced = price_line_items(items, rate_card)
+    subtotal = {
+        "hours": round(sum(item.hours for item in items), 2),
+        "cost": priced["total"],
+        "unmatched": len(priced["unmatched"]),
+    }
+    _phase_cache[key] = subtotal
+    while len(_phase_cache) > PHASE_CACHE_SIZE:
+        _phase_cache.popitem(last=False)
+    return {"name": str(name), **subtotal}
+
+
+def compute_quote_totals(phases: Any, rate_card: Optional[str], client: Optional[str]) -> Dict[str, Any]:
+    """
+    Price every phase's resources against the quote's rate card (else the client's, else Blended)
+    in one walk. Unchanged phases come from the per-phase cache.
+    """
+    card = resolve_rate_card(rate_card, client)
+    phase_totals = [
+        _cost_phase(index, phase, card) for index, phase in enumerate(phases or []) if isinstance(phase, dict)
+    ]
+    return {
+        "rateCard": card,
+        "totalHours": round(sum(phase["hours"] for phase in phase_totals), 2),
+        "totalCost": round(sum(phase["cost"] for phase in phase_totals), 2),
+        "unmatchedItems": sum(phase["unmatched"] for phase in phase_totals),
+        "phases": phase_totals,
+    }
+
+
+def _quote_row(user_id: str, quote: QuotePayload) -> Dict[str, Any]:
+    data = quote.model_dump()
+    data.pop("version", None)  # Overlaid from row_version on read
+    project = data.get("project", {}) or {}
+    project_number = data.get("projectNumber") or project.get("projectNumber") or ""
+    rate_card = _text(project.get("rateCard") or data.get("rateCard"))
+    totals = compute_quote_totals(project.get("phases"), rate_card, data.get("clientName"))
+    # Returned with the quote so consumers read the server's figures instead of re-deriving them
+    data["computedTotals"] = totals
+    return {
+        "quote_uid": data.get("id") or f"{project_number or 'quote'}-{user_id}",
+        "project_number": _text(project_number),
+        "client_name": _text(data.get("clientName") or ""),
+        "client_category": _text(project.get("clientCategory") or data.get("clientCategory") or ""),
+        "brand": _text(data.get("brand") or ""),
+        "project_name": _text(data.get("projectName") or ""),
+        "brief_date": _normalize_date(project.get("briefDate") or data.get("briefDate")),
+        "in_market_date": _normalize_date(project.get("inMarketDate") or data.get("inMarketDate")),
+        "project_completion_date": _normalize_date(project.get("projectCompletionDate") or data.get("projectCompletionDate")),
+        "total_program_budget": _number(project.get("totalProgramBudget") or data.get("totalRevenue")),
+        "rate_card": rate_card,
+        "currency": _text(data.get("currency") or project.get("currency") or "CAD"),
+        "phases": json.dumps(project.get("phases") or []),
+        "phase_settings": json.dumps(project.get("phaseSettings") or {}),
+        "status": _text(data.get("status") or "draft"),
+        "computed_total_hours": totals["totalHours"],
+        "computed_total_cost": totals["totalCost"],
+        "computed_phase_totals": json.dumps(totals["phases"]),
+        "full_quote": json.dumps(data),
+    }
+
+
+async def _upsert_quote_rows(user_id: str, rows: Sequence[Dict[str, Any]]) -> int:
+    """Upsert many quote rows in one INSERT ... SELECT FROM unnest(...) statement."""
+    if not rows:
+        return 0
+    # ON CONFLICT cannot touch the same row twice in one statement; the last quote with a uid wins.
+    rows = list({row["quote_uid"]: row for row in rows}.values())
+    return await execute(
+        """
+        INSERT INTO quotes (
+          quote_uid,
+          project_number,
+          client_name,
+          client_category,
+          brand,
+          project_name,
+          brief_date,
+          in_market_date,
+          project_completion_date,
+          total_program_budget,
+          rate_card,
+          currency,
+          phases,
+          phase_settings,
+          status,
+          computed_total_hours,
+          computed_total_cost,
+          computed_phase_totals,
+          created_by,
+          updated_by,
+          full_quote
+        )
+        SELECT
+          t.quote_uid, t.project_number, t.client_name, t.client_category, t.brand,
+          t.project_name, t.brief_date, t.in_market_date, t.project_completion_date,
+          t.total_program_budget, t.rate_card, t.currency, t.phases, t.phase_settings,
+          t.status, t.computed_total_hours, t.computed_total_cost, t.computed_phase_totals,
+          %(user_id)s, %(user_id)s, t.full_quote
+        FROM unnest(
+          %(quote_uid)s::text[], %(project_number)s::text[], %(client_name)s::text[], %(client_category)s::text[],
+          %(brand)s::text[], %(project_name)s::text[], %(brief_date)s::date[], %(in_market_date)s::date[],
+          %(project_completion_date)s::date[], %(total_program_budget)s::numeric[], %(rate_card)s::text[],
+          %(currency)s::text[], %(phases)s::jsonb[], %(phase_settings)s::jsonb[], %(status)s::text[],
+          %(computed_total_hours)s::numeric[], %(computed_total_cost)s::numeric[], %(computed_phase_totals)s::jsonb[],
+          %(full_quote)s::jsonb[]
+        ) AS t(
+          quote_uid, project_number, client_name, client_category,
+          brand, project_name, brief_date, in_market_date,
+          project_completion_date, total_program_budget, rate_card,
+          currency, phases, phase_settings, status,
+          computed_total_hours, computed_total_cost, computed_phase_totals,
+          full_quote
+        )
+        ON CONFLICT (quote_uid) DO UPDATE SET
+          project_number = EXCLUDED.project_number,
+          client_name = EXCLUDED.client_name,
+          client_category = EXCLUDED.client_category,
+          brand = EXCLUDED.brand,
+          project_name = EXCLUDED.project_name,
+          brief_date = EXCLUDED.brief_date,
+          in_market_date = EXCLUDED.in_market_date,
+          project_completion_date = EXCLUDED.project_completion_date,
+          total_program_budget = EXCLUDED.total_program_budget,
+          rate_card = EXCLUDED.rate_card,
+          currency = EXCLUDED.currency,
+          phases = EXCLUDED.phases,
+          phase_settings = EXCLUDED.phase_settings,
+          status = EXCLUDED.status,
+          computed_total_hours = EXCLUDED.computed_total_hours,
+          computed_total_cost = EXCLUDED.computed_total_cost,
+          computed_phase_totals = EXCLUDED.computed_phase_totals,
+          updated_at = now(),
+          updated_by = EXCLUDED.updated_by,
+          full_quote = EXCLUDED.full_quote
+        """,
+        {
+            "user_id": user_id,
+            **{column: [row[column] for row in rows] for column in rows[0]},
+        },
+        prepare=True,
+    )
+
+
 async def replace_quotes(user_id: str, quotes: Sequence[QuotePayload], email: Optional[str]):
-    await _ensure_user(user_id, email)
-    for quote in quotes:
-        data = quote.model_dump()
-        project = data.get("project", {}) or {}
-        project_number = data.get("projectNumber") or project.get("projectNumber") or ""
-        quote_uid = data.get("id") or f"{project_number or 'quote'}-{user_id}"
+    """
+    Make the user's stored quotes match `quotes`: one set-based upsert plus an anti-join delete
+    of quotes that are no longer present, all inside a single transaction.
+    """
+    rows = [_quote_row(user_id, quote) for quote in quotes]
+    async with transaction(), pipeline():
+        await _ensure_user(user_id, email)
+        if not rows:
+            await execute("DELETE FROM quotes WHERE created_by = %s", [user_id])
+            return
 
+        await _upsert_quote_rows(user_id, rows)
         await execute(
             """
-            INSERT INTO quotes (
-              quote_uid,
-              project_number,
-              client_name,
-              client_category,
-              brand,
-              project_name,
-              brief_date,
-              in_market_date,
-              project_completion_date,
-              total_program_budget,
-              rate_card,
-              currency,
-              phases,
-              phase_settings,
-              status,
-              created_by,
-              updated_by,
-              full_quote
-            )
-            VALUES (
-              %(quote_uid)s, %(project_number)s, %(client_name)s, %(client_category)s, %(brand)s,
-              %(project_name)s, %(brief_date)s, %(in_market_date)s, %(project_completion_date)s,
-              %(total_program_budget)s, %(rate_card)s, %(currency)s, %(phases)s, %(phase_settings)s,
-              %(status)s, %(created_by)s, %(updated_by)s, %(full_quote)s
-            )
-            ON CONFLICT (quote_uid) DO UPDATE SET
-              project_number = EXCLUDED.project_number,
-              client_name = EXCLUDED.client_name,
-              client_category = EXCLUDED.client_category,
-              brand = EXCLUDED.brand,
-              project_name = EXCLUDED.project_name,
-              brief_date = EXCLUDED.brief_date,
-              in_market_date = EXCLUDED.in_market_date,
-              project_completion_date = EXCLUDED.project_completion_date,
-              total_program_budget = EXCLUDED.total_program_budget,
-              rate_card = EXCLUDED.rate_card,
-              currency = EXCLUDED.currency,
-              phases = EXCLUDED.phases,
-              phase_settings = EXCLUDED.phase_settings,
-              status = EXCLUDED.status,
-              updated_at = now(),
-              updated_by = EXCLUDED.updated_by,
-              full_quote = EXCLUDED.full_quote
+            DELETE FROM quotes q
+            WHERE q.created_by = %s
+              AND q.quote_uid IS NOT NULL
+              AND NOT EXISTS (
+                SELECT 1 FROM unnest(%s::text[]) AS keep(quote_uid)
+                WHERE keep.quote_uid = q.quote_uid
+              )
             """,
-            {
-                "quote_uid": quote_uid,
-                "project_number": project_number,
-                "client_name": data.get("clientName") or "",
-                "client_category": project.get("clientCategory") or data.get("clientCategory") or "",
-                "brand": data.get("brand") or "",
-                "project_name": data.get("projectName") or "",
-                "brief_date": _normalize_date(project.get("briefDate") or data.get("briefDate")),
-                "in_market_date": _normalize_date(project.get("inMarketDate") or data.get("inMarketDate")),
-                "project_completion_date": _normalize_date(project.get("projectCompletionDate") or data.get("projectCompletionDate")),
-                "total_program_budget": project.get("totalProgramBudget") or data.get("totalRevenue"),
-                "rate_card": project.get("rateCard") or data.get("rateCard"),
-                "currency": data.get("currency") or project.get("currency") or "CAD",
-                "phases": project.get("phases") or [],
-                "phase_settings": project.get("phaseSettings") or {},
-                "status": data.get("status") or "draft",
-                "created_by": user_id,
-                "updated_by": user_id,
-                "full_quote": data,
-            },
+            [user_id, [row["quote_uid"] for row in rows]],
         )
 
-    ids = [q.model_dump().get("id") or f"{(q.model_dump().get('projectNumber') or (q.model_dump().get('project') or {}).get('projectNumber') or 'quote')}-{user_id}" for q in quotes]
-    if ids:
-        placeholders = ", ".join(["%s"] * len(ids))
-        await execute(
-            f"DELETE FROM quotes WHERE created_by = %s AND quote_uid IS NOT NULL AND quote_uid NOT IN ({placeholders})",
-            [user_id, *ids],
-        )
-    else:
-        await execute("DELETE FROM quotes WHERE created_by = %s", [user_id])
+
+def _user_quotes_sql(columns: str, condition: str = "", user_param: str = "%s") -> str:
+    """
+    The user's quotes (created or last updated by them) as a UNION ALL of two index scans on
+    (created_by, updated_at) and (updated_by, updated_at). `created_by = %s OR updated_by = %s`
+    cannot use either index and scans the whole table. `condition` is ANDed onto both branches;
+    pass `user_param="%(user_id)s"` when the enclosing query uses named parameters.
+    """
+    extra = f"AND {condition}" if condition else ""
+    return f"""
+        SELECT {columns} FROM quotes WHERE created_by = {user_param} {extra}
+        UNION ALL
+        SELECT {columns} FROM quotes WHERE updated_by = {user_param} AND created_by IS DISTINCT FROM {user_param} {extra}
+    """
+
+
+def _user_quotes_params(user_id: str, *condition_params: Any) -> List[Any]:
+    return [user_id, *condition_params, user_id, user_id, *condition_params]
 
 
-async def get_quotes_for_user(user_id: str) -> List[Dict[str, Any]]:
+async def get_quotes_version(user_id: str, watermark: Optional[int] = None) -> tuple:
+    """
+    Commit-ordered version of the user's quotes: (watermark, *state), the state being the ids of
+    the transactions at or above the watermark (default: the current snapshot xmin) that wrote or
+    deleted one of them (see recent_xids_sql).
+    """
+    user_quotes = _user_quotes_sql("row_xid", "row_xid >= w.watermark", user_param="%(user_id)s")
+    row = await fetchrow(
+        f"""
+        SELECT w.watermark::text AS watermark,
+          (SELECT array_agg(DISTINCT row_xid::text ORDER BY row_xid::text) FROM ({user_quotes}) q) AS quote_xids,
+          {recent_xids_sql("sync_tombstones", "deleted_xid", "item_type = 'quote' AND user_id = %(user_id)s")}
+            AS deleted_xids
+        FROM {watermark_sql("%(watermark)s")}
+        """,
+        {"user_id": user_id, "watermark": None if watermark is None else str(watermark)},
+    )
+    return tuple(row.values()) if row else (None,)
+
+
+def _expected_version(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+async def _row_versions(uids: Sequence[str], lock: bool = False) -> Dict[str, int]:
     rows = await fetch(
-        """
-        SELECT full_quote FROM quotes
-        WHERE created_by = %s OR updated_by = %s
-        ORDER BY updated_at DESC
+        f"SELECT quote_uid, row_version FROM quotes WHERE quote_uid = ANY(%s){' FOR UPDATE' if lock else ''}",
+        [list(uids)],
+    )
+    return {r["quote_uid"]: r["row_version"] for r in rows}
+
+
+async def apply_quotes_delta(
+    user_id: str,
+    upserts: Sequence[QuotePayload],
+    deletes: Sequence[str],
+    email: Optional[str],
+    base_versions: Mapping[str, int],
+) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Apply only the changed/added/removed quotes in one transaction. Every touched quote with an
+    expected row_version (`base_versions`, else the upserted quote's `version`; 0 = must not exist)
+    is compared with the locked row, and any mismatch is a conflict: nothing is written.
+    Returns (conflicting quote uids, row versions) — the new versions of the upserted quotes,
+    or the current versions of the conflicting ones.
+    """
+    expected: Dict[str, int] = {}
+    rows = []
+    for quote in upserts:
+        row = _quote_row(user_id, quote)
+        version = _expected_version((quote.model_extra or {}).get("version"))
+        if version is not None:
+            expected[row["quote_uid"]] = version
+        rows.append(row)
+    expected.update(base_versions)
+    uids = [row["quote_uid"] for row in rows] + [uid for uid in deletes if uid]
+    checked = [uid for uid in dict.fromkeys(uids) if uid in expected]
+
+    conflicts: List[str] = []
+    versions: Dict[str, int] = {}
+    async with transaction():
+        if checked:
+            current = await _row_versions(checked, lock=True)
+            conflicts = [uid for uid in checked if current.get(uid, 0) != expected[uid]]
+            if conflicts:
+                return conflicts, {uid: current.get(uid, 0) for uid in conflicts}
+
+        async with pipeline():
+            if rows:
+                await _ensure_user(user_id, email)
+                await _upsert_quote_rows(user_id, rows)
+            if deletes:
+                await execute(
+                    "DELETE FROM quotes WHERE created_by = %s AND quote_uid = ANY(%s)",
+                    [user_id, list(deletes)],
+                )
+        versions = await _row_versions([row["quote_uid"] for row in rows])
+        # A quote expected not to exist may have been inserted by another writer after the check
+        # (there was nothing to lock); the upsert then updated it instead of creating version 1.
+        conflicts = [uid for uid in checked if uid in versions and versions[uid] != expected[uid] + 1]
+        if conflicts:
+            versions = {uid: versions[uid] - 1 for uid in conflicts}
+            raise Rollback()
+    return conflicts, versions
+
+
+async def get_quotes_for_user(user_id: str, changed_since: Optional[int] = None) -> List[Dict[str, Any]]:
+    """The user's quotes, or with `changed_since` (a sync watermark) those written at or after it."""
+    condition = "row_xid >= %s::xid8" if changed_since is not None else ""
+    rows = await fetch(
+        f"""
+        SELECT full_quote FROM ({_user_quotes_sql(f"{QUOTE_DOCUMENT_SQL} AS full_quote, updated_at, id", condition)}) q
+        ORDER BY updated_at DESC, id
         """,
-        [user_id, user_id],
+        _user_quotes_params(user_id, *([str(changed_since)] if changed_since is not None else [])),
     )
     return [r.get("full_quote") or {} for r in rows]
+
+
+# Scalar columns exported as CSV; the NDJSON export carries full_quote verbatim instead.
+QUOTE_EXPORT_COLUMNS = [
+    "quote_uid",
+    "project_number",
+    "client_name",
+    "client_category",
+    "brand",
+    "project_name",
+    "brief_date",
+    "in_market_date",
+    "project_completion_date",
+    "total_program_budget",
+    "computed_total_hours",
+    "computed_total_cost",
+    "rate_card",
+    "currency",
+    "status",
+    "created_at",
+    "updated_at",
+]
+
+
+async def stream_quotes(user_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """The user's quotes, newest first, via a server-side cursor; full_quote stays JSON text."""
+    async for row in stream(
+        f"""
+        SELECT {", ".join(QUOTE_EXPORT_COLUMNS)}, COALESCE(full_quote, '{{}}'::jsonb)::text AS full_quote
+        FROM ({_user_quotes_sql(", ".join([*QUOTE_EXPORT_COLUMNS, f"{QUOTE_DOCUMENT_SQL} AS full_quote", "id"]))}) q
+        ORDER BY updated_at DESC, id
+        """,
+        _user_quotes_params(user_id),
+    ):
+        yield row
+
+
+async def get_quotes_json(user_id: str, limit: Optional[int] = None, offset: int = 0) -> str:
+    """
+    The user's quotes (newest first, optionally one limit/offset page) as a JSON array string,
+    aggregated in Postgres from the stored JSONB so large payloads are never decoded into
+    Python objects and re-encoded.
+    """
+    row = await fetchrow(
+        f"""
+        SELECT COALESCE(json_agg(COALESCE(full_quote, '{{}}'::jsonb) ORDER BY updated_at DESC, id), '[]'::json)::text AS quotes
+        FROM (
+          SELECT full_quote, updated_at, id FROM ({_user_quotes_sql(f"{QUOTE_DOCUMENT_SQL} AS full_quote, updated_at, id")}) q
+          ORDER BY updated_at DESC, id
+          LIMIT %s OFFSET %s
+        ) page
+        """,
+        [*_user_quotes_params(user_id), limit, offset],
+    )
+    return row["quotes"] if row else "[]"
+
+
+_SEARCH_COLUMNS = (
+    "id, quote_uid, project_number, client_name, brand, project_name, status, currency, rate_card, "
+    "brief_date, in_market_date, project_completion_date, total_program_budget, computed_total_cost, updated_at"
+)
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _search_result(row: Dict[str, Any]) -> Dict[str, Any]:
+    # Dates and NUMERICs are left to the response encoder
+    result = {
+        "id": row.get("quote_uid"),
+        "projectNumber": row.get("project_number"),
+        "clientName": row.get("client_name"),
+        "brand": row.get("brand"),
+        "projectName": row.get("project_name"),
+        "status": row.get("status"),
+        "currency": row.get("currency"),
+        "rateCard": row.get("rate_card"),
+        "briefDate": row.get("brief_date"),
+        "inMarketDate": row.get("in_market_date"),
+        "projectCompletionDate": row.get("project_completion_date"),
+        "totalProgramBudget": row.get("total_program_budget"),
+        "computedTotalCost": row.get("computed_total_cost"),
+        "updatedAt": row.get("updated_at"),
+    }
+    if "full_quote" in row:
+        result["quote"] = row["full_quote"] or {}
+    return result
+
+
+async def search_quotes(
+    user_id: str,
+    *,
+    text: Optional[str] = None,
+    client: Optional[str] = None,
+    statuses: Optional[Sequence[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    min_budget: Optional[float] = None,
+    max_budget: Optional[float] = None,
+    role: Optional[str] = None,
+    limit: int = QUOTE_SEARCH_DEFAULT_LIMIT,
+    offset: int = 0,
+    include_quote: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    The user's quotes matching every given filter, newest first. Filters use the generated search
+    columns (migrations/0009): trigram `search_text` for free text, `resource_roles` containment
+    for the role of any phase resource, and `date_window` overlap for the date range (NULL, so never
+    matched, for quotes without dates).
+    Returns one page and the offset of the next page (None on the last page).
+    """
+    limit = max(1, min(limit, QUOTES_PAGE_MAX_LIMIT))
+    clauses: List[str] = []
+    params: List[Any] = []
+    if text and text.strip():
+        clauses.append("search_text LIKE %s")
+        params.append(_like_pattern(text.strip()))
+    if client:
+        clauses.append("client_name = %s")
+        params.append(client)
+    if statuses:
+        clauses.append("status = ANY(%s)")
+        params.append(list(statuses))
+    if date_from or date_to:
+        clauses.append("date_window && daterange(%s::date, %s::date, '[]')")
+        params.extend([date_from, date_to])
+    if min_budget is not None:
+        clauses.append("total_program_budget >= %s")
+        params.append(min_budget)
+    if max_budget is not None:
+        clauses.append("total_program_budget <= %s")
+        params.append(max_budget)
+    if role:
+        clauses.append("resource_roles @> %s::jsonb")
+        params.append(json.dumps([role]))
+
+    columns = _SEARCH_COLUMNS + (f", {QUOTE_DOCUMENT_SQL} AS full_quote" if include_quote else "")
+    rows = await fetch(
+        f"""
+        SELECT * FROM ({_user_quotes_sql(columns, " AND ".join(clauses))}) q
+        ORDER BY updated_at DESC, id
+        LIMIT %s OFFSET %s
+        """,
+        [*_user_quotes_params(user_id, *params), limit + 1, offset],
+    )
+    next_offset = offset + limit if len(rows) > limit else None
+    return [_search_result(row) for row in rows[:limit]], next_offset
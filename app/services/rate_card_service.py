@@ -0,0 +1,168 @@
+import csv
+import logging
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..core.config import settings
+from ..models.rate_card import RateCardLineItem
+from .metadata_service import CLIENT_RATE_CARD_MAP
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent.parent.parent
+RATE_CARD_PATH = DATA_DIR / "Salt Rate Card_2025.csv"
+FIELD_STAFF_RATES_PATH = DATA_DIR / "Field Staff Rates.csv"
+BLENDED_RATE_CARD = "Blended"  # Used for cards without their own column (ABI, Standard, retainers, ...)
+FIELD_STAFF_DEPARTMENT = "Field Staff"
+RATE_CARD_PRICE_MAX_ITEMS = 10000
+
+RateKey = Tuple[str, str, str]  # (rate card, department, role), normalised with _key
+
+# Rebuilt wholesale on reload and swapped in one assignment, so readers never see a partial index.
+_rates: Dict[RateKey, float] = {}
+_card_names: Dict[str, str] = {}  # normalised → display name, e.g. "labatt" → "Labatt"
+_signature: Optional[tuple] = None  # (mtime_ns, size) of each source file at the last load
+_checked_at = 0.0
+
+
+@lru_cache(maxsize=4096)
+def _key(value: str) -> str:
+    """Case- and whitespace-insensitive lookup key (the CSV has roles split across lines)."""
+    return " ".join(value.split()).casefold()
+
+
+def _money(value: str) -> Optional[float]:
+    cleaned = value.replace("$", "").replace(",", "").strip()
+    if not cleaned:
+        return None
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def _read_rate_card(path: Path, rates: Dict[RateKey, float], names: Dict[str, str]):
+    """Department,Roles,<card>,<card>,... — one row per department/role, one column per rate card."""
+    with path.open(newline="", encoding="utf-8-sig") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, [])
+        cards = [(index, name.strip()) for index, name in enumerate(header) if index >= 2 and name.strip()]
+        for name in (card for _, card in cards):
+            names[_key(name)] = name
+        for row in reader:
+            if len(row) < 2 or not row[0].strip() or not row[1].strip():
+                continue
+            department, role = _key(row[0]), _key(row[1])
+            for index, card in cards:
+                rate = _money(row[index]) if index < len(row) else None
+                if rate is not None:
+                    rates[(_key(card), department, role)] = rate
+
+
+def _read_field_staff_rates(path: Path, rates: Dict[RateKey, float], names: Dict[str, str]):
+    """Staffing Rate,<role>,<role>,... — one row per rate card, priced under the Field Staff department."""
+    department = _key(FIELD_STAFF_DEPARTMENT)
+    with path.open(newline="", encoding="utf-8-sig") as handle:
+        reader = csv.reader(handle)
+        roles = [_key(role) for role in next(reader, [])[1:]]
+        for row in reader:
+            if not row or not row[0].strip():
+                continue
+            card = row[0].strip()
+            names.setdefault(_key(card), card)
+            for role, value in zip(roles, row[1:]):
+                rate = _money(value)
+                if role and rate is not None:
+                    rates[(_key(card), department, role)] = rate
+
+
+def _source_signature() -> tuple:
+    signature = []
+    for path in (RATE_CARD_PATH, FIELD_STAFF_RATES_PATH):
+        try:
+            stat = path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def load_rate_cards() -> int:
+    """Parse both CSVs into a fresh index; returns the number of rates loaded."""
+    global _rates, _card_names, _signature, _checked_at
+    signature = _source_signature()
+    rates: Dict[RateKey, float] = {}
+    names: Dict[str, str] = {}
+    for path, reader in ((RATE_CARD_PATH, _read_rate_card), (FIELD_STAFF_RATES_PATH, _read_field_staff_rates)):
+        if path.exists():
+            reader(path, rates, names)
+        else:
+            log.warning("Rate card file not found: %s", path)
+    _rates, _card_names, _signature = rates, names, signature
+    _checked_at = time.monotonic()
+    return len(rates)
+
+
+def _current_rates() -> Dict[RateKey, float]:
+    """The loaded index, re-read when a source file changed (checked at most every rate_card_reload_seconds)."""
+    global _checked_at
+    if _signature is None:
+        load_rate_cards()
+    elif settings.rate_card_reload_seconds > 0 and time.monotonic() - _checked_at >= settings.rate_card_reload_seconds:
+        _checked_at = time.monotonic()
+        if _source_signature() != _signature:
+            count = load_rate_cards()
+            print(f"✓ Rate cards reloaded ({count} rates)")
+    return _rates
+
+
+def rate_card_version() -> Optional[tuple]:
+    """Changes whenever the index is reloaded; lets callers key caches of priced results on it."""
+    _current_rates()
+    return _signature
+
+
+def resolve_rate_card(rate_card: Optional[str] = None, client: Optional[str] = None) -> str:
+    """Display name of the card to price with: the named card, else the client's card, else Blended."""
+    _current_rates()
+    name = rate_card or CLIENT_RATE_CARD_MAP.get(client or "") or BLENDED_RATE_CARD
+    return _card_names.get(_key(name), name)
+
+
+def price_line_items(
+    items: Sequence[RateCardLineItem], rate_card: Optional[str] = None, client: Optional[str] = None
+) -> dict:
+    """
+    Cost out hours × rate for every item with one dict lookup each. A role missing from the
+    requested card (or a card with no column of its own) is priced from the Blended card.
+    """
+    card = resolve_rate_card(rate_card, client)  # Also picks up changed CSVs
+    rates, names = _rates, _card_names
+    blended = _key(BLENDED_RATE_CARD)
+    priced: List[dict] = []
+    unmatched: List[int] = []
+    total = 0.0
+    for index, item in enumerate(items):
+        item_card = item.rateCard or card
+        department, role = _key(item.department), _key(item.role)
+        rate = rates.get((_key(item_card), department, role))
+        if rate is None:
+            rate = rates.get((blended, department, role))
+            item_card = BLENDED_RATE_CARD if rate is not None else None
+        cost = round(item.hours * rate, 2) if rate is not None else 0.0
+        if rate is None:
+            unmatched.append(index)
+        total += cost
+        priced.append(
+            {
+                "department": item.department,
+                "role": item.role,
+                "hours": item.hours,
+                "rateCard": names.get(_key(item_card), item_card) if item_card else None,
+                "rate": rate,
+                "cost": cost,
+            }
+        )
+    return {"rateCard": card, "items": priced, "total": round(total, 2), "unmatched": unmatched}
@@ -1,40 +1,56 @@
+import asyncio
 import json
-from typing import Any, Dict, List, Optional
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from ..core.database import execute, fetch, fetchrow
+from ..core.config import settings
+from ..core.database import execute, fetch, fetchrow, transaction
+from ..core.http_cache import recent_xids_sql, watermark_sql
 from ..models.pipeline import PipelineEntry, PipelineChange
 from ..services.pipeline_service import (
-    build_pipeline_changelog,
+    PIPELINE_CHANGELOG_MAX_LIMIT,
+    apply_pipeline_delta,
+    clear_pipeline_changelog,
+    get_pipeline_changelog,
     get_pipeline_entries_for_user,
+    record_pipeline_changes,
     replace_pipeline_entries,
 )
-from ..services.quotes_service import get_quotes_for_user, parse_quotes_value, replace_quotes
+from ..services.quotes_service import (
+    _user_quotes_sql,
+    apply_quotes_delta,
+    get_quotes_for_user,
+    get_quotes_json,
+    parse_quotes_value,
+    replace_quotes,
+)
 from ..models.quote import QuotePayload
 
 PIPELINE_KEY = "pipeline-entries"
 QUOTES_KEY = "saltxc-all-quotes"
 PIPELINE_CHANGELOG_KEY = "pipeline-changelog"
 
-storage_table_ready = False
+log = logging.getLogger(__name__)
 
+_prune_task: Optional["asyncio.Task[None]"] = None
+
+
+# JSONB rendered as text by Postgres; JSON string values come back unquoted, as psycopg used to return them.
+STORAGE_VALUE_TEXT_SQL = (
+    "CASE WHEN jsonb_typeof(storage_value) = 'string' THEN storage_value #>> '{}' "
+    "ELSE storage_value::text END AS storage_value"
+)
 
-async def _ensure_storage_table():
-    global storage_table_ready
-    if storage_table_ready:
-        return
-    await execute(
-        """
-        CREATE TABLE IF NOT EXISTS user_storage (
-          id SERIAL PRIMARY KEY,
-          user_id TEXT NOT NULL,
-          storage_key TEXT NOT NULL,
-          storage_value JSONB NOT NULL DEFAULT '{}'::jsonb,
-          updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-          UNIQUE(user_id, storage_key)
-        );
-        """
-    )
-    storage_table_ready = True
+
+class StorageConflictError(Exception):
+    """Raised when a delta touches items whose row version no longer matches the client's."""
+
+    def __init__(self, conflicts: List[str], versions: Dict[str, int], revision: Optional[str]):
+        super().__init__(f"{len(conflicts)} item(s) changed since they were read")
+        self.conflicts = conflicts
+        self.versions = versions
+        self.revision = revision
 
 
 def _parse_pipeline_value(value: Any) -> List[PipelineEntry]:
@@ -72,32 +88,9 @@ def _parse_changelog_value(value: Any) -> List[Dict[str, Any]]:
         return []
 
 
-def _merge_changelog(existing: List[Dict[str, Any]], additions: List[PipelineChange]) -> List[Dict[str, Any]]:
-    combined: List[Dict[str, Any]] = []
-    seen = set()
-
-    def _key(item: Dict[str, Any]):
-        return (item.get("type"), item.get("projectCode"), item.get("date"))
-
-    for item in existing:
-        if not isinstance(item, dict):
-            continue
-        k = _key(item)
-        if k in seen:
-            continue
-        seen.add(k)
-        combined.append(item)
-
-    for change in additions:
-        item = change.model_dump(mode="json")
-        k = _key(item)
-        if k in seen:
-            continue
-        seen.add(k)
-        combined.append(item)
-
-    combined.sort(key=lambda x: x.get("date") or "", reverse=True)
-    return combined
+async def _changelog_json(user_id: str, since: Optional[int] = None) -> List[Dict[str, Any]]:
+    changes, _ = await get_pipeline_changelog(user_id, user_id, limit=PIPELINE_CHANGELOG_MAX_LIMIT, since=since)
+    return [c.model_dump(mode="json") for c in changes]
 
 
 async def get_storage_value(user_id: str, key: str) -> Optional[Any]:
@@ -106,31 +99,15 @@ async def get_storage_value(user_id: str, key: str) -> Optional[Any]:
         # Ensure datetimes are serialized to ISO strings for CloudStorage consumers
         return json.dumps([e.model_dump(mode="json") for e in entries])
     if key == QUOTES_KEY:
-        quotes = await get_quotes_for_user(user_id)
-        return json.dumps(quotes)
+        return await get_quotes_json(user_id)
     if key == PIPELINE_CHANGELOG_KEY:
-        await _ensure_storage_table()
-        entries = await get_pipeline_entries_for_user(user_id)
-        changelog = build_pipeline_changelog(entries, user_id)
-        stored = await fetchrow(
-            "SELECT storage_value FROM user_storage WHERE user_id = %s AND storage_key = %s",
-            [user_id, PIPELINE_CHANGELOG_KEY],
-        )
-        existing = _parse_changelog_value(stored.get("storage_value") if stored else None)
-        merged = _merge_changelog(existing, changelog)
-        return json.dumps(merged)
+        return json.dumps(await _changelog_json(user_id))
 
-    await _ensure_storage_table()
     row = await fetchrow(
-        "SELECT storage_value FROM user_storage WHERE user_id = %s AND storage_key = %s",
+        f"SELECT {STORAGE_VALUE_TEXT_SQL} FROM user_storage WHERE user_id = %s AND storage_key = %s",
         [user_id, key],
     )
-    value = row["storage_value"] if row else None
-    if value is None:
-        return None
-    if isinstance(value, str):
-        return value
-    return json.dumps(value)
+    return row["storage_value"] if row else None
 
 
 async def set_storage_value(user_id: str, key: str, value: Any, email: Optional[str]) -> Any:
@@ -145,7 +122,19 @@ async def set_storage_value(user_id: str, key: str, value: Any, email: Optional[
         await replace_quotes(user_id, quotes_models, email)
         return value
 
-    await _ensure_storage_table()
+    if key == PIPELINE_CHANGELOG_KEY:
+        # Additions are derived from pipeline rows; only recorded events (e.g. deletions) are appended.
+        changes = []
+        for item in _parse_changelog_value(value):
+            if not isinstance(item, dict) or item.get("type") == "addition":
+                continue
+            try:
+                changes.append(PipelineChange.model_validate(item))
+            except Exception:
+                continue
+        await record_pipeline_changes(user_id, changes)
+        return value
+
     row = await fetchrow(
         """
         INSERT INTO user_storage (user_id, storage_key, storage_value)
@@ -159,6 +148,97 @@ async def set_storage_value(user_id: str, key: str, value: Any, email: Optional[
     return row["storage_value"] if row else value
 
 
+async def get_storage_revision(user_id: str, key: str) -> Optional[str]:
+    """Sync watermark for keys backed by relational tables (usable as `since`); None for plain keys."""
+    if key in (PIPELINE_KEY, QUOTES_KEY):
+        return await _storage_watermark()
+    return None
+
+
+async def get_storage_version(user_id: str, key: Optional[str] = None, watermark: Optional[int] = None) -> tuple:
+    """
+    Cheap, commit-ordered version marker for GET /storage (key=None) or GET /storage/{key}:
+    (watermark, *state), the state being the ids of the transactions at or above the watermark
+    (default: the current snapshot xmin) that wrote or deleted anything feeding the response
+    (see recent_xids_sql), fetched in a single query.
+    """
+    if key is not None and key not in (PIPELINE_KEY, QUOTES_KEY, PIPELINE_CHANGELOG_KEY):
+        row = await fetchrow(
+            "SELECT row_xid::text AS row_xid FROM user_storage WHERE user_id = %s AND storage_key = %s",
+            [user_id, key],
+        )
+        # Rows written before migrations/0012 have no row_xid, so presence is part of the version
+        return (None, key, row is not None, row.get("row_xid") if row else None)
+
+    include_storage = key is None
+    include_changelog = key in (None, PIPELINE_CHANGELOG_KEY)
+    include_pipeline = key in (None, PIPELINE_KEY, PIPELINE_CHANGELOG_KEY)
+    include_quotes = key in (None, QUOTES_KEY)
+    user_quotes = _user_quotes_sql("row_xid", "%(quotes)s AND row_xid >= w.watermark", user_param="%(user_id)s")
+    row = await fetchrow(
+        f"""
+        SELECT
+          w.watermark::text AS watermark,
+          {recent_xids_sql("user_storage", "row_xid", "%(storage)s AND user_id = %(user_id)s")} AS storage_xids,
+          {recent_xids_sql("pipeline_changelog", "recorded_xid", "%(changelog)s AND user_id = %(user_id)s")}
+            AS changelog_xids,
+          (SELECT count(*) FROM pipeline_changelog WHERE %(changelog)s AND user_id = %(user_id)s) AS changelog_total,
+          {recent_xids_sql("pipeline_opportunities", "row_xid", "%(pipeline)s")} AS pipeline_xids,
+          (SELECT array_agg(DISTINCT row_xid::text ORDER BY row_xid::text) FROM ({user_quotes}) q) AS quote_xids,
+          {recent_xids_sql(
+              "sync_tombstones",
+              "deleted_xid",
+              "CASE item_type WHEN 'storage' THEN %(storage)s AND user_id = %(user_id)s"
+              " WHEN 'pipeline' THEN %(pipeline)s WHEN 'quote' THEN %(quotes)s AND user_id = %(user_id)s"
+              " ELSE FALSE END",
+          )} AS deleted_xids
+        FROM {watermark_sql("%(watermark)s")}
+        """,
+        {
+            "user_id": user_id,
+            "watermark": None if watermark is None else str(watermark),
+            "storage": include_storage,
+            "changelog": include_changelog,
+            "pipeline": include_pipeline,
+            "quotes": include_quotes,
+        },
+    )
+    if not row:
+        return (None, key)
+    watermark_text, *state = row.values()
+    return (watermark_text, key, *state)
+
+
+async def apply_storage_delta(
+    user_id: str,
+    key: str,
+    base_versions: Dict[str, int],
+    upserts: Sequence[Dict[str, Any]],
+    deletes: Sequence[str],
+    email: Optional[str],
+) -> Tuple[Optional[str], Dict[str, int]]:
+    """
+    Apply an incremental change set to `pipeline-entries` or `saltxc-all-quotes`.
+    Only the listed items are written; returns the revision and the upserted items' row versions.
+    The revision is taken before the delta runs, so it never moves past other writers' changes
+    that commit meanwhile; the next poll from it may echo this delta's own items back.
+    """
+    if key not in (PIPELINE_KEY, QUOTES_KEY):
+        raise ValueError(f"Delta sync is not supported for key {key}")
+
+    revision = await get_storage_revision(user_id, key)
+    if key == PIPELINE_KEY:
+        entries = [PipelineEntry.model_validate(item) for item in upserts]
+        conflicts, versions = await apply_pipeline_delta(user_id, entries, deletes, email, base_versions)
+    else:
+        quotes_models = [QuotePayload.model_validate(item) for item in upserts]
+        conflicts, versions = await apply_quotes_delta(user_id, quotes_models, deletes, email, base_versions)
+
+    if conflicts:
+        raise StorageConflictError(conflicts, versions, revision)
+    return revision, versions
+
+
 async def delete_storage_value(user_id: str, key: str):
     if key == PIPELINE_KEY:
         await replace_pipeline_entries(user_id, [], None)
@@ -166,30 +246,195 @@ async def delete_storage_value(user_id: str, key: str):
     if key == QUOTES_KEY:
         await replace_quotes(user_id, [], None)
         return
+    if key == PIPELINE_CHANGELOG_KEY:
+        await clear_pipeline_changelog(user_id)
 
-    await _ensure_storage_table()
     await execute("DELETE FROM user_storage WHERE user_id = %s AND storage_key = %s", [user_id, key])
 
 
-async def list_storage_values(user_id: str) -> Dict[str, Any]:
-    await _ensure_storage_table()
-    rows = await fetch("SELECT storage_key, storage_value FROM user_storage WHERE user_id = %s", [user_id])
+async def _storage_watermark() -> Optional[str]:
+    """
+    The xmin of the current snapshot: every transaction with a lower id had finished, so its writes
+    are visible to the reads that follow. A write in flight now gets an id >= it and is picked up
+    by the next poll, however late it commits.
+    """
+    row = await fetchrow("SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS watermark")
+    return row.get("watermark") if row else None
+
+
+def parse_since_token(since: Optional[str]) -> Optional[int]:
+    """
+    Watermark from an earlier GET /storage. Timestamp watermarks issued before they became
+    transaction ids cannot be compared; they are treated as absent so the client gets a full listing.
+    """
+    if not since:
+        return None
+    if since.isdigit():
+        return int(since)
+    try:
+        datetime.fromisoformat(since)
+    except ValueError as exc:
+        raise ValueError("Invalid since") from exc
+    return None
+
+
+async def _watermark_expired(since: int) -> bool:
+    """True when tombstones at or after `since` may have been pruned (see prune_sync_tombstones)."""
+    row = await fetchrow(
+        "SELECT pruned_through >= %s::xid8 AS expired FROM sync_horizon",
+        [str(since)],
+    )
+    return bool(row and row.get("expired"))
+
+
+async def prune_sync_tombstones() -> int:
+    """
+    Delete tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS and move the sync horizon past them,
+    so a poll with a watermark from before the horizon gets a full listing instead of missing
+    deletions. Returns the number of tombstones deleted.
+    """
+    async with transaction():
+        row = await fetchrow(
+            """
+            SELECT max(deleted_xid)::text AS horizon FROM sync_tombstones
+            WHERE deleted_at < now() - make_interval(days => %s)
+            """,
+            [settings.sync_tombstone_retention_days],
+        )
+        horizon = row.get("horizon") if row else None
+        if horizon is None:
+            return 0
+        await execute(
+            """
+            INSERT INTO sync_horizon (id, pruned_through) VALUES (TRUE, %s::xid8)
+            ON CONFLICT (id) DO UPDATE SET
+              pruned_through = GREATEST(sync_horizon.pruned_through, EXCLUDED.pruned_through),
+              pruned_at = now()
+            """,
+            [horizon],
+        )
+        return await execute("DELETE FROM sync_tombstones WHERE deleted_xid <= %s::xid8", [horizon])
+
+
+async def _prune_worker():
+    while True:
+        try:
+            pruned = await prune_sync_tombstones()
+            if pruned:
+                log.info("Pruned %s sync tombstone(s)", pruned)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Sync tombstone pruning failed")
+        await asyncio.sleep(settings.sync_tombstone_prune_seconds)
+
+
+def start_tombstone_pruner():
+    """Start the background tombstone pruner (no-op when SYNC_TOMBSTONE_PRUNE_SECONDS is 0)."""
+    global _prune_task
+    if settings.sync_tombstone_prune_seconds <= 0 or _prune_task is not None:
+        return
+    _prune_task = asyncio.create_task(_prune_worker())
+
+
+async def stop_tombstone_pruner():
+    global _prune_task
+    if _prune_task is not None:
+        _prune_task.cancel()
+        try:
+            await _prune_task
+        except asyncio.CancelledError:
+            pass
+        _prune_task = None
+
 
-    values: Dict[str, Any] = {}
+async def _deleted_since(user_id: str, since: int) -> Dict[str, List[str]]:
+    """Tombstoned storage keys, pipeline codes and quote uids since the watermark that do not exist again."""
+    rows = await fetch(
+        """
+        SELECT DISTINCT item_type, item_key FROM sync_tombstones t
+        WHERE deleted_xid >= %(since)s::xid8
+          AND item_type <> 'overhead'
+          AND (user_id = %(user_id)s OR (item_type = 'pipeline' AND user_id IS NULL))
+          AND NOT CASE item_type
+            WHEN 'storage' THEN EXISTS (
+              SELECT 1 FROM user_storage s WHERE s.user_id = %(user_id)s AND s.storage_key = t.item_key)
+            WHEN 'pipeline' THEN EXISTS (
+              SELECT 1 FROM pipeline_opportunities p WHERE p.project_code = t.item_key)
+            ELSE EXISTS (
+              SELECT 1 FROM quotes q
+              WHERE q.quote_uid = t.item_key AND (q.created_by = %(user_id)s OR q.updated_by = %(user_id)s))
+          END
+        """,
+        {"user_id": user_id, "since": str(since)},
+    )
+    deleted: Dict[str, List[str]] = {}
     for row in rows:
-        val = row.get("storage_value")
-        values[row["storage_key"]] = val if val is None or isinstance(val, str) else json.dumps(val)
+        deleted.setdefault(row["item_type"], []).append(row["item_key"])
+    return deleted
+
+
+async def list_storage_changes(user_id: str, since: int) -> Dict[str, Any]:
+    """
+    Everything written or deleted by transactions at or after the `since` watermark: plain keys
+    whose row changed, the changed pipeline entries, quotes and new changelog items, and the
+    keys/ids deleted since (`deletedKeys`, `deleted`). Items committed while the previous poll ran
+    can be sent twice; pipeline entries and quotes are keyed, changelog items by (type, code, date).
+    A watermark at or below the sync horizon may have missed pruned deletions and gets a full listing.
+    """
+    if await _watermark_expired(since):
+        return await list_storage_values(user_id)
+    watermark = await _storage_watermark()
+
+    rows = await fetch(
+        f"SELECT storage_key, {STORAGE_VALUE_TEXT_SQL} FROM user_storage WHERE user_id = %s AND row_xid >= %s::xid8",
+        [user_id, str(since)],
+    )
+    values: Dict[str, Any] = {row["storage_key"]: row["storage_value"] for row in rows}
+
+    changes: Dict[str, Any] = {}
+    pipeline_entries = await get_pipeline_entries_for_user(user_id, changed_since=since)
+    if pipeline_entries:
+        changes[PIPELINE_KEY] = [e.model_dump(mode="json") for e in pipeline_entries]
+    quotes = await get_quotes_for_user(user_id, changed_since=since)
+    if quotes:
+        changes[QUOTES_KEY] = quotes
+
+    values.pop(PIPELINE_CHANGELOG_KEY, None)  # Legacy blob; the changelog now lives in pipeline_changelog
+    changelog = await _changelog_json(user_id, since=since)
+    if changelog:
+        changes[PIPELINE_CHANGELOG_KEY] = changelog
+
+    deleted = await _deleted_since(user_id, since)
+    result: Dict[str, Any] = {
+        "values": values,
+        "changes": changes,
+        "watermark": str(max(int(watermark), since)) if watermark else str(since),
+    }
+    if deleted:
+        result["deletedKeys"] = deleted.get("storage", [])
+        result["deleted"] = {
+            name: deleted[kind]
+            for name, kind in ((PIPELINE_KEY, "pipeline"), (QUOTES_KEY, "quote"))
+            if kind in deleted
+        }
+    return result
+
+
+async def list_storage_values(user_id: str) -> Dict[str, Any]:
+    watermark = await _storage_watermark()
+    rows = await fetch(
+        f"SELECT storage_key, {STORAGE_VALUE_TEXT_SQL} FROM user_storage WHERE user_id = %s",
+        [user_id],
+    )
+    values: Dict[str, Any] = {row["storage_key"]: row["storage_value"] for row in rows}
 
     pipeline_entries = await get_pipeline_entries_for_user(user_id)
-    quotes = await get_quotes_for_user(user_id)
 
     # Use json mode to serialize datetimes as ISO strings
     values[PIPELINE_KEY] = json.dumps([e.model_dump(mode="json") for e in pipeline_entries])
-    values[QUOTES_KEY] = json.dumps(quotes)
+    values[QUOTES_KEY] = await get_quotes_json(user_id)
 
-    additions = build_pipeline_changelog(pipeline_entries, values.get("email") or user_id)
-    existing_changelog = _parse_changelog_value(values.get(PIPELINE_CHANGELOG_KEY))
-    merged_changelog = _merge_changelog(existing_changelog, additions)
-    values[PIPELINE_CHANGELOG_KEY] = json.dumps(merged_changelog)
+    values[PIPELINE_CHANGELOG_KEY] = json.dumps(await _changelog_json(user_id))
 
-    return values
+    return {"values": values, "watermark": watermark}
@@ -1,7 +1,10 @@
 -- Cloud SQL / Postgres schema for Connections Quote Tool
 -- All app entry points write to this database (Firebase-authenticated).
+-- Snapshot of the full schema for reference. Changes ship as numbered files in migrations/
+-- (applied with `python -m app.core.migrations migrate`); keep this file in sync with them.
 
 CREATE EXTENSION IF NOT EXISTS "pgcrypto";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- =====================================================
 -- USERS (Firebase metadata mirror)
@@ -24,10 +27,13 @@ CREATE TABLE IF NOT EXISTS user_storage (
   storage_key TEXT NOT NULL,
   storage_value JSONB NOT NULL DEFAULT '{}'::jsonb,
   updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  row_xid xid8, -- Writing transaction; see SYNC WATERMARKS below
   UNIQUE (user_id, storage_key)
 );
 
 CREATE INDEX IF NOT EXISTS user_storage_user_idx ON user_storage(user_id);
+CREATE INDEX IF NOT EXISTS user_storage_user_updated_idx ON user_storage(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS user_storage_user_row_xid_idx ON user_storage(user_id, row_xid);
 
 -- =====================================================
 -- OVERHEAD EMPLOYEES (used by /api/overhead-employees)
@@ -47,10 +53,12 @@ CREATE TABLE IF NOT EXISTS overhead_employees (
   created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   created_by TEXT,
-  updated_by TEXT
+  updated_by TEXT,
+  row_xid xid8 -- Writing transaction; see SYNC WATERMARKS below
 );
 
 CREATE INDEX IF NOT EXISTS overhead_user_idx ON overhead_employees(user_id);
+CREATE INDEX IF NOT EXISTS overhead_employees_user_row_xid_idx ON overhead_employees(user_id, row_xid);
 CREATE INDEX IF NOT EXISTS overhead_department_idx ON overhead_employees(department);
 CREATE INDEX IF NOT EXISTS overhead_employee_idx ON overhead_employees(employee_name);
 
@@ -84,10 +92,13 @@ CREATE TABLE IF NOT EXISTS pipeline_opportunities (
   digital_fees NUMERIC(12,2) DEFAULT 0,
   finance_fees NUMERIC(12,2) DEFAULT 0,
 
-  created_at TIMESTAMPTZ DEFAULT now(),
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   updated_at TIMESTAMPTZ DEFAULT now(),
   created_by TEXT REFERENCES users(id),
-  updated_by TEXT REFERENCES users(id)
+  updated_by TEXT REFERENCES users(id),
+  row_version BIGINT NOT NULL DEFAULT 1, -- Bumped on every update; delta-sync conflict check
+  row_xid xid8, -- Writing transaction; see SYNC WATERMARKS below
+  created_xid xid8 DEFAULT pg_current_xact_id() -- Inserting transaction (changelog additions)
 );
 
 CREATE INDEX IF NOT EXISTS idx_pipeline_opportunities_project_code ON pipeline_opportunities(project_code);
@@ -95,6 +106,10 @@ CREATE INDEX IF NOT EXISTS idx_pipeline_opportunities_client ON pipeline_opportu
 CREATE INDEX IF NOT EXISTS idx_pipeline_opportunities_owner ON pipeline_opportunities(owner);
 CREATE INDEX IF NOT EXISTS idx_pipeline_opportunities_status ON pipeline_opportunities(status);
 CREATE INDEX IF NOT EXISTS idx_pipeline_opportunities_region ON pipeline_opportunities(region);
+CREATE INDEX IF NOT EXISTS idx_pipeline_opportunities_updated_at ON pipeline_opportunities(updated_at);
+CREATE INDEX IF NOT EXISTS idx_pipeline_opportunities_created_at_code ON pipeline_opportunities(created_at DESC, project_code DESC);
+CREATE INDEX IF NOT EXISTS pipeline_opportunities_row_xid_idx ON pipeline_opportunities(row_xid);
+CREATE INDEX IF NOT EXISTS pipeline_opportunities_created_xid_idx ON pipeline_opportunities(created_xid);
 
 -- =====================================================
 -- QUOTES
@@ -123,13 +138,118 @@ CREATE TABLE IF NOT EXISTS quotes (
   updated_at TIMESTAMPTZ DEFAULT now(),
   created_by TEXT REFERENCES users(id),
   updated_by TEXT REFERENCES users(id),
-  full_quote JSONB DEFAULT '{}'::jsonb
+  full_quote JSONB DEFAULT '{}'::jsonb,
+  computed_total_hours NUMERIC(12,2),
+  computed_total_cost NUMERIC(14,2),
+  computed_phase_totals JSONB,
+  row_version BIGINT NOT NULL DEFAULT 1, -- Bumped on every update; delta-sync conflict check
+  row_xid xid8, -- Writing transaction; see SYNC WATERMARKS below
+
+  -- Search columns (migrations/0009_quote_search.sql)
+  search_text TEXT GENERATED ALWAYS AS (
+    lower(COALESCE(project_number, '') || ' ' || COALESCE(project_name, '') || ' ' ||
+          COALESCE(client_name, '') || ' ' || COALESCE(brand, ''))
+  ) STORED,
+  resource_roles JSONB GENERATED ALWAYS AS ( -- phases[].resources[].role
+    jsonb_path_query_array(COALESCE(phases, '[]'::jsonb), 'lax $[*].resources[*].role')
+  ) STORED,
+  date_window DATERANGE GENERATED ALWAYS AS ( -- NULL when the quote has no dates
+    CASE WHEN COALESCE(brief_date, in_market_date, project_completion_date) IS NOT NULL THEN
+      daterange(
+        LEAST(COALESCE(brief_date, in_market_date), COALESCE(project_completion_date, in_market_date)),
+        GREATEST(COALESCE(brief_date, in_market_date), COALESCE(project_completion_date, in_market_date)),
+        '[]'
+      )
+    END
+  ) STORED
 );
 
 CREATE INDEX IF NOT EXISTS idx_quotes_project_number ON quotes(project_number);
 CREATE INDEX IF NOT EXISTS idx_quotes_client_name ON quotes(client_name);
 CREATE INDEX IF NOT EXISTS idx_quotes_status ON quotes(status);
 CREATE INDEX IF NOT EXISTS idx_quotes_pipeline_opportunity_id ON quotes(pipeline_opportunity_id);
+CREATE INDEX IF NOT EXISTS idx_quotes_created_by_updated_at ON quotes(created_by, updated_at DESC, id);
+CREATE INDEX IF NOT EXISTS idx_quotes_updated_by_updated_at ON quotes(updated_by, updated_at DESC, id) INCLUDE (created_by);
+CREATE INDEX IF NOT EXISTS idx_quotes_search_text_trgm ON quotes USING GIN (search_text gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_quotes_resource_roles ON quotes USING GIN (resource_roles jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_quotes_date_window ON quotes USING GIST (date_window);
+CREATE INDEX IF NOT EXISTS idx_quotes_total_program_budget ON quotes(total_program_budget);
+CREATE INDEX IF NOT EXISTS idx_quotes_computed_total_cost ON quotes(computed_total_cost DESC) WHERE computed_total_cost IS NOT NULL;
+
+-- Per-year project code allocator (P0001-25, P0002-25, ...); seeded from existing codes on first use
+CREATE TABLE IF NOT EXISTS project_code_counters (
+  year TEXT PRIMARY KEY,
+  last_value INTEGER NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- =====================================================
+-- PIPELINE CHANGELOG (append-only; "addition" events are derived from pipeline_opportunities)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS pipeline_changelog (
+  id BIGSERIAL PRIMARY KEY,
+  user_id TEXT NOT NULL,
+  change_type TEXT NOT NULL,
+  project_code TEXT NOT NULL,
+  project_name TEXT,
+  client TEXT,
+  description TEXT NOT NULL DEFAULT '',
+  changed_by TEXT NOT NULL,
+  changed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  recorded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  recorded_xid xid8 DEFAULT pg_current_xact_id(),
+  UNIQUE (user_id, change_type, project_code, changed_at)
+);
+
+CREATE INDEX IF NOT EXISTS pipeline_changelog_user_changed_idx ON pipeline_changelog(user_id, changed_at DESC, project_code DESC);
+CREATE INDEX IF NOT EXISTS pipeline_changelog_user_recorded_idx ON pipeline_changelog(user_id, recorded_at);
+CREATE INDEX IF NOT EXISTS pipeline_changelog_user_recorded_xid_idx ON pipeline_changelog(user_id, recorded_xid);
+
+-- Unparseable legacy dates fall back to the row's updated_at instead of aborting the backfill
+CREATE OR REPLACE FUNCTION pg_temp.changelog_date(value TEXT) RETURNS TIMESTAMPTZ LANGUAGE plpgsql AS $$
+BEGIN
+  RETURN NULLIF(value, '')::timestamptz;
+EXCEPTION WHEN invalid_datetime_format OR datetime_field_overflow OR invalid_parameter_value THEN
+  RETURN NULL;
+END;
+$$;
+
+-- Backfill events previously kept as a JSON array under user_storage 'pipeline-changelog'
+INSERT INTO pipeline_changelog (user_id, change_type, project_code, project_name, client, description, changed_by, changed_at)
+SELECT us.user_id,
+       item->>'type',
+       item->>'projectCode',
+       item->>'projectName',
+       item->>'client',
+       COALESCE(item->>'description', ''),
+       COALESCE(item->>'user', 'system'),
+       COALESCE(pg_temp.changelog_date(item->>'date'), us.updated_at)
+FROM user_storage us
+CROSS JOIN LATERAL jsonb_array_elements(
+  CASE WHEN jsonb_typeof(us.storage_value) = 'array' THEN us.storage_value ELSE '[]'::jsonb END
+) AS item
+WHERE us.storage_key = 'pipeline-changelog'
+  AND item->>'type' IS NOT NULL
+  AND item->>'type' <> 'addition'
+  AND item->>'projectCode' IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+-- =====================================================
+-- FLOAT OUTBOX (Float project creations queued by POST /api/pipeline)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS float_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  project_code TEXT NOT NULL,
+  payload JSONB NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sent', 'failed')),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  last_error TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS float_outbox_due_idx ON float_outbox(next_attempt_at) WHERE status = 'pending';
 
 -- =====================================================
 -- EDIT REQUESTS
@@ -220,6 +340,14 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+CREATE OR REPLACE FUNCTION bump_row_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.row_version = OLD.row_version + 1;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
 CREATE OR REPLACE FUNCTION calculate_total_fees()
 RETURNS TRIGGER AS $$
 BEGIN
@@ -273,6 +401,12 @@ CREATE TRIGGER update_workback_tasks_updated_at BEFORE UPDATE ON workback_tasks
 CREATE TRIGGER update_overhead_employees_updated_at BEFORE UPDATE ON overhead_employees
   FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- row_version counters (delta-sync conflict checks)
+CREATE TRIGGER bump_pipeline_opportunities_row_version BEFORE UPDATE ON pipeline_opportunities
+  FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+CREATE TRIGGER bump_quotes_row_version BEFORE UPDATE ON quotes
+  FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
 -- total_fees calculation
 CREATE TRIGGER calculate_pipeline_total_fees BEFORE INSERT OR UPDATE ON pipeline_opportunities
   FOR EACH ROW EXECUTE FUNCTION calculate_total_fees();
@@ -351,39 +485,193 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- =====================================================
+-- PIPELINE ROLLUPS
+-- =====================================================
+-- Incrementally maintained pipeline aggregates behind GET /api/pipeline/analytics.
+-- One row per (status, client, start month); '' stands in for a missing status or start date.
+-- Statement triggers on pipeline_opportunities add each row's contribution and subtract its previous
+-- one, so every write path (bulk replace, delta, single upsert, delete, storage) keeps them exact.
+CREATE TABLE IF NOT EXISTS pipeline_rollup (
+  status TEXT NOT NULL,
+  client TEXT NOT NULL,
+  month TEXT NOT NULL,
+  project_count BIGINT NOT NULL DEFAULT 0,
+  revenue NUMERIC NOT NULL DEFAULT 0,
+  total_fees NUMERIC NOT NULL DEFAULT 0,
+  PRIMARY KEY (status, client, month)
+);
+
+-- The ten *_fees columns unpivoted once per write instead of scanned ten times per read.
+CREATE TABLE IF NOT EXISTS pipeline_department_rollup (
+  status TEXT NOT NULL,
+  client TEXT NOT NULL,
+  month TEXT NOT NULL,
+  department TEXT NOT NULL,
+  fees NUMERIC NOT NULL DEFAULT 0,
+  projects_with_fees BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (status, client, month, department)
+);
+
+-- Applies a whole statement's changes at once from its transition tables: old rows count -1 and new
+-- rows +1, summed per (status, client, month) and department. Rows an update left unchanged cancel
+-- out and are skipped, and each rollup row is upserted once per statement in primary-key order,
+-- so concurrent bulk writes lock shared rollup rows in the same order instead of deadlocking.
+CREATE OR REPLACE FUNCTION pipeline_rollup_statement_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+  changes TEXT := CASE TG_OP
+    WHEN 'INSERT' THEN 'SELECT 1 AS direction, * FROM new_rows'
+    WHEN 'DELETE' THEN 'SELECT -1 AS direction, * FROM old_rows'
+    ELSE 'SELECT -1 AS direction, * FROM old_rows UNION ALL SELECT 1, * FROM new_rows'
+  END;
+BEGIN
+  EXECUTE format($sql$
+    INSERT INTO pipeline_rollup AS t (status, client, month, project_count, revenue, total_fees)
+    SELECT COALESCE(c.status, ''), c.client, COALESCE(to_char(c.start_date, 'YYYY-MM'), ''),
+           sum(c.direction), sum(c.direction * COALESCE(c.revenue, 0)), sum(c.direction * COALESCE(c.total_fees, 0))
+    FROM (%s) c
+    GROUP BY 1, 2, 3
+    HAVING sum(c.direction) <> 0
+        OR sum(c.direction * COALESCE(c.revenue, 0)) <> 0
+        OR sum(c.direction * COALESCE(c.total_fees, 0)) <> 0
+    ORDER BY 1, 2, 3
+    ON CONFLICT (status, client, month) DO UPDATE SET
+      project_count = t.project_count + EXCLUDED.project_count,
+      revenue = t.revenue + EXCLUDED.revenue,
+      total_fees = t.total_fees + EXCLUDED.total_fees
+  $sql$, changes);
+
+  EXECUTE format($sql$
+    INSERT INTO pipeline_department_rollup AS t (status, client, month, department, fees, projects_with_fees)
+    SELECT COALESCE(c.status, ''), c.client, COALESCE(to_char(c.start_date, 'YYYY-MM'), ''), d.department,
+           sum(c.direction * d.fees), sum(CASE WHEN d.fees > 0 THEN c.direction ELSE 0 END)
+    FROM (%s) c
+    CROSS JOIN LATERAL (VALUES
+      ('accounts', COALESCE(c.accounts_fees, 0)),
+      ('creative', COALESCE(c.creative_fees, 0)),
+      ('design', COALESCE(c.design_fees, 0)),
+      ('strategic_planning', COALESCE(c.strategic_planning_fees, 0)),
+      ('media', COALESCE(c.media_fees, 0)),
+      ('creator', COALESCE(c.creator_fees, 0)),
+      ('social', COALESCE(c.social_fees, 0)),
+      ('omni', COALESCE(c.omni_fees, 0)),
+      ('digital', COALESCE(c.digital_fees, 0)),
+      ('finance', COALESCE(c.finance_fees, 0))
+    ) AS d(department, fees)
+    GROUP BY 1, 2, 3, 4
+    HAVING sum(c.direction * d.fees) <> 0 OR sum(CASE WHEN d.fees > 0 THEN c.direction ELSE 0 END) <> 0
+    ORDER BY 1, 2, 3, 4
+    ON CONFLICT (status, client, month, department) DO UPDATE SET
+      fees = t.fees + EXCLUDED.fees,
+      projects_with_fees = t.projects_with_fees + EXCLUDED.projects_with_fees
+  $sql$, changes);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER pipeline_opportunities_rollup_insert AFTER INSERT ON pipeline_opportunities
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION pipeline_rollup_statement_trigger();
+CREATE TRIGGER pipeline_opportunities_rollup_update AFTER UPDATE ON pipeline_opportunities
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION pipeline_rollup_statement_trigger();
+CREATE TRIGGER pipeline_opportunities_rollup_delete AFTER DELETE ON pipeline_opportunities
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION pipeline_rollup_statement_trigger();
+
+-- =====================================================
+-- SYNC WATERMARKS AND TOMBSTONES (GET /api/storage?since=<watermark>)
+-- =====================================================
+-- Every write stamps the row with its transaction id (row_xid). A poll's watermark is the xmin
+-- of its snapshot: every transaction below it had finished, so the next poll asks for rows and
+-- tombstones with an id >= the watermark and cannot miss a write that committed late.
+CREATE OR REPLACE FUNCTION stamp_row_xid()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.row_xid = pg_current_xact_id();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER stamp_user_storage_row_xid BEFORE INSERT OR UPDATE ON user_storage
+  FOR EACH ROW EXECUTE FUNCTION stamp_row_xid();
+CREATE TRIGGER stamp_pipeline_opportunities_row_xid BEFORE INSERT OR UPDATE ON pipeline_opportunities
+  FOR EACH ROW EXECUTE FUNCTION stamp_row_xid();
+CREATE TRIGGER stamp_quotes_row_xid BEFORE INSERT OR UPDATE ON quotes
+  FOR EACH ROW EXECUTE FUNCTION stamp_row_xid();
+CREATE TRIGGER stamp_overhead_employees_row_xid BEFORE INSERT OR UPDATE ON overhead_employees
+  FOR EACH ROW EXECUTE FUNCTION stamp_row_xid();
+
+-- One row per deleted storage key, pipeline entry or quote, so polls can report deletions.
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+  id BIGSERIAL PRIMARY KEY,
+  item_type TEXT NOT NULL CHECK (item_type IN ('storage', 'pipeline', 'quote', 'overhead')),
+  user_id TEXT, -- NULL for pipeline entries, which every user sees
+  item_key TEXT NOT NULL,
+  deleted_xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+  deleted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS sync_tombstones_deleted_xid_idx ON sync_tombstones(deleted_xid);
+CREATE INDEX IF NOT EXISTS sync_tombstones_deleted_at_idx ON sync_tombstones(deleted_at);
+
+-- Tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS are pruned; pruned_through is the newest
+-- pruned deletion. A client whose watermark is at or below it may have missed one and resyncs fully.
+CREATE TABLE IF NOT EXISTS sync_horizon (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  pruned_through xid8 NOT NULL,
+  pruned_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION record_sync_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'user_storage' THEN
+    INSERT INTO sync_tombstones (item_type, user_id, item_key) VALUES ('storage', OLD.user_id, OLD.storage_key);
+  ELSIF TG_TABLE_NAME = 'pipeline_opportunities' THEN
+    INSERT INTO sync_tombstones (item_type, item_key) VALUES ('pipeline', OLD.project_code);
+  ELSIF TG_TABLE_NAME = 'overhead_employees' THEN
+    -- Only versions GET /api/overhead-employees; storage polls never report these
+    INSERT INTO sync_tombstones (item_type, user_id, item_key) VALUES ('overhead', OLD.user_id, OLD.id::text);
+  ELSIF OLD.quote_uid IS NOT NULL THEN
+    -- A quote is listed for both its creator and its last editor
+    INSERT INTO sync_tombstones (item_type, user_id, item_key)
+    SELECT DISTINCT 'quote', owner, OLD.quote_uid
+    FROM (VALUES (OLD.created_by), (OLD.updated_by)) AS owners(owner)
+    WHERE owner IS NOT NULL;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER user_storage_tombstone AFTER DELETE ON user_storage
+  FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+CREATE TRIGGER pipeline_opportunities_tombstone AFTER DELETE ON pipeline_opportunities
+  FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+CREATE TRIGGER quotes_tombstone AFTER DELETE ON quotes
+  FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+CREATE TRIGGER overhead_employees_tombstone AFTER DELETE ON overhead_employees
+  FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+
 -- =====================================================
 -- VIEWS
 -- =====================================================
 CREATE OR REPLACE VIEW pipeline_summary AS
 SELECT
-  status,
-  COUNT(*) AS project_count,
+  NULLIF(status, '') AS status,
+  SUM(project_count)::bigint AS project_count,
   SUM(revenue) AS total_revenue,
   SUM(total_fees) AS total_fees,
-  AVG(revenue) AS avg_revenue
-FROM pipeline_opportunities
-GROUP BY status;
+  SUM(revenue) / NULLIF(SUM(project_count), 0) AS avg_revenue
+FROM pipeline_rollup
+GROUP BY status
+HAVING SUM(project_count) > 0;
 
 CREATE OR REPLACE VIEW department_fees_summary AS
-SELECT 'accounts' AS department, SUM(accounts_fees) AS total_fees, COUNT(CASE WHEN accounts_fees > 0 THEN 1 END) AS projects_with_fees FROM pipeline_opportunities
-UNION ALL
-SELECT 'creative', SUM(creative_fees), COUNT(CASE WHEN creative_fees > 0 THEN 1 END) FROM pipeline_opportunities
-UNION ALL
-SELECT 'design', SUM(design_fees), COUNT(CASE WHEN design_fees > 0 THEN 1 END) FROM pipeline_opportunities
-UNION ALL
-SELECT 'strategic_planning', SUM(strategic_planning_fees), COUNT(CASE WHEN strategic_planning_fees > 0 THEN 1 END) FROM pipeline_opportunities
-UNION ALL
-SELECT 'media', SUM(media_fees), COUNT(CASE WHEN media_fees > 0 THEN 1 END) FROM pipeline_opportunities
-UNION ALL
-SELECT 'creator', SUM(creator_fees), COUNT(CASE WHEN creator_fees > 0 THEN 1 END) FROM pipeline_opportunities
-UNION ALL
-SELECT 'social', SUM(social_fees), COUNT(CASE WHEN social_fees > 0 THEN 1 END) FROM pipeline_opportunities
-UNION ALL
-SELECT 'omni', SUM(omni_fees), COUNT(CASE WHEN omni_fees > 0 THEN 1 END) FROM pipeline_opportunities
-UNION ALL
-SELECT 'digital', SUM(digital_fees), COUNT(CASE WHEN digital_fees > 0 THEN 1 END) FROM pipeline_opportunities
-UNION ALL
-SELECT 'finance', SUM(finance_fees), COUNT(CASE WHEN finance_fees > 0 THEN 1 END) FROM pipeline_opportunities;
+SELECT department, SUM(fees) AS total_fees, SUM(projects_with_fees)::bigint AS projects_with_fees
+FROM pipeline_department_rollup
+GROUP BY department;
 
 -- =====================================================
 -- COMMENTS
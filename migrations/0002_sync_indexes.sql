@@ -0,0 +1,4 @@
+-- Indexes behind keyset pagination of GET /api/pipeline, pipeline revisions and GET /api/storage?since=.
+CREATE INDEX IF NOT EXISTS idx_pipeline_opportunities_updated_at ON pipeline_opportunities(updated_at);
+CREATE INDEX IF NOT EXISTS idx_pipeline_opportunities_created_at_code ON pipeline_opportunities(created_at DESC, project_code DESC);
+CREATE INDEX IF NOT EXISTS user_storage_user_updated_idx ON user_storage(user_id, updated_at);
@@ -0,0 +1,14 @@
+-- Float project creations queued by POST /api/pipeline and drained by the background worker.
+CREATE TABLE IF NOT EXISTS float_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  project_code TEXT NOT NULL,
+  payload JSONB NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sent', 'failed')),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  last_error TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS float_outbox_due_idx ON float_outbox(next_attempt_at) WHERE status = 'pending';
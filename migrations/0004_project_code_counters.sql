@@ -0,0 +1,6 @@
+-- Per-year project code allocator (P0001-25, P0002-25, ...); seeded from existing codes on first use.
+CREATE TABLE IF NOT EXISTS project_code_counters (
+  year TEXT PRIMARY KEY,
+  last_value INTEGER NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,46 @@
+-- Append-only pipeline changelog; "addition" events are derived from pipeline_opportunities.
+CREATE TABLE IF NOT EXISTS pipeline_changelog (
+  id BIGSERIAL PRIMARY KEY,
+  user_id TEXT NOT NULL,
+  change_type TEXT NOT NULL,
+  project_code TEXT NOT NULL,
+  project_name TEXT,
+  client TEXT,
+  description TEXT NOT NULL DEFAULT '',
+  changed_by TEXT NOT NULL,
+  changed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  recorded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  UNIQUE (user_id, change_type, project_code, changed_at)
+);
+
+CREATE INDEX IF NOT EXISTS pipeline_changelog_user_changed_idx ON pipeline_changelog(user_id, changed_at DESC, project_code DESC);
+CREATE INDEX IF NOT EXISTS pipeline_changelog_user_recorded_idx ON pipeline_changelog(user_id, recorded_at);
+
+-- Unparseable legacy dates fall back to the row's updated_at instead of aborting the backfill
+CREATE OR REPLACE FUNCTION pg_temp.changelog_date(value TEXT) RETURNS TIMESTAMPTZ LANGUAGE plpgsql AS $$
+BEGIN
+  RETURN NULLIF(value, '')::timestamptz;
+EXCEPTION WHEN invalid_datetime_format OR datetime_field_overflow OR invalid_parameter_value THEN
+  RETURN NULL;
+END;
+$$;
+
+-- Backfill events previously kept as a JSON array under user_storage 'pipeline-changelog'
+INSERT INTO pipeline_changelog (user_id, change_type, project_code, project_name, client, description, changed_by, changed_at)
+SELECT us.user_id,
+       item->>'type',
+       item->>'projectCode',
+       item->>'projectName',
+       item->>'client',
+       COALESCE(item->>'description', ''),
+       COALESCE(item->>'user', 'system'),
+       COALESCE(pg_temp.changelog_date(item->>'date'), us.updated_at)
+FROM user_storage us
+CROSS JOIN LATERAL jsonb_array_elements(
+  CASE WHEN jsonb_typeof(us.storage_value) = 'array' THEN us.storage_value ELSE '[]'::jsonb END
+) AS item
+WHERE us.storage_key = 'pipeline-changelog'
+  AND item->>'type' IS NOT NULL
+  AND item->>'type' <> 'addition'
+  AND item->>'projectCode' IS NOT NULL
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,10 @@
+-- migrate: no-transaction
+-- Per-user quote loads: one index per branch of the created_by / updated_by UNION ALL in
+-- quotes_service, both in the ORDER BY updated_at DESC, id order so LIMIT/OFFSET pages merge
+-- the two index scans without sorting. created_by is included so the updated_by branch can
+-- check `created_by IS DISTINCT FROM` (and count/max for ETags) without visiting the heap.
+-- Built CONCURRENTLY so deploying does not block quote writes.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotes_created_by_updated_at
+  ON quotes(created_by, updated_at DESC, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotes_updated_by_updated_at
+  ON quotes(updated_by, updated_at DESC, id) INCLUDE (created_by);
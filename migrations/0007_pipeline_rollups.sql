@@ -0,0 +1,139 @@
+-- Incrementally maintained pipeline aggregates behind GET /api/pipeline/analytics.
+-- One row per (status, client, start month); '' stands in for a missing status or start date.
+-- Statement triggers on pipeline_opportunities add each row's contribution and subtract its previous
+-- one, so every write path (bulk replace, delta, single upsert, delete, storage) keeps them exact.
+CREATE TABLE IF NOT EXISTS pipeline_rollup (
+  status TEXT NOT NULL,
+  client TEXT NOT NULL,
+  month TEXT NOT NULL,
+  project_count BIGINT NOT NULL DEFAULT 0,
+  revenue NUMERIC NOT NULL DEFAULT 0,
+  total_fees NUMERIC NOT NULL DEFAULT 0,
+  PRIMARY KEY (status, client, month)
+);
+
+-- The ten *_fees columns unpivoted once per write instead of scanned ten times per read.
+CREATE TABLE IF NOT EXISTS pipeline_department_rollup (
+  status TEXT NOT NULL,
+  client TEXT NOT NULL,
+  month TEXT NOT NULL,
+  department TEXT NOT NULL,
+  fees NUMERIC NOT NULL DEFAULT 0,
+  projects_with_fees BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (status, client, month, department)
+);
+
+-- Applies a whole statement's changes at once from its transition tables: old rows count -1 and new
+-- rows +1, summed per (status, client, month) and department. Rows an update left unchanged cancel
+-- out and are skipped, and each rollup row is upserted once per statement in primary-key order,
+-- so concurrent bulk writes lock shared rollup rows in the same order instead of deadlocking.
+CREATE OR REPLACE FUNCTION pipeline_rollup_statement_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+  changes TEXT := CASE TG_OP
+    WHEN 'INSERT' THEN 'SELECT 1 AS direction, * FROM new_rows'
+    WHEN 'DELETE' THEN 'SELECT -1 AS direction, * FROM old_rows'
+    ELSE 'SELECT -1 AS direction, * FROM old_rows UNION ALL SELECT 1, * FROM new_rows'
+  END;
+BEGIN
+  EXECUTE format($sql$
+    INSERT INTO pipeline_rollup AS t (status, client, month, project_count, revenue, total_fees)
+    SELECT COALESCE(c.status, ''), c.client, COALESCE(to_char(c.start_date, 'YYYY-MM'), ''),
+           sum(c.direction), sum(c.direction * COALESCE(c.revenue, 0)), sum(c.direction * COALESCE(c.total_fees, 0))
+    FROM (%s) c
+    GROUP BY 1, 2, 3
+    HAVING sum(c.direction) <> 0
+        OR sum(c.direction * COALESCE(c.revenue, 0)) <> 0
+        OR sum(c.direction * COALESCE(c.total_fees, 0)) <> 0
+    ORDER BY 1, 2, 3
+    ON CONFLICT (status, client, month) DO UPDATE SET
+      project_count = t.project_count + EXCLUDED.project_count,
+      revenue = t.revenue + EXCLUDED.revenue,
+      total_fees = t.total_fees + EXCLUDED.total_fees
+  $sql$, changes);
+
+  EXECUTE format($sql$
+    INSERT INTO pipeline_department_rollup AS t (status, client, month, department, fees, projects_with_fees)
+    SELECT COALESCE(c.status, ''), c.client, COALESCE(to_char(c.start_date, 'YYYY-MM'), ''), d.department,
+           sum(c.direction * d.fees), sum(CASE WHEN d.fees > 0 THEN c.direction ELSE 0 END)
+    FROM (%s) c
+    CROSS JOIN LATERAL (VALUES
+      ('accounts', COALESCE(c.accounts_fees, 0)),
+      ('creative', COALESCE(c.creative_fees, 0)),
+      ('design', COALESCE(c.design_fees, 0)),
+      ('strategic_planning', COALESCE(c.strategic_planning_fees, 0)),
+      ('media', COALESCE(c.media_fees, 0)),
+      ('creator', COALESCE(c.creator_fees, 0)),
+      ('social', COALESCE(c.social_fees, 0)),
+      ('omni', COALESCE(c.omni_fees, 0)),
+      ('digital', COALESCE(c.digital_fees, 0)),
+      ('finance', COALESCE(c.finance_fees, 0))
+    ) AS d(department, fees)
+    GROUP BY 1, 2, 3, 4
+    HAVING sum(c.direction * d.fees) <> 0 OR sum(CASE WHEN d.fees > 0 THEN c.direction ELSE 0 END) <> 0
+    ORDER BY 1, 2, 3, 4
+    ON CONFLICT (status, client, month, department) DO UPDATE SET
+      fees = t.fees + EXCLUDED.fees,
+      projects_with_fees = t.projects_with_fees + EXCLUDED.projects_with_fees
+  $sql$, changes);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS pipeline_opportunities_rollup_insert ON pipeline_opportunities;
+CREATE TRIGGER pipeline_opportunities_rollup_insert AFTER INSERT ON pipeline_opportunities
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION pipeline_rollup_statement_trigger();
+DROP TRIGGER IF EXISTS pipeline_opportunities_rollup_update ON pipeline_opportunities;
+CREATE TRIGGER pipeline_opportunities_rollup_update AFTER UPDATE ON pipeline_opportunities
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION pipeline_rollup_statement_trigger();
+DROP TRIGGER IF EXISTS pipeline_opportunities_rollup_delete ON pipeline_opportunities;
+CREATE TRIGGER pipeline_opportunities_rollup_delete AFTER DELETE ON pipeline_opportunities
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION pipeline_rollup_statement_trigger();
+
+-- Backfill under the triggers' table lock so no concurrent write is counted twice or missed.
+TRUNCATE pipeline_rollup, pipeline_department_rollup;
+INSERT INTO pipeline_rollup (status, client, month, project_count, revenue, total_fees)
+SELECT COALESCE(p.status, ''), p.client, COALESCE(to_char(p.start_date, 'YYYY-MM'), ''),
+       count(*), sum(COALESCE(p.revenue, 0)), sum(COALESCE(p.total_fees, 0))
+FROM pipeline_opportunities p
+GROUP BY 1, 2, 3;
+
+INSERT INTO pipeline_department_rollup (status, client, month, department, fees, projects_with_fees)
+SELECT COALESCE(p.status, ''), p.client, COALESCE(to_char(p.start_date, 'YYYY-MM'), ''), d.department,
+       sum(d.fees), count(*) FILTER (WHERE d.fees > 0)
+FROM pipeline_opportunities p
+CROSS JOIN LATERAL (VALUES
+  ('accounts', COALESCE(p.accounts_fees, 0)),
+  ('creative', COALESCE(p.creative_fees, 0)),
+  ('design', COALESCE(p.design_fees, 0)),
+  ('strategic_planning', COALESCE(p.strategic_planning_fees, 0)),
+  ('media', COALESCE(p.media_fees, 0)),
+  ('creator', COALESCE(p.creator_fees, 0)),
+  ('social', COALESCE(p.social_fees, 0)),
+  ('omni', COALESCE(p.omni_fees, 0)),
+  ('digital', COALESCE(p.digital_fees, 0)),
+  ('finance', COALESCE(p.finance_fees, 0))
+) AS d(department, fees)
+GROUP BY 1, 2, 3, 4;
+
+-- The reporting views now read the rollups instead of rescanning pipeline_opportunities.
+DROP VIEW IF EXISTS pipeline_summary;
+CREATE VIEW pipeline_summary AS
+SELECT
+  NULLIF(status, '') AS status,
+  SUM(project_count)::bigint AS project_count,
+  SUM(revenue) AS total_revenue,
+  SUM(total_fees) AS total_fees,
+  SUM(revenue) / NULLIF(SUM(project_count), 0) AS avg_revenue
+FROM pipeline_rollup
+GROUP BY status
+HAVING SUM(project_count) > 0;
+
+DROP VIEW IF EXISTS department_fees_summary;
+CREATE VIEW department_fees_summary AS
+SELECT department, SUM(fees) AS total_fees, SUM(projects_with_fees)::bigint AS projects_with_fees
+FROM pipeline_department_rollup
+GROUP BY department;
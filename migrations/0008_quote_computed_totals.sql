@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- Server-computed quote totals (quotes_service.compute_quote_totals), written on every save.
+-- Rows saved before this migration stay NULL until their next save.
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS computed_total_hours NUMERIC(12,2);
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS computed_total_cost NUMERIC(14,2);
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS computed_phase_totals JSONB;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotes_computed_total_cost
+  ON quotes(computed_total_cost DESC) WHERE computed_total_cost IS NOT NULL;
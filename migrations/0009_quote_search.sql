@@ -0,0 +1,29 @@
+-- migrate: no-transaction
+-- Columns and indexes behind GET /api/quotes/search, derived by Postgres so no caller re-extracts
+-- them from full_quote and no search scans JSONB. Adding the generated columns rewrites quotes once.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE quotes
+  -- Free text: project number, project name, client and brand, lower-cased
+  ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS (
+    lower(COALESCE(project_number, '') || ' ' || COALESCE(project_name, '') || ' ' ||
+          COALESCE(client_name, '') || ' ' || COALESCE(brand, ''))
+  ) STORED,
+  -- Role of every phase resource (phases[].resources[].role), the same resources quote pricing reads
+  ADD COLUMN IF NOT EXISTS resource_roles JSONB GENERATED ALWAYS AS (
+    jsonb_path_query_array(COALESCE(phases, '[]'::jsonb), 'lax $[*].resources[*].role')
+  ) STORED,
+  -- Brief → completion window (in-market date when either end is missing); NULL without any date,
+  -- so such quotes never match a dateFrom/dateTo filter
+  ADD COLUMN IF NOT EXISTS date_window DATERANGE GENERATED ALWAYS AS (
+    CASE WHEN COALESCE(brief_date, in_market_date, project_completion_date) IS NOT NULL THEN
+      daterange(
+        LEAST(COALESCE(brief_date, in_market_date), COALESCE(project_completion_date, in_market_date)),
+        GREATEST(COALESCE(brief_date, in_market_date), COALESCE(project_completion_date, in_market_date)),
+        '[]'
+      )
+    END
+  ) STORED;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotes_search_text_trgm ON quotes USING GIN (search_text gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotes_resource_roles ON quotes USING GIN (resource_roles jsonb_path_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotes_date_window ON quotes USING GIST (date_window);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quotes_total_program_budget ON quotes(total_program_budget);
@@ -0,0 +1,6 @@
+-- Pipeline pages and the changelog are keyset-paginated on (created_at, project_code); a NULL
+-- created_at on the last row of a page cannot be encoded in the cursor and ended the listing early.
+UPDATE pipeline_opportunities SET created_at = COALESCE(updated_at, now()) WHERE created_at IS NULL;
+ALTER TABLE pipeline_opportunities
+  ALTER COLUMN created_at SET DEFAULT now(),
+  ALTER COLUMN created_at SET NOT NULL;
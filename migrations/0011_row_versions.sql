@@ -0,0 +1,20 @@
+-- Per-row write counters for delta-sync conflict checks (PATCH /api/storage/{key}). Rows start
+-- at 1 and every UPDATE bumps the counter, whichever code path (bulk replace, delta, upsert)
+-- wrote the row, so a client's expected version only matches if nothing committed since its read.
+ALTER TABLE pipeline_opportunities ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_row_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.row_version = OLD.row_version + 1;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bump_pipeline_opportunities_row_version ON pipeline_opportunities;
+CREATE TRIGGER bump_pipeline_opportunities_row_version BEFORE UPDATE ON pipeline_opportunities
+  FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+DROP TRIGGER IF EXISTS bump_quotes_row_version ON quotes;
+CREATE TRIGGER bump_quotes_row_version BEFORE UPDATE ON quotes
+  FOR EACH ROW EXECUTE FUNCTION bump_row_version();
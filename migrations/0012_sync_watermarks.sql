@@ -0,0 +1,95 @@
+-- Commit-order watermarks and deletion tombstones for GET /api/storage?since=<watermark>.
+-- Every write stamps the row with its transaction id (row_xid). A poll's watermark is the xmin
+-- of its snapshot: every transaction below it had finished, so the next poll asks for rows and
+-- tombstones with an id >= the watermark and cannot miss a write that committed late.
+-- Rows written before this migration keep NULL ids; they predate every xid watermark.
+ALTER TABLE user_storage ADD COLUMN IF NOT EXISTS row_xid xid8;
+ALTER TABLE pipeline_opportunities ADD COLUMN IF NOT EXISTS row_xid xid8;
+ALTER TABLE pipeline_opportunities ADD COLUMN IF NOT EXISTS created_xid xid8;
+ALTER TABLE pipeline_opportunities ALTER COLUMN created_xid SET DEFAULT pg_current_xact_id();
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS row_xid xid8;
+ALTER TABLE overhead_employees ADD COLUMN IF NOT EXISTS row_xid xid8;
+ALTER TABLE pipeline_changelog ADD COLUMN IF NOT EXISTS recorded_xid xid8;
+ALTER TABLE pipeline_changelog ALTER COLUMN recorded_xid SET DEFAULT pg_current_xact_id();
+
+CREATE OR REPLACE FUNCTION stamp_row_xid()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.row_xid = pg_current_xact_id();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS stamp_user_storage_row_xid ON user_storage;
+CREATE TRIGGER stamp_user_storage_row_xid BEFORE INSERT OR UPDATE ON user_storage
+  FOR EACH ROW EXECUTE FUNCTION stamp_row_xid();
+DROP TRIGGER IF EXISTS stamp_pipeline_opportunities_row_xid ON pipeline_opportunities;
+CREATE TRIGGER stamp_pipeline_opportunities_row_xid BEFORE INSERT OR UPDATE ON pipeline_opportunities
+  FOR EACH ROW EXECUTE FUNCTION stamp_row_xid();
+DROP TRIGGER IF EXISTS stamp_quotes_row_xid ON quotes;
+CREATE TRIGGER stamp_quotes_row_xid BEFORE INSERT OR UPDATE ON quotes
+  FOR EACH ROW EXECUTE FUNCTION stamp_row_xid();
+DROP TRIGGER IF EXISTS stamp_overhead_employees_row_xid ON overhead_employees;
+CREATE TRIGGER stamp_overhead_employees_row_xid BEFORE INSERT OR UPDATE ON overhead_employees
+  FOR EACH ROW EXECUTE FUNCTION stamp_row_xid();
+
+CREATE INDEX IF NOT EXISTS user_storage_user_row_xid_idx ON user_storage(user_id, row_xid);
+CREATE INDEX IF NOT EXISTS pipeline_opportunities_row_xid_idx ON pipeline_opportunities(row_xid);
+CREATE INDEX IF NOT EXISTS overhead_employees_user_row_xid_idx ON overhead_employees(user_id, row_xid);
+CREATE INDEX IF NOT EXISTS pipeline_opportunities_created_xid_idx ON pipeline_opportunities(created_xid);
+CREATE INDEX IF NOT EXISTS pipeline_changelog_user_recorded_xid_idx ON pipeline_changelog(user_id, recorded_xid);
+
+-- One row per deleted storage key, pipeline entry or quote, so polls can report deletions.
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+  id BIGSERIAL PRIMARY KEY,
+  item_type TEXT NOT NULL CHECK (item_type IN ('storage', 'pipeline', 'quote', 'overhead')),
+  user_id TEXT, -- NULL for pipeline entries, which every user sees
+  item_key TEXT NOT NULL,
+  deleted_xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+  deleted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS sync_tombstones_deleted_xid_idx ON sync_tombstones(deleted_xid);
+CREATE INDEX IF NOT EXISTS sync_tombstones_deleted_at_idx ON sync_tombstones(deleted_at);
+
+-- Tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS are pruned; pruned_through is the newest
+-- pruned deletion. A client whose watermark is at or below it may have missed one and resyncs fully.
+CREATE TABLE IF NOT EXISTS sync_horizon (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  pruned_through xid8 NOT NULL,
+  pruned_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION record_sync_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'user_storage' THEN
+    INSERT INTO sync_tombstones (item_type, user_id, item_key) VALUES ('storage', OLD.user_id, OLD.storage_key);
+  ELSIF TG_TABLE_NAME = 'pipeline_opportunities' THEN
+    INSERT INTO sync_tombstones (item_type, item_key) VALUES ('pipeline', OLD.project_code);
+  ELSIF TG_TABLE_NAME = 'overhead_employees' THEN
+    -- Only versions GET /api/overhead-employees; storage polls never report these
+    INSERT INTO sync_tombstones (item_type, user_id, item_key) VALUES ('overhead', OLD.user_id, OLD.id::text);
+  ELSIF OLD.quote_uid IS NOT NULL THEN
+    -- A quote is listed for both its creator and its last editor
+    INSERT INTO sync_tombstones (item_type, user_id, item_key)
+    SELECT DISTINCT 'quote', owner, OLD.quote_uid
+    FROM (VALUES (OLD.created_by), (OLD.updated_by)) AS owners(owner)
+    WHERE owner IS NOT NULL;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_storage_tombstone ON user_storage;
+CREATE TRIGGER user_storage_tombstone AFTER DELETE ON user_storage
+  FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+DROP TRIGGER IF EXISTS pipeline_opportunities_tombstone ON pipeline_opportunities;
+CREATE TRIGGER pipeline_opportunities_tombstone AFTER DELETE ON pipeline_opportunities
+  FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+DROP TRIGGER IF EXISTS quotes_tombstone ON quotes;
+CREATE TRIGGER quotes_tombstone AFTER DELETE ON quotes
+  FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();
+DROP TRIGGER IF EXISTS overhead_employees_tombstone ON overhead_employees;
+CREATE TRIGGER overhead_employees_tombstone AFTER DELETE ON overhead_employees
+  FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone();